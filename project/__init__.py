@@ -1,12 +1,30 @@
+import project.graph_store
+from project.graph_store import *
+
 import project.graph_utils
 from project.graph_utils import *
 
 import project.automata
 from project.automata import *
 
+import project.semiring
+from project.semiring import *
+
+import project.matrix_chain
+from project.matrix_chain import *
+
 import project.matrix_utils
 from project.matrix_utils import *
 
+import project.regex_compiler
+from project.regex_compiler import *
+
+import project.query_cache
+from project.query_cache import *
+
+import project.reachability_index
+from project.reachability_index import *
+
 import project.cfg_utils
 from project.cfg_utils import *
 
@@ -16,8 +34,17 @@ from project.rsm import *
 import project.ecfg
 from project.ecfg import *
 
+import project.compiled_grammar
+from project.compiled_grammar import *
+
+import project.parse_forest
+from project.parse_forest import *
+
 import project.cyk
 from project.cyk import *
 
+import project.earley
+from project.earley import *
+
 import project.cfpq
 from project.cfpq import *
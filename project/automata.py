@@ -1,4 +1,8 @@
-from typing import Set, Optional
+import enum
+from collections import defaultdict
+from typing import List, Set, Optional, Tuple
+
+import numpy as np
 
 from networkx import MultiDiGraph
 from pyformlang.finite_automaton import (
@@ -9,16 +13,37 @@ from pyformlang.finite_automaton import (
     Symbol,
 )
 from pyformlang.regular_expression import Regex
+from scipy.sparse import csr_matrix
 
-from project import matrix_utils
+from project import matrix_utils, regex_compiler
 
 __all__ = [
     "regex_to_min_dfa",
+    "minimize_dfa",
+    "determinize",
     "graph_to_epsilon_nfa",
+    "IntersectionMode",
     "intersect_automatons_kron",
 ]
 
 
+class IntersectionMode(enum.Enum):
+    """Class represents mode of intersection of automatons
+
+    Values
+    ----------
+
+    FULL_PRODUCT : IntersectionMode
+        Build all pairs of states by Kronecker product of bool matrices
+    TRIMMED_PRODUCT : IntersectionMode
+        Build only pairs of states reachable from start pairs
+        from which a final pair is reachable
+    """
+
+    FULL_PRODUCT = enum.auto()
+    TRIMMED_PRODUCT = enum.auto()
+
+
 def regex_to_min_dfa(regex: Regex) -> DeterministicFiniteAutomaton:
     """Converts regex to minimal DFA
 
@@ -32,7 +57,100 @@ def regex_to_min_dfa(regex: Regex) -> DeterministicFiniteAutomaton:
     dfa : DeterministicFiniteAutomaton
         Minimal DFA
     """
-    return regex.to_epsilon_nfa().minimize()
+    return regex_compiler.regex_to_bool_matrix(regex).determinize().minimize().to_dfa()
+
+
+def determinize(nfa: EpsilonNFA) -> DeterministicFiniteAutomaton:
+    """Converts NFA with epsilon transitions to DFA
+    using subset construction over bool matrices
+
+    States of the result are named by subsets of states of NFA
+    as in EpsilonNFA.to_deterministic
+
+    Parameters
+    ----------
+    nfa : EpsilonNFA
+        NFA to be determinized
+
+    Returns
+    -------
+    dfa : DeterministicFiniteAutomaton
+        Equivalent DFA
+    """
+    nfa_bool_mtx, epsilon_mtx = _epsilon_nfa_to_bool_matrix(nfa)
+    return nfa_bool_mtx.determinize(
+        epsilon_mtx=epsilon_mtx, name_by_subsets=True
+    ).to_dfa()
+
+
+def minimize_dfa(dfa: DeterministicFiniteAutomaton) -> DeterministicFiniteAutomaton:
+    """Minimizes DFA using Hopcroft partition refinement over bool matrices
+
+    Unlike DeterministicFiniteAutomaton.minimize, states from which
+    no final state is reachable are removed, and states of the result
+    are numbered from zero
+
+    Parameters
+    ----------
+    dfa : DeterministicFiniteAutomaton
+        DFA to be minimized
+
+    Returns
+    -------
+    dfa : DeterministicFiniteAutomaton
+        Minimal DFA
+    """
+    dfa_bool_mtx, _ = _epsilon_nfa_to_bool_matrix(dfa)
+    return dfa_bool_mtx.minimize().to_dfa()
+
+
+def _epsilon_nfa_to_bool_matrix(
+    nfa: EpsilonNFA,
+) -> Tuple["matrix_utils.BoolMatrixAutomaton", csr_matrix]:
+    """Builds bool matrices of NFA from its transitions
+    keeping epsilon transitions in a separate matrix
+
+    Parameters
+    ----------
+    nfa : EpsilonNFA
+        NFA to be converted
+
+    Returns
+    -------
+    result : Tuple[BoolMatrixAutomaton, csr_matrix]
+        Bool matrix representation of NFA without epsilon transitions
+        and bool matrix of epsilon transitions
+    """
+    # Symbols are labels as they are, so falsy symbols such as Symbol(0)
+    # are not confused with the empty label of graph edges
+    state_to_idx = {State(state.value): idx for idx, state in enumerate(nfa.states)}
+    states_num = len(state_to_idx)
+    epsilon_edges = ([], [])
+    label_edges = defaultdict(lambda: ([], []))
+    for state_from, symbol, state_to in nfa:
+        rows, cols = (
+            epsilon_edges if isinstance(symbol, Epsilon) else label_edges[symbol.value]
+        )
+        rows.append(state_to_idx[State(state_from.value)])
+        cols.append(state_to_idx[State(state_to.value)])
+
+    def edges_matrix(rows: List[int], cols: List[int]) -> csr_matrix:
+        return csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)),
+            shape=(states_num, states_num),
+        )
+
+    nfa_bool_mtx = matrix_utils.BoolMatrixAutomaton(
+        state_to_idx=state_to_idx,
+        start_states={State(state.value) for state in nfa.start_states},
+        final_states={State(state.value) for state in nfa.final_states},
+        b_mtx=defaultdict(
+            lambda: csr_matrix((states_num, states_num), dtype=bool),
+            {label: edges_matrix(*edges) for label, edges in label_edges.items()},
+        ),
+    )
+    epsilon_mtx = edges_matrix(*epsilon_edges)
+    return nfa_bool_mtx, epsilon_mtx
 
 
 def graph_to_epsilon_nfa(
@@ -82,7 +200,9 @@ def graph_to_epsilon_nfa(
 
 
 def intersect_automatons_kron(
-    first_automaton: EpsilonNFA, second_automaton: EpsilonNFA
+    first_automaton: EpsilonNFA,
+    second_automaton: EpsilonNFA,
+    mode: IntersectionMode = IntersectionMode.FULL_PRODUCT,
 ) -> EpsilonNFA:
     """Calculates intersection of two automatons using Kronecker multiplication of their bool matrices
 
@@ -92,6 +212,8 @@ def intersect_automatons_kron(
         First graph
     second_automaton : EpsilonNFA
         Second graph
+    mode : IntersectionMode
+        Whether all pairs of states are built or only useful ones
 
     Returns
     -------
@@ -100,5 +222,8 @@ def intersect_automatons_kron(
     """
     first_graph_mtx = matrix_utils.BoolMatrixAutomaton.from_nfa(first_automaton)
     second_graph_mtx = matrix_utils.BoolMatrixAutomaton.from_nfa(second_automaton)
-    intersected = first_graph_mtx & second_graph_mtx
+    if mode == IntersectionMode.TRIMMED_PRODUCT:
+        intersected = first_graph_mtx.intersect_trimmed(second_graph_mtx)
+    else:
+        intersected = first_graph_mtx & second_graph_mtx
     return intersected.to_nfa()
@@ -1,13 +1,39 @@
-from typing import Union
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Set, Tuple, Union
 
-from pyformlang.cfg import CFG, Variable
+import numpy as np
+from pyformlang.cfg import CFG, Variable, Terminal, Production
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 from typing.io import IO
 
 __all__ = [
     "cfg_to_wcnf",
+    "WcnfStats",
+    "cfg_to_compact_wcnf",
     "cfg_from_file",
 ]
 
+# Production over integer symbol ids: head variable and body.
+# Variables have non-negative ids, terminal t has id -1 - t
+_IntProduction = Tuple[int, Tuple[int, ...]]
+
+
+class WcnfStats(NamedTuple):
+    """Class represents statistics of conversion to Weak Chomsky Normal Form
+
+    Attributes
+    ----------
+
+    productions_before : int
+        Number of productions of the original grammar
+    productions_after : int
+        Number of productions of the converted grammar
+    """
+
+    productions_before: int
+    productions_after: int
+
 
 def cfg_to_wcnf(cfg: CFG) -> CFG:
     """Converts CFG to Weak Chomsky Normal Form
@@ -33,6 +59,250 @@ def cfg_to_wcnf(cfg: CFG) -> CFG:
     return CFG(start_symbol=cleared.start_symbol, productions=set(productions))
 
 
+def cfg_to_compact_wcnf(cfg: CFG) -> Tuple[CFG, WcnfStats]:
+    """Converts CFG to Weak Chomsky Normal Form over integer symbol ids
+
+    Useless symbols are removed and unit productions are eliminated
+    with worklists. Variables forming cycles of unit productions derive
+    the same words, so they are merged before elimination. Terminals
+    of long bodies are replaced with one shared variable per terminal.
+    Long bodies are split into binary productions where equal suffixes
+    of bodies share one variable. The result accepts the same words
+    as cfg_to_wcnf but usually has fewer productions
+
+    Parameters
+    ----------
+    cfg : CFG
+        Context free grammar
+
+    Returns
+    -------
+    conversion : Tuple[CFG, WcnfStats]
+        Converted cfg and the number of productions before and after conversion
+    """
+    variable_to_id: Dict[Variable, int] = {cfg.start_symbol: 0}
+    terminal_to_id: Dict[Terminal, int] = dict()
+    productions = set()
+    for production in cfg.productions:
+        head = variable_to_id.setdefault(production.head, len(variable_to_id))
+        body = tuple(
+            (
+                variable_to_id.setdefault(symbol, len(variable_to_id))
+                if isinstance(symbol, Variable)
+                else -1 - terminal_to_id.setdefault(symbol, len(terminal_to_id))
+            )
+            for symbol in production.body
+            if isinstance(symbol, (Variable, Terminal))
+        )
+        productions.add((head, body))
+
+    productions = _remove_useless_productions(productions, start=0)
+    productions = _merge_unit_cycles(productions, variables_num=len(variable_to_id))
+    productions = _remove_useless_productions(
+        _eliminate_unit_productions(productions), start=0
+    )
+
+    variables = list(variable_to_id)
+    terminals = list(terminal_to_id)
+    names = {variable.value for variable in variables}
+
+    def new_variable(name: str) -> int:
+        while name in names:
+            name += "#"
+        names.add(name)
+        variables.append(Variable(name))
+        return len(variables) - 1
+
+    terminal_variables: Dict[int, int] = dict()
+    suffix_variables: Dict[Tuple[int, ...], int] = dict()
+    wcnf_productions = set()
+    for head, body in productions:
+        if len(body) >= 2:
+            lifted = []
+            for symbol in body:
+                if symbol < 0 and symbol not in terminal_variables:
+                    terminal_variables[symbol] = new_variable(
+                        f"{terminals[-1 - symbol].value}#CNF#"
+                    )
+                    wcnf_productions.add((terminal_variables[symbol], (symbol,)))
+                lifted.append(terminal_variables[symbol] if symbol < 0 else symbol)
+            body = tuple(lifted)
+        while len(body) > 2:
+            suffix = body[1:]
+            # Productions of a shared suffix have been added with its variable
+            is_new_suffix = suffix not in suffix_variables
+            if is_new_suffix:
+                suffix_variables[suffix] = new_variable(
+                    f"C#CNF#{len(suffix_variables) + 1}"
+                )
+            wcnf_productions.add((head, (body[0], suffix_variables[suffix])))
+            if not is_new_suffix:
+                break
+            head, body = suffix_variables[suffix], suffix
+        else:
+            wcnf_productions.add((head, body))
+
+    wcnf = CFG(
+        start_symbol=cfg.start_symbol,
+        productions={
+            Production(
+                variables[head],
+                [
+                    variables[symbol] if symbol >= 0 else terminals[-1 - symbol]
+                    for symbol in body
+                ],
+            )
+            for head, body in wcnf_productions
+        },
+    )
+    return wcnf, WcnfStats(
+        productions_before=len(cfg.productions),
+        productions_after=len(wcnf_productions),
+    )
+
+
+def _remove_useless_productions(
+    productions: Set[_IntProduction], start: int
+) -> Set[_IntProduction]:
+    """Removes productions with non-generating or unreachable variables
+
+    A variable is generating if it derives a word of terminals, generating
+    variables are found with a worklist of productions counting occurrences
+    of variables not yet known to be generating
+
+    Parameters
+    ----------
+    productions : Set[_IntProduction]
+        Productions over integer symbol ids
+    start : int
+        Id of the start symbol
+
+    Returns
+    -------
+    productions : Set[_IntProduction]
+        Productions with generating variables reachable from the start symbol
+    """
+    productions = list(productions)
+    remaining = [sum(symbol >= 0 for symbol in body) for _, body in productions]
+    occurrences = defaultdict(list)
+    for i, (_, body) in enumerate(productions):
+        for symbol in body:
+            if symbol >= 0:
+                occurrences[symbol].append(i)
+    worklist = [head for (head, _), count in zip(productions, remaining) if not count]
+    generating = set()
+    while worklist:
+        variable = worklist.pop()
+        if variable in generating:
+            continue
+        generating.add(variable)
+        for i in occurrences[variable]:
+            remaining[i] -= 1
+            if not remaining[i]:
+                worklist.append(productions[i][0])
+
+    bodies_by_head = defaultdict(list)
+    for head, body in productions:
+        if head in generating and all(s < 0 or s in generating for s in body):
+            bodies_by_head[head].append(body)
+    if start not in generating:
+        return set()
+    reachable, worklist = {start}, [start]
+    while worklist:
+        for body in bodies_by_head[worklist.pop()]:
+            for symbol in body:
+                if symbol >= 0 and symbol not in reachable:
+                    reachable.add(symbol)
+                    worklist.append(symbol)
+    return {(head, body) for head in reachable for body in bodies_by_head[head]}
+
+
+def _merge_unit_cycles(
+    productions: Set[_IntProduction], variables_num: int
+) -> Set[_IntProduction]:
+    """Replaces variables of each strongly connected component of the graph
+    of unit productions with the variable with the least id
+
+    The start symbol has id 0, so it is kept
+
+    Parameters
+    ----------
+    productions : Set[_IntProduction]
+        Productions over integer symbol ids
+    variables_num : int
+        Number of variables
+
+    Returns
+    -------
+    productions : Set[_IntProduction]
+        Productions without unit cycles
+    """
+    units = [
+        (head, body[0])
+        for head, body in productions
+        if len(body) == 1 and body[0] >= 0 and body[0] != head
+    ]
+    if not units:
+        return productions
+    heads, targets = zip(*units)
+    _, components = connected_components(
+        csr_matrix(
+            (np.ones(len(units), dtype=bool), (heads, targets)),
+            shape=(variables_num, variables_num),
+        ),
+        directed=True,
+        connection="strong",
+    )
+    representatives = np.full(components.max() + 1, variables_num)
+    np.minimum.at(representatives, components, np.arange(variables_num))
+    representative_of = representatives[components].tolist()
+
+    merged = set()
+    for head, body in productions:
+        head = representative_of[head]
+        body = tuple(representative_of[s] if s >= 0 else s for s in body)
+        if body != (head,):
+            merged.add((head, body))
+    return merged
+
+
+def _eliminate_unit_productions(
+    productions: Set[_IntProduction],
+) -> Set[_IntProduction]:
+    """Replaces productions of the form A -> B with productions A -> w
+    for all non-unit productions B -> w of variables reachable from A by unit ones
+
+    Parameters
+    ----------
+    productions : Set[_IntProduction]
+        Productions over integer symbol ids
+
+    Returns
+    -------
+    productions : Set[_IntProduction]
+        Productions without unit ones
+    """
+    unit_targets = defaultdict(set)
+    bodies_by_head = defaultdict(set)
+    for head, body in productions:
+        if len(body) == 1 and body[0] >= 0:
+            unit_targets[head].add(body[0])
+        else:
+            bodies_by_head[head].add(body)
+
+    result = set()
+    for head in {head for head, _ in productions}:
+        reached, worklist = {head}, [head]
+        while worklist:
+            for target in unit_targets[worklist.pop()]:
+                if target not in reached:
+                    reached.add(target)
+                    worklist.append(target)
+        for variable in reached:
+            result.update((head, body) for body in bodies_by_head[variable])
+    return result
+
+
 def cfg_from_file(
     file: Union[str, IO], start_symbol: Union[str, Variable] = Variable("S")
 ) -> CFG:
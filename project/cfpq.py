@@ -1,19 +1,25 @@
 from collections import defaultdict, deque
 from enum import Enum, auto
 from typing import Tuple, Set, Any, Union, Collection, Dict, List
+
+import numpy as np
 from networkx import MultiDiGraph
 from pyformlang.cfg import CFG, Variable, Terminal, Production
-from pyformlang.finite_automaton import EpsilonNFA
-from scipy.sparse import dok_matrix, eye
+from scipy.sparse import csr_matrix, eye
 
 from project.ecfg import ECFG
+from project.rsm import CompactRSM
 from project.matrix_utils import BoolMatrixAutomaton
 from project.graph_utils import load_graph
-from project.cfg_utils import cfg_to_wcnf, cfg_from_file
+from project.cfg_utils import cfg_to_compact_wcnf, cfg_from_file
+from project.compiled_grammar import CompiledGrammar
+from project.matrix_chain import matrix_stats, plan_product_sum
+from project.semiring import Semiring, BooleanSemiring, BOOLEAN_SEMIRING
 
 __all__ = [
     "CFPQAlgorithm",
     "cfpq",
+    "cfpq_semiring",
 ]
 
 
@@ -39,7 +45,7 @@ class CFPQAlgorithm(Enum):
 def cfpq(
     algo: CFPQAlgorithm,
     graph: Union[str, MultiDiGraph],
-    cfg: Union[str, CFG],
+    cfg: Union[str, CFG, CompiledGrammar],
     start_nodes: Set[Any] = None,
     final_nodes: Set[Any] = None,
     start_symbol: Variable = Variable("S"),
@@ -50,8 +56,9 @@ def cfpq(
       ----------
       algo : CFPQAlgorithm
           The algorithm that will be used for CFPQ
-      cfg : CFG
+      cfg : Union[str, CFG, CompiledGrammar]
           Path to file containing context-free grammar or Context-free grammar itself
+          or the grammar compiled in advance, e.g. loaded by CompiledGrammar.load
 
       graph : Union[str, MultiDiGraph]
           Graph name from cfpq-data dataset or Graph itself
@@ -72,9 +79,7 @@ def cfpq(
     """
     if isinstance(graph, str):
         graph = load_graph(graph)
-    if isinstance(cfg, str):
-        cfg = cfg_from_file(cfg)
-    cfg._start_symbol = start_symbol
+    cfg = _prepare_grammar(cfg, start_symbol)
     if not start_nodes:
         start_nodes = graph.nodes
     if not final_nodes:
@@ -98,7 +103,63 @@ def cfpq(
     }
 
 
-def _hellings(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
+def cfpq_semiring(
+    graph: Union[str, MultiDiGraph],
+    cfg: Union[str, CFG, CompiledGrammar],
+    semiring: Semiring,
+    start_nodes: Set[Any] = None,
+    final_nodes: Set[Any] = None,
+    start_symbol: Variable = Variable("S"),
+) -> Dict[Tuple[Any, Any], Any]:
+    """Executes context-free query on graph using Matrix algorithm over semiring
+
+    Parameters
+      ----------
+      graph : Union[str, MultiDiGraph]
+          Graph name from cfpq-data dataset or Graph itself
+
+      cfg : Union[str, CFG, CompiledGrammar]
+          Path to file containing context-free grammar or Context-free grammar itself
+          or the grammar compiled in advance, e.g. loaded by CompiledGrammar.load
+
+      semiring : Semiring
+          Semiring in which values of paths are calculated, e.g. CountingSemiring
+          gives the number of derivations and TROPICAL_SEMIRING
+          gives the length of the shortest path
+
+      start_nodes: Set[Any]
+          Set of start nodes of the graph. If parameter is not specified then all nodes are treated as start
+
+      final_nodes: Set[Any]
+          Set of final nodes of the graph. If parameter is not specified then all nodes are treated as final
+
+      start_symbol: Variable
+          Non-terminal that will be treated as start symbol in the given grammar
+
+      Returns
+      -------
+      result: Dict[Tuple[Any, Any], Any]
+          Mapping from pairs of vertices between which there is a path
+          with specified constraints to the value of such paths
+    """
+    if isinstance(graph, str):
+        graph = load_graph(graph)
+    cfg = _prepare_grammar(cfg, start_symbol)
+    if not start_nodes:
+        start_nodes = graph.nodes
+    if not final_nodes:
+        final_nodes = graph.nodes
+
+    return {
+        (i, j): value
+        for (i, n, j), value in _matrix_semiring(cfg, graph, semiring).items()
+        if start_symbol == n and i in start_nodes and j in final_nodes
+    }
+
+
+def _hellings(
+    cfg: Union[CFG, CompiledGrammar], graph: MultiDiGraph
+) -> Set[Tuple[Any, Variable, Any]]:
     """Runs Hellings algorithm on given context-free grammar and graph
     in order to get triples, where the first element is the first vertex,
     the second element is a non-terminal, and the third element is the second vertex
@@ -107,8 +168,8 @@ def _hellings(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
 
       Parameters
       ----------
-      cfg : CFG
-          Context-free grammar
+      cfg : Union[CFG, CompiledGrammar]
+          Context-free grammar or the grammar compiled in advance
 
       graph : MultiDiGraph
           Graph
@@ -123,7 +184,7 @@ def _hellings(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
     if not n:
         return set()
 
-    wcnf = cfg_to_wcnf(cfg)
+    wcnf = _wcnf_of(cfg)
     eps_nonterm, term_prods, two_nonterm_prods = _convert_wcnf_prods(wcnf.productions)
 
     by_eps = {(i, n, i) for i in graph.nodes for n in eps_nonterm}
@@ -158,7 +219,9 @@ def _hellings(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
     return result
 
 
-def _matrix(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
+def _matrix(
+    cfg: Union[CFG, CompiledGrammar], graph: MultiDiGraph
+) -> Set[Tuple[Any, Variable, Any]]:
     """Runs Matrix algorithm on given context-free grammar and graph
     in order to get triples, where the first element is the first vertex,
     the second element is a non-terminal, and the third element is the second vertex
@@ -167,8 +230,8 @@ def _matrix(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
 
       Parameters
       ----------
-      cfg : CFG
-          Context-free grammar
+      cfg : Union[CFG, CompiledGrammar]
+          Context-free grammar or the grammar compiled in advance
 
       graph : MultiDiGraph
           Graph
@@ -179,50 +242,130 @@ def _matrix(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
           Triples of vertices between which there is a path with specified constraints
           and a non-terminal from which the path is derived
     """
+    return set(_matrix_semiring(cfg, graph, BOOLEAN_SEMIRING))
+
+
+def _matrix_semiring(
+    cfg: Union[CFG, CompiledGrammar], graph: MultiDiGraph, semiring: Semiring
+) -> Dict[Tuple[Any, Variable, Any], Any]:
+    """Runs Matrix algorithm over semiring on given context-free grammar and graph
+    in order to get triples, where the first element is the first vertex,
+    the second element is a non-terminal, and the third element is the second vertex
+    for which there is a path in the graph between these vertices derived from this non-terminal
+    from given context-free grammar, together with the value of such paths
+
+      Parameters
+      ----------
+      cfg : Union[CFG, CompiledGrammar]
+          Context-free grammar or the grammar compiled in advance
+
+      graph : MultiDiGraph
+          Graph
+
+      semiring : Semiring
+          Semiring in which values of paths are calculated
+
+      Returns
+      -------
+      result: Dict[Tuple[Any, Variable, Any], Any]
+          Mapping from triples of vertices between which there is a path
+          with specified constraints and a non-terminal from which the path is derived
+          to the value of paths, summed over derivations in WCNF of the grammar
+    """
     n = graph.number_of_nodes()
     if not n:
-        return set()
+        return dict()
 
-    nodes = list(graph.nodes)
-    node_to_idx = {node: idx for idx, node in enumerate(nodes)}
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(graph, fold_epsilons=False)
+    idx_to_node = {
+        idx: state.value for state, idx in graph_bool_mtx.state_to_idx.items()
+    }
 
-    wcnf = cfg_to_wcnf(cfg)
+    wcnf = _wcnf_of(cfg)
     eps_nonterm, term_prods, two_nonterm_prods = _convert_wcnf_prods(wcnf.productions)
 
-    nonterm_to_mtx = {
-        nonterm: dok_matrix((n, n), dtype=bool) for nonterm in wcnf.variables
+    nonterm_to_base_mtx = {
+        nonterm: semiring.zeros((n, n)) for nonterm in wcnf.variables
     }
 
-    for i in range(n):
-        for nonterm in eps_nonterm:
-            nonterm_to_mtx[nonterm][i, i] = True
-
-    for i_node, j_node, label in graph.edges(data="label"):
-        i, j = node_to_idx[i_node], node_to_idx[j_node]
-        for nonterm in {
-            n for n, terms in term_prods.items() if Terminal(label) in terms
-        }:
-            nonterm_to_mtx[nonterm][i, j] = True
-
+    for nonterm in eps_nonterm:
+        nonterm_to_base_mtx[nonterm] = semiring.add(
+            nonterm_to_base_mtx[nonterm], semiring.identity(n)
+        )
+
+    for nonterm, terms in term_prods.items():
+        for term in terms:
+            if term.value in graph_bool_mtx.b_mtx:
+                nonterm_to_base_mtx[nonterm] = semiring.add(
+                    nonterm_to_base_mtx[nonterm],
+                    semiring.lift(graph_bool_mtx.b_mtx[term.value]),
+                )
+
+    nonterm_to_mtx = dict(nonterm_to_base_mtx)
+
+    # Boolean matrices only grow, so comparing nnz is enough to detect the fixpoint,
+    # other semirings are not necessarily idempotent, so the sums are recalculated
+    is_boolean = isinstance(semiring, BooleanSemiring)
+    # Statistics for the planner are kept up to date with one matrix per update
+    nonterm_to_stats = {n: matrix_stats(mtx) for n, mtx in nonterm_to_mtx.items()}
     while True:
         changed = False
         for nonterm, two_nonterms in two_nonterm_prods.items():
-            old_nnz = nonterm_to_mtx[nonterm].nnz
-            nonterm_to_mtx[nonterm] += sum(
-                nonterm_to_mtx[n1] @ nonterm_to_mtx[n2] for n1, n2 in two_nonterms
+            old_mtx = nonterm_to_mtx[nonterm]
+            new_mtx = old_mtx if semiring.idempotent else nonterm_to_base_mtx[nonterm]
+            # Products with a common factor are grouped when it is estimated cheaper
+            for lefts, rights in plan_product_sum(
+                pairs=list(two_nonterms),
+                stats=nonterm_to_stats,
+            ):
+                new_mtx = semiring.add(
+                    new_mtx,
+                    semiring.mul(
+                        _semiring_sum(semiring, [nonterm_to_mtx[n] for n in lefts]),
+                        _semiring_sum(semiring, [nonterm_to_mtx[n] for n in rights]),
+                    ),
+                )
+            nonterm_to_mtx[nonterm] = new_mtx
+            nonterm_to_stats[nonterm] = matrix_stats(new_mtx)
+            changed |= (
+                old_mtx.nnz != new_mtx.nnz
+                if is_boolean
+                else not semiring.equal(old_mtx, new_mtx)
             )
-            changed |= old_nnz != nonterm_to_mtx[nonterm].nnz
         if not changed:
             break
 
-    return set(
-        (nodes[i], nonterm, nodes[j])
+    return {
+        (idx_to_node[i], nonterm, idx_to_node[j]): value
         for nonterm, mtx in nonterm_to_mtx.items()
-        for i, j in zip(*mtx.nonzero())
-    )
+        for i, j, value in semiring.entries(mtx)
+    }
+
 
+def _semiring_sum(semiring: Semiring, matrices: List[csr_matrix]) -> csr_matrix:
+    """Calculates elementwise sum of matrices in semiring
 
-def _tensor(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
+    Parameters
+    ----------
+    semiring : Semiring
+        Semiring in which the sum is calculated
+    matrices : List[csr_matrix]
+        Summands, the list must not be empty
+
+    Returns
+    -------
+    sum : csr_matrix
+        Elementwise sum of matrices
+    """
+    result = matrices[0]
+    for mtx in matrices[1:]:
+        result = semiring.add(result, mtx)
+    return result
+
+
+def _tensor(
+    cfg: Union[CFG, CompiledGrammar], graph: MultiDiGraph
+) -> Set[Tuple[Any, Variable, Any]]:
     """Runs Tensor algorithm on given context-free grammar and graph
     in order to get triples, where the first element is the first vertex,
     the second element is a non-terminal, and the third element is the second vertex
@@ -231,8 +374,8 @@ def _tensor(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
 
       Parameters
       ----------
-      cfg : CFG
-          Context-free grammar
+      cfg : Union[CFG, CompiledGrammar]
+          Context-free grammar or the grammar compiled in advance
 
       graph : MultiDiGraph
           Graph
@@ -243,41 +386,102 @@ def _tensor(cfg: CFG, graph: MultiDiGraph) -> Set[Tuple[Any, Variable, Any]]:
           Triples of vertices between which there is a path with specified constraints
           and a non-terminal from which the path is derived
     """
-    cfg_bool_mtx = BoolMatrixAutomaton.from_rsm(ECFG.from_cfg(cfg).to_rsm())
-    cfg_idx_to_state = {i: s for s, i in cfg_bool_mtx.state_to_idx.items()}
-    graph_bool_mtx = BoolMatrixAutomaton.from_nfa(EpsilonNFA.from_networkx(graph))
+    if isinstance(cfg, CompiledGrammar):
+        rsm, nullable_symbols = cfg.rsm, cfg.nullable_symbols
+    else:
+        rsm, nullable_symbols = ECFG.from_cfg(cfg).to_rsm(), cfg.get_nullable_symbols()
+    compact_rsm = CompactRSM.from_rsm(rsm)
+    box_of_states = compact_rsm.box_of_states()
+    cfg_bool_mtx = BoolMatrixAutomaton.from_compact_rsm(compact_rsm)
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(graph, fold_epsilons=False)
     graph_bool_mtx_states_sz = len(graph_bool_mtx.state_to_idx)
     graph_idx_to_state = {i: s for s, i in graph_bool_mtx.state_to_idx.items()}
-    self_loop_mtx = eye(len(graph_bool_mtx.state_to_idx), dtype=bool).todok()
-    for nonterm in cfg.get_nullable_symbols():
+    self_loop_mtx = eye(len(graph_bool_mtx.state_to_idx), dtype=bool, format="csr")
+    for nonterm in nullable_symbols:
         graph_bool_mtx.b_mtx[nonterm.value] += self_loop_mtx
     last_tc_sz = 0
     while True:
         intersection = cfg_bool_mtx & graph_bool_mtx
-        tc_indices = list(zip(*intersection.transitive_closure().nonzero()))
-        if len(tc_indices) == last_tc_sz:
+        tc_rows, tc_cols = intersection.transitive_closure().nonzero()
+        if len(tc_rows) == last_tc_sz:
             break
-        last_tc_sz = len(tc_indices)
-        for i, j in tc_indices:
-            cfg_i, cfg_j = i // graph_bool_mtx_states_sz, j // graph_bool_mtx_states_sz
-            graph_i, graph_j = (
-                i % graph_bool_mtx_states_sz,
-                j % graph_bool_mtx_states_sz,
+        last_tc_sz = len(tc_rows)
+        cfg_i, graph_i = np.divmod(tc_rows, graph_bool_mtx_states_sz)
+        cfg_j, graph_j = np.divmod(tc_cols, graph_bool_mtx_states_sz)
+        # Transitions do not leave boxes, so both states belong to the same box
+        is_derived = compact_rsm.start_states[cfg_i] & compact_rsm.final_states[cfg_j]
+        boxes = box_of_states[cfg_i[is_derived]]
+        graph_i, graph_j = graph_i[is_derived], graph_j[is_derived]
+        for box in np.unique(boxes):
+            is_box = boxes == box
+            graph_bool_mtx.b_mtx[compact_rsm.boxes[box]] += csr_matrix(
+                (
+                    np.ones(np.count_nonzero(is_box), dtype=bool),
+                    (graph_i[is_box], graph_j[is_box]),
+                ),
+                shape=(graph_bool_mtx_states_sz, graph_bool_mtx_states_sz),
             )
-            state_from, state_to = cfg_idx_to_state[cfg_i], cfg_idx_to_state[cfg_j]
-            nonterm, _ = state_from.value
-            if (
-                state_from in cfg_bool_mtx.start_states
-                and state_to in cfg_bool_mtx.final_states
-            ):
-                graph_bool_mtx.b_mtx[nonterm][graph_i, graph_j] = True
     return {
-        (graph_idx_to_state[graph_i], nonterm, graph_idx_to_state[graph_j])
+        (graph_idx_to_state[graph_i].value, nonterm, graph_idx_to_state[graph_j].value)
         for nonterm, mtx in graph_bool_mtx.b_mtx.items()
         for graph_i, graph_j in zip(*mtx.nonzero())
     }
 
 
+def _prepare_grammar(
+    cfg: Union[str, CFG, CompiledGrammar], start_symbol: Variable
+) -> Union[CFG, CompiledGrammar]:
+    """Loads grammar and sets its start symbol
+
+    Parameters
+    ----------
+    cfg : Union[str, CFG, CompiledGrammar]
+        Path to file containing context-free grammar, the grammar itself
+        or the compiled grammar
+    start_symbol : Variable
+        Non-terminal that will be treated as start symbol
+
+    Returns
+    -------
+    cfg : Union[CFG, CompiledGrammar]
+        Grammar with the start symbol
+    """
+    if isinstance(cfg, CompiledGrammar):
+        # Useless symbols are removed with respect to the start symbol,
+        # so the grammar cannot be recompiled for another one
+        if cfg.start_symbol != start_symbol:
+            raise ValueError(
+                f"Grammar is compiled for start symbol {cfg.start_symbol}"
+                f" instead of {start_symbol}"
+            )
+        return cfg
+    if isinstance(cfg, str):
+        cfg = cfg_from_file(cfg)
+    cfg._start_symbol = start_symbol
+    return cfg
+
+
+def _wcnf_of(cfg: Union[CFG, CompiledGrammar]) -> CFG:
+    """Returns grammar in Weak Chomsky Normal Form
+
+    Parameters
+    ----------
+    cfg : Union[CFG, CompiledGrammar]
+        Context-free grammar or the grammar compiled in advance
+
+    Returns
+    -------
+    wcnf : CFG
+        Converted grammar or WCNF stored in the compiled grammar
+    """
+    if not isinstance(cfg, CompiledGrammar):
+        wcnf, _ = cfg_to_compact_wcnf(cfg)
+        return wcnf
+    if cfg.wcnf is None:
+        raise ValueError("Grammar is compiled without WCNF")
+    return cfg.wcnf
+
+
 def _convert_wcnf_prods(
     prods: Collection[Production],
 ) -> Tuple[
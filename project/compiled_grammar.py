@@ -0,0 +1,321 @@
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Set, Union
+
+import numpy as np
+from pyformlang.cfg import CFG, Production, Terminal, Variable
+from pyformlang.finite_automaton import DeterministicFiniteAutomaton, State, Symbol
+
+from project.cfg_utils import cfg_to_compact_wcnf
+from project.ecfg import ECFG
+from project.rsm import RSM
+
+__all__ = [
+    "CompiledGrammar",
+]
+
+# Version of file format, files of other versions are rejected
+_FORMAT_VERSION = 1
+
+
+class CompiledGrammar(NamedTuple):
+    """Class represents grammar compiled to the forms used by CFPQ algorithms,
+    it may be saved to compact binary file and loaded without recompilation
+
+    Attributes
+    ----------
+
+    start_symbol : Variable
+        Start symbol of the grammar
+    wcnf : Optional[CFG]
+        Grammar in Weak Chomsky Normal Form used by Hellings and Matrix algorithms.
+        It is None if the grammar is compiled from ECFG
+    rsm : RSM
+        Minimized recursive state machine used by Tensor algorithm
+    nullable_symbols : Set[Variable]
+        Non-terminals deriving the empty word
+    """
+
+    start_symbol: Variable
+    wcnf: Optional[CFG]
+    rsm: RSM
+    nullable_symbols: Set[Variable]
+
+    @classmethod
+    def from_cfg(cls, cfg: CFG) -> "CompiledGrammar":
+        """Compiles context free grammar
+
+        Parameters
+        ----------
+        cfg : CFG
+            Context free grammar
+
+        Returns
+        -------
+        compiled_grammar : CompiledGrammar
+            Compiled grammar
+        """
+        wcnf, _ = cfg_to_compact_wcnf(cfg)
+        return cls(
+            start_symbol=cfg.start_symbol,
+            wcnf=wcnf,
+            rsm=ECFG.from_cfg(cfg).to_rsm().minimize(),
+            nullable_symbols=set(cfg.get_nullable_symbols()),
+        )
+
+    @classmethod
+    def from_ecfg(cls, ecfg: ECFG) -> "CompiledGrammar":
+        """Compiles extended context free grammar, only its RSM is built
+
+        Parameters
+        ----------
+        ecfg : ECFG
+            Extended context free grammar
+
+        Returns
+        -------
+        compiled_grammar : CompiledGrammar
+            Compiled grammar without WCNF
+        """
+        rsm = ecfg.to_rsm().minimize()
+        return cls(
+            start_symbol=ecfg.start_symbol,
+            wcnf=None,
+            rsm=rsm,
+            nullable_symbols=_nullable_boxes(rsm),
+        )
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Saves the grammar to npz file
+
+        Symbols are replaced with their indices in the symbol table,
+        WCNF is stored as arrays of heads and bodies of productions
+        and each box of RSM as arrays of its transitions, start and final states.
+        Names of symbols are stored as JSON, so they must be JSON serializable
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        None
+        """
+        variables: Dict[Variable, int] = dict()
+        terminals: Dict[Terminal, int] = dict()
+        labels: Dict[Symbol, int] = dict()
+
+        def variable_id(variable: Variable) -> int:
+            return variables.setdefault(variable, len(variables))
+
+        def symbol_id(symbol) -> int:
+            # Terminals are encoded as negative numbers, so bodies are stored in one array
+            if isinstance(symbol, Variable):
+                return variable_id(symbol)
+            return -1 - terminals.setdefault(symbol, len(terminals))
+
+        arrays = dict()
+        variable_id(self.start_symbol)
+        if self.wcnf is not None:
+            productions = sorted(self.wcnf.productions, key=str)
+            bodies = np.zeros((len(productions), 2), dtype=np.int64)
+            for i, production in enumerate(productions):
+                bodies[i, : len(production.body)] = [
+                    symbol_id(symbol) for symbol in production.body
+                ]
+            arrays["wcnf_heads"] = np.array(
+                [variable_id(production.head) for production in productions],
+                dtype=np.int64,
+            )
+            arrays["wcnf_body_lengths"] = np.array(
+                [len(production.body) for production in productions], dtype=np.int64
+            )
+            arrays["wcnf_bodies"] = bodies
+
+        boxes, state_nums, starts, finals, transitions = [], [], [], [], []
+        for variable, dfa in self.rsm.boxes.items():
+            state_to_idx = {
+                state: idx
+                for idx, state in enumerate(sorted(dfa.states, key=lambda s: s.value))
+            }
+            boxes.append(variable_id(variable))
+            state_nums.append(len(state_to_idx))
+            starts.append(
+                state_to_idx[dfa.start_state] if dfa.start_state is not None else -1
+            )
+            finals.append(
+                np.array(
+                    sorted(state_to_idx[state] for state in dfa.final_states),
+                    dtype=np.int64,
+                )
+            )
+            transitions.append(
+                np.array(
+                    [
+                        (
+                            state_to_idx[state_from],
+                            labels.setdefault(label, len(labels)),
+                            state_to_idx[state_to],
+                        )
+                        for state_from, label, state_to in sorted(dfa, key=str)
+                    ],
+                    dtype=np.int64,
+                ).reshape(-1, 3)
+            )
+        arrays["rsm_boxes"] = np.array(boxes, dtype=np.int64)
+        arrays["rsm_state_nums"] = np.array(state_nums, dtype=np.int64)
+        arrays["rsm_starts"] = np.array(starts, dtype=np.int64)
+        arrays["rsm_final_nums"] = np.array([len(f) for f in finals], dtype=np.int64)
+        arrays["rsm_finals"] = np.concatenate(finals or [np.zeros(0, np.int64)])
+        arrays["rsm_transition_nums"] = np.array(
+            [len(t) for t in transitions], dtype=np.int64
+        )
+        arrays["rsm_transitions"] = np.concatenate(
+            transitions or [np.zeros((0, 3), np.int64)]
+        )
+        arrays["nullable_symbols"] = np.array(
+            [variable_id(variable) for variable in self.nullable_symbols],
+            dtype=np.int64,
+        )
+
+        metadata = {
+            "version": _FORMAT_VERSION,
+            "has_wcnf": self.wcnf is not None,
+            "variables": [variable.value for variable in variables],
+            "terminals": [terminal.value for terminal in terminals],
+            "labels": [label.value for label in labels],
+        }
+        arrays["metadata"] = np.array(json.dumps(metadata))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "CompiledGrammar":
+        """Loads the grammar from npz file created by save
+
+        States of boxes of the loaded RSM are numbered in the order of states
+        of the saved RSM, so BoolMatrixAutomaton.from_rsm orders them the same way
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        compiled_grammar : CompiledGrammar
+            Loaded grammar
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(str(arrays["metadata"]))
+            if metadata["version"] != _FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported compiled grammar version {metadata['version']}"
+                )
+            variables = [Variable(value) for value in metadata["variables"]]
+            terminals = [Terminal(value) for value in metadata["terminals"]]
+            labels = [Symbol(value) for value in metadata["labels"]]
+
+            def symbol_of(symbol_id: int):
+                return (
+                    variables[symbol_id]
+                    if symbol_id >= 0
+                    else terminals[-1 - symbol_id]
+                )
+
+            wcnf = None
+            if metadata["has_wcnf"]:
+                wcnf = CFG(
+                    start_symbol=variables[0],
+                    productions={
+                        Production(
+                            variables[head],
+                            [symbol_of(symbol_id) for symbol_id in body[:length]],
+                        )
+                        for head, length, body in zip(
+                            arrays["wcnf_heads"].tolist(),
+                            arrays["wcnf_body_lengths"].tolist(),
+                            arrays["wcnf_bodies"].tolist(),
+                        )
+                    },
+                )
+
+            final_bounds = np.cumsum(np.concatenate(([0], arrays["rsm_final_nums"])))
+            transition_bounds = np.cumsum(
+                np.concatenate(([0], arrays["rsm_transition_nums"]))
+            )
+            finals, transitions = arrays["rsm_finals"], arrays["rsm_transitions"]
+            boxes = dict()
+            for i, (box, states_num, start) in enumerate(
+                zip(
+                    arrays["rsm_boxes"].tolist(),
+                    arrays["rsm_state_nums"].tolist(),
+                    arrays["rsm_starts"].tolist(),
+                )
+            ):
+                dfa = DeterministicFiniteAutomaton(
+                    states={State(idx) for idx in range(states_num)},
+                    start_state=State(start) if start >= 0 else None,
+                    final_states={
+                        State(idx)
+                        for idx in finals[
+                            final_bounds[i] : final_bounds[i + 1]
+                        ].tolist()
+                    },
+                )
+                for state_from, label, state_to in transitions[
+                    transition_bounds[i] : transition_bounds[i + 1]
+                ].tolist():
+                    dfa.add_transition(
+                        State(state_from), labels[label], State(state_to)
+                    )
+                boxes[variables[box]] = dfa
+
+            return cls(
+                start_symbol=variables[0],
+                wcnf=wcnf,
+                rsm=RSM(start_symbol=variables[0], boxes=boxes),
+                nullable_symbols={
+                    variables[idx] for idx in arrays["nullable_symbols"].tolist()
+                },
+            )
+
+
+def _nullable_boxes(rsm: RSM) -> Set[Variable]:
+    """Finds boxes of RSM accepting the empty word
+
+    A box accepts the empty word if a final state is reachable
+    from its start state by transitions labeled with such boxes
+
+    Parameters
+    ----------
+    rsm : RSM
+        Recursive state machine
+
+    Returns
+    -------
+    nullable_symbols : Set[Variable]
+        Non-terminals of boxes accepting the empty word
+    """
+    nullable: Set[Variable] = set()
+    while True:
+        nullable_values = {variable.value for variable in nullable}
+        new_nullable = set(nullable)
+        for variable, dfa in rsm.boxes.items():
+            if variable in nullable or dfa.start_state is None:
+                continue
+            transitions = dfa.to_dict()
+            visited: List[State] = [dfa.start_state]
+            reached = {dfa.start_state}
+            while visited:
+                state = visited.pop()
+                for label, state_to in transitions.get(state, dict()).items():
+                    if label.value in nullable_values and state_to not in reached:
+                        reached.add(state_to)
+                        visited.append(state_to)
+            if reached & dfa.final_states:
+                new_nullable.add(variable)
+        if new_nullable == nullable:
+            return nullable
+        nullable = new_nullable
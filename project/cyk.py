@@ -1,9 +1,22 @@
-from pyformlang.cfg import CFG
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from pyformlang.cfg import CFG, Terminal
+
+from project.parse_forest import IntermediateNode, ParseForest, SymbolNode
 
 __all__ = [
     "cyk",
+    "cyk_bitset",
+    "cyk_parse",
+    "CYKRecognizer",
 ]
 
+# Number of bits of a cell mask looked up in the precomputed tables at once
+_CHUNK_BITS = 8
+
 
 def cyk(s: str, cfg: CFG) -> bool:
     """Determines whether a word belongs to the language generated
@@ -48,3 +61,429 @@ def cyk(s: str, cfg: CFG) -> bool:
                 )
 
     return cfg.start_symbol in dp[0][n - 1]
+
+
+def cyk_bitset(s: str, cfg: CFG) -> bool:
+    """Determines whether a word belongs to the language generated
+    by the given context free grammar using CYK algorithm over bitsets
+
+    Non-terminals of CNF are numbered and each cell of the table is a bitmask
+    of non-terminals. For each left non-terminal the heads of productions
+    firing with any combination of bits of a chunk of the right cell mask
+    are precomputed, so a pair of cells is combined by table lookups
+
+    Parameters
+    ----------
+    s : str
+        Word to be checked
+
+    cfg : CFG
+        Context Free Grammar
+
+    Returns
+    -------
+    result: bool
+        Whether a word belongs to the language generated by the grammar
+    """
+    if not s:
+        return cfg.generate_epsilon()
+    return _accepts(_compile_bitset_cnf(cfg), s)
+
+
+def cyk_parse(s: Sequence[Any], cfg: CFG) -> Optional[ParseForest]:
+    """Builds shared packed parse forest of a word
+    using CYK algorithm generalized to arbitrary productions
+
+    Productions are not converted to CNF, so the forest consists of
+    derivations in the given grammar. Bodies of productions are binarized
+    by intermediate nodes of their prefixes, for each subword it is found
+    which symbols and which prefixes of bodies derive it. The forest has
+    O(|G| * n^2) nodes and O(|G| * n^3) families for the word of length n
+
+    Parameters
+    ----------
+    s : Sequence[Any]
+        Word to be parsed, e.g. a string
+
+    cfg : CFG
+        Context Free Grammar
+
+    Returns
+    -------
+    forest: Optional[ParseForest]
+        Parse forest of the word. None if the word does not belong
+        to the language generated by the grammar
+    """
+    n = len(s)
+    productions = list(cfg.productions)
+    families = defaultdict(dict)
+    # symbols[(i, j)] are non-terminals deriving s[i:j],
+    # prefixes[(i, j)][symbol] are prefixes of bodies deriving s[i:j]
+    # followed by the symbol in the body
+    symbols = defaultdict(set)
+    prefixes = defaultdict(lambda: defaultdict(list))
+
+    def derived_by(i: int, j: int) -> Iterable[Any]:
+        if j == i + 1:
+            yield Terminal(s[i])
+        yield from symbols[(i, j)]
+
+    for length in range(n + 1):
+        for i in range(n - length + 1):
+            j = i + length
+            new_prefixes, new_symbols = [], []
+
+            def add_prefix(node: IntermediateNode, family) -> None:
+                if node not in families:
+                    new_prefixes.append(node)
+                families[node][family] = None
+
+            def add_symbol(node: SymbolNode, family: IntermediateNode) -> None:
+                if node not in families:
+                    new_symbols.append(node)
+                    symbols[(i, j)].add(node.symbol)
+                families[node][family] = None
+
+            if length == 0:
+                # Empty prefixes have no families
+                new_prefixes.extend(
+                    IntermediateNode(production, 0, i, i) for production in productions
+                )
+            for k in range(i + 1, j):
+                for symbol in derived_by(k, j):
+                    for production, dot in prefixes[(i, k)].get(symbol, []):
+                        add_prefix(
+                            IntermediateNode(production, dot + 1, i, j),
+                            (
+                                (
+                                    IntermediateNode(production, dot, i, k)
+                                    if dot
+                                    else None
+                                ),
+                                SymbolNode(symbol, k, j),
+                            ),
+                        )
+            if length == 1:
+                new_symbols.append(SymbolNode(Terminal(s[i]), i, j))
+
+            # Prefixes and symbols of the same subword may derive each other
+            # through nullable symbols, so they are found by fixpoint
+            while new_prefixes or new_symbols:
+                if new_prefixes:
+                    node = new_prefixes.pop()
+                    production, dot = node.production, node.dot
+                    if dot == len(production.body):
+                        add_symbol(SymbolNode(production.head, i, j), node)
+                        continue
+                    symbol = production.body[dot]
+                    prefixes[(i, j)][symbol].append((production, dot))
+                    # The next symbol derives the empty subword
+                    if symbol in symbols[(j, j)]:
+                        add_prefix(
+                            IntermediateNode(production, dot + 1, i, j),
+                            (node if dot else None, SymbolNode(symbol, j, j)),
+                        )
+                else:
+                    node = new_symbols.pop()
+                    # The prefix derives the empty subword
+                    for production, dot in list(prefixes[(i, i)].get(node.symbol, [])):
+                        add_prefix(
+                            IntermediateNode(production, dot + 1, i, j),
+                            (
+                                (
+                                    IntermediateNode(production, dot, i, i)
+                                    if dot
+                                    else None
+                                ),
+                                node,
+                            ),
+                        )
+
+    root = SymbolNode(cfg.start_symbol, 0, n)
+    if root not in families:
+        return None
+    reachable, stack = {root: list(families[root])}, [root]
+    while stack:
+        for family in reachable[stack.pop()]:
+            children = (family,) if isinstance(family, IntermediateNode) else family
+            for child in children:
+                if child is not None and child not in reachable:
+                    reachable[child] = list(families.get(child, dict()))
+                    stack.append(child)
+    return ParseForest(
+        root=root,
+        families={
+            node: node_families
+            for node, node_families in reachable.items()
+            if node_families
+        },
+    )
+
+
+class CYKRecognizer:
+    def __init__(self, cfg: CFG):
+        """Class represents CYK recognizer over bitsets compiled once per grammar,
+        so CNF conversion is not repeated for each word
+
+        Attributes
+        ----------
+
+        cfg : CFG
+            Context Free Grammar
+        """
+        self._generates_epsilon = cfg.generate_epsilon()
+        self._bitset_cnf = _compile_bitset_cnf(cfg)
+
+    def accepts(self, word: str) -> bool:
+        """Determines whether a word belongs to the language of the grammar
+
+        Parameters
+        ----------
+        word : str
+            Word to be checked
+
+        Returns
+        -------
+        result : bool
+            Whether a word belongs to the language generated by the grammar
+        """
+        if not word:
+            return self._generates_epsilon
+        return _accepts(self._bitset_cnf, word)
+
+    def accepts_many(
+        self,
+        words: Iterable[str],
+        processes: Optional[int] = None,
+        chunk_size: int = 1024,
+    ) -> np.ndarray:
+        """Determines whether words belong to the language of the grammar
+
+        Each distinct word is checked once. Distinct words may be split
+        into chunks checked by a pool of processes, the compiled grammar
+        is sent to each process once
+
+        Parameters
+        ----------
+        words : Iterable[str]
+            Words to be checked
+        processes : Optional[int]
+            Number of processes of the pool. If parameter is None or 1
+            then words are checked in the current process
+        chunk_size : int
+            Number of words sent to a process at once
+
+        Returns
+        -------
+        result : np.ndarray
+            Bool array, where i-th element tells whether i-th word
+            belongs to the language
+        """
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be positive")
+        words = list(words)
+        distinct_words = list(dict.fromkeys(words))
+        if processes is None or processes <= 1 or len(distinct_words) <= chunk_size:
+            results = [self.accepts(word) for word in distinct_words]
+        else:
+            chunks = [
+                distinct_words[i : i + chunk_size]
+                for i in range(0, len(distinct_words), chunk_size)
+            ]
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(self,),
+            ) as executor:
+                results = [
+                    result
+                    for chunk_results in executor.map(_accepts_chunk, chunks)
+                    for result in chunk_results
+                ]
+        word_to_result = dict(zip(distinct_words, results))
+        return np.fromiter(
+            (word_to_result[word] for word in words), dtype=bool, count=len(words)
+        )
+
+
+# Recognizer of a worker process of CYKRecognizer.accepts_many
+_worker_recognizer: Optional[CYKRecognizer] = None
+
+
+def _init_worker(recognizer: CYKRecognizer) -> None:
+    """Stores recognizer in a worker process
+
+    Parameters
+    ----------
+    recognizer : CYKRecognizer
+        Recognizer sent to the process
+
+    Returns
+    -------
+    None
+    """
+    global _worker_recognizer
+    _worker_recognizer = recognizer
+
+
+def _accepts_chunk(words: List[str]) -> List[bool]:
+    """Checks words by the recognizer of a worker process
+
+    Parameters
+    ----------
+    words : List[str]
+        Words to be checked
+
+    Returns
+    -------
+    results : List[bool]
+        Whether each word belongs to the language
+    """
+    return [_worker_recognizer.accepts(word) for word in words]
+
+
+class _BitsetCnf(NamedTuple):
+    """Class represents CNF compiled for CYK over bitsets
+
+    Attributes
+    ----------
+
+    start_mask : int
+        Bit of the start symbol or 0 if it is not in CNF
+    terminal_masks : Dict[str, int]
+        Mapping from terminal to the mask of heads of productions producing it
+    chunk_tables : List[Optional[List[List[int]]]]
+        For left non-terminal B, chunk index c and chunk value x
+        the mask of heads A of productions A -> B C, where C is a bit of x
+        shifted by c chunks. It is None for B without such productions
+    chunks_num : int
+        Number of chunks of a cell mask
+    """
+
+    start_mask: int
+    terminal_masks: Dict[str, int]
+    chunk_tables: List[Optional[List[List[int]]]]
+    chunks_num: int
+
+
+def _compile_bitset_cnf(cfg: CFG) -> _BitsetCnf:
+    """Converts grammar to CNF and numbers its non-terminals
+
+    Parameters
+    ----------
+    cfg : CFG
+        Context Free Grammar
+
+    Returns
+    -------
+    bitset_cnf : _BitsetCnf
+        Compiled CNF
+    """
+    cnf = cfg.to_normal_form()
+    variable_to_bit = {
+        variable: bit
+        for bit, variable in enumerate(
+            sorted(cnf.variables, key=lambda v: str(v.value))
+        )
+    }
+    chunks_num = max(1, -(-len(variable_to_bit) // _CHUNK_BITS))
+
+    terminal_masks: Dict[str, int] = dict()
+    # For each left non-terminal, the heads fired by each right non-terminal
+    heads_by_pair = [[0] * len(variable_to_bit) for _ in variable_to_bit]
+    for production in cnf.productions:
+        head_mask = 1 << variable_to_bit[production.head]
+        if len(production.body) == 1:
+            value = production.body[0].value
+            terminal_masks[value] = terminal_masks.get(value, 0) | head_mask
+        elif len(production.body) == 2:
+            left, right = (variable_to_bit[v] for v in production.body)
+            heads_by_pair[left][right] |= head_mask
+
+    chunk_tables = []
+    for heads_by_right in heads_by_pair:
+        if not any(heads_by_right):
+            chunk_tables.append(None)
+            continue
+        tables = []
+        for chunk in range(chunks_num):
+            heads = heads_by_right[chunk * _CHUNK_BITS : (chunk + 1) * _CHUNK_BITS]
+            table = [0] * (1 << _CHUNK_BITS)
+            # Heads of a value are heads of its lowest bit and of the other bits
+            for value in range(1, len(table)):
+                lowest = value & -value
+                bit = lowest.bit_length() - 1
+                table[value] = table[value ^ lowest] | (
+                    heads[bit] if bit < len(heads) else 0
+                )
+            tables.append(table)
+        chunk_tables.append(tables)
+
+    start_bit = variable_to_bit.get(cfg.start_symbol)
+    return _BitsetCnf(
+        start_mask=0 if start_bit is None else 1 << start_bit,
+        terminal_masks=terminal_masks,
+        chunk_tables=chunk_tables,
+        chunks_num=chunks_num,
+    )
+
+
+def _accepts(bitset_cnf: _BitsetCnf, s: str) -> bool:
+    """Runs CYK over bitsets on non-empty word
+
+    Parameters
+    ----------
+    bitset_cnf : _BitsetCnf
+        Compiled CNF
+    s : str
+        Non-empty word to be checked
+
+    Returns
+    -------
+    result : bool
+        Whether the start symbol derives the word
+    """
+    if not bitset_cnf.start_mask:
+        return False
+    n = len(s)
+    chunk_mask = (1 << _CHUNK_BITS) - 1
+    chunk_tables = bitset_cnf.chunk_tables
+    # dp[i][j] is the mask of non-terminals deriving s[i:i + j + 1]
+    dp = [[0] * (n - i) for i in range(n)]
+    for i, c in enumerate(s):
+        dp[i][0] = bitset_cnf.terminal_masks.get(c, 0)
+
+    # Nonzero chunks of each cell are found once, when the cell is complete
+    chunks = [[None] * (n - i) for i in range(n)]
+
+    def nonzero_chunks(mask: int):
+        return [
+            (chunk, (mask >> (chunk * _CHUNK_BITS)) & chunk_mask)
+            for chunk in range(bitset_cnf.chunks_num)
+            if (mask >> (chunk * _CHUNK_BITS)) & chunk_mask
+        ]
+
+    for i in range(n):
+        chunks[i][0] = nonzero_chunks(dp[i][0])
+
+    for length in range(1, n):
+        for i in range(n - length):
+            mask = 0
+            for left_length in range(length):
+                left = dp[i][left_length]
+                if not left:
+                    continue
+                right_chunks = chunks[i + left_length + 1][length - left_length - 1]
+                if not right_chunks:
+                    continue
+                while left:
+                    lowest = left & -left
+                    tables = chunk_tables[lowest.bit_length() - 1]
+                    if tables is not None:
+                        for chunk, value in right_chunks:
+                            mask |= tables[chunk][value]
+                    left ^= lowest
+            dp[i][length] = mask
+            chunks[i][length] = nonzero_chunks(mask)
+
+    return bool(dp[0][n - 1] & bitset_cnf.start_mask)
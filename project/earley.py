@@ -0,0 +1,500 @@
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from pyformlang.cfg import CFG, Variable
+
+from project.rsm import RSM
+
+__all__ = [
+    "EarleyRecognizer",
+    "earley",
+]
+
+
+class EarleyRecognizer:
+    def __init__(self, grammar: Union[CFG, RSM]):
+        """Class represents online Earley recognizer over states of RSM,
+        it consumes symbols one at a time and after each of them tells
+        whether the consumed word is a prefix of a word of the language
+        and whether it belongs to the language
+
+        Item is a state of a box and the position where the box has been entered.
+        Box of nullable non-terminal is stepped over when it is predicted,
+        so completion never waits for the current set. States from which
+        no final state of the box is reachable are dropped, so the set
+        of items is empty exactly when the consumed word is not a viable prefix
+
+        Attributes
+        ----------
+
+        grammar : Union[CFG, RSM]
+            Context free grammar or recursive state machine.
+            Labels of RSM that are not names of its boxes are terminals
+        """
+        if isinstance(grammar, RSM):
+            boxes = _boxes_of_rsm(grammar)
+        else:
+            boxes = _boxes_of_cfg(grammar)
+        self._compile(boxes, grammar.start_symbol.value)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets consumed symbols
+
+        Returns
+        -------
+        None
+        """
+        # For each consumed position, items waiting for completion of boxes.
+        # Other parts of old sets are not needed after the next symbol
+        self._waiting: List[Dict[int, List[Tuple[int, int]]]] = []
+        self._items: Set[Tuple[int, int]] = set()
+        self._scannable: Dict[Any, List[Tuple[int, int]]] = defaultdict(list)
+        self._accepted = False
+        # Topmost items of deterministic chains of completions, see _leo_item
+        self._leo: Dict[Tuple[int, Any], Optional[Tuple[Tuple[int, int], bool]]] = {}
+        if self._start_node is not None:
+            self._process_set([(self._start_node, 0)])
+        else:
+            self._waiting.append(dict())
+
+    def feed(self, symbol: Any) -> bool:
+        """Consumes the next symbol of the word
+
+        Parameters
+        ----------
+        symbol : Any
+            Terminal, e.g. a character of the word
+
+        Returns
+        -------
+        is_viable_prefix : bool
+            Whether the consumed word is a prefix of a word of the language
+        """
+        scanned = self._scannable.get(symbol, [])
+        self._items = set()
+        self._scannable = defaultdict(list)
+        self._accepted = False
+        self._process_set(scanned)
+        return self.is_viable_prefix()
+
+    def feed_many(self, symbols: Iterable[Any]) -> bool:
+        """Consumes symbols one by one
+
+        Parameters
+        ----------
+        symbols : Iterable[Any]
+            Terminals, e.g. a string
+
+        Returns
+        -------
+        is_viable_prefix : bool
+            Whether the consumed word is a prefix of a word of the language
+        """
+        for symbol in symbols:
+            if not self.feed(symbol):
+                return False
+        return self.is_viable_prefix()
+
+    def is_viable_prefix(self) -> bool:
+        """Tells whether the consumed word is a prefix of a word of the language
+
+        Returns
+        -------
+        result : bool
+            Whether the consumed word may be continued to a word of the language
+        """
+        return bool(self._items)
+
+    def is_accepted(self) -> bool:
+        """Tells whether the consumed word belongs to the language
+
+        Returns
+        -------
+        result : bool
+            Whether the start symbol derives the consumed word
+        """
+        return self._accepted
+
+    def _compile(self, boxes: Dict[Any, "_Box"], start_value: Any) -> None:
+        """Numbers states of boxes and drops useless ones
+
+        Parameters
+        ----------
+        boxes : Dict[Any, _Box]
+            Mapping from names of non-terminals to their boxes
+        start_value : Any
+            Name of the start symbol
+
+        Returns
+        -------
+        None
+        """
+        nullable = _nullable_boxes(boxes)
+
+        # Box is generating if a final state is reachable from its start state
+        # by terminals and generating boxes
+        generating: Set[Any] = set()
+        while True:
+            new_generating = {
+                value
+                for value, box in boxes.items()
+                if _reachable_states(
+                    box, lambda label: not label[0] or label[1] in generating
+                )
+                & box.final_states
+            }
+            if new_generating == generating:
+                break
+            generating = new_generating
+
+        def is_allowed(label: Tuple[bool, Any]) -> bool:
+            return not label[0] or label[1] in generating
+
+        node_of: Dict[Tuple[Any, Any], int] = dict()
+        self._box_of: List[Any] = []
+        self._is_final: List[bool] = []
+        self._terminal_steps: List[List[Tuple[Any, int]]] = []
+        self._box_steps: List[List[Tuple[Any, int, bool]]] = []
+        self._box_start: Dict[Any, int] = dict()
+        useful_states = {
+            value: _co_reachable_states(boxes[value], is_allowed)
+            for value in generating
+        }
+        for value, states in useful_states.items():
+            self._box_start[value] = len(self._box_of)
+            for state in [boxes[value].start_state] + [
+                state for state in states if state != boxes[value].start_state
+            ]:
+                node_of[(value, state)] = len(self._box_of)
+                self._box_of.append(value)
+                self._is_final.append(state in boxes[value].final_states)
+                self._terminal_steps.append([])
+                self._box_steps.append([])
+        for value, states in useful_states.items():
+            for state in states:
+                node = node_of[(value, state)]
+                for label, state_to in (
+                    boxes[value].transitions.get(state, dict()).items()
+                ):
+                    if state_to not in states or not is_allowed(label):
+                        continue
+                    is_box, label_value = label
+                    if is_box:
+                        self._box_steps[node].append(
+                            (
+                                label_value,
+                                node_of[(value, state_to)],
+                                label_value in nullable,
+                            )
+                        )
+                    else:
+                        self._terminal_steps[node].append(
+                            (label_value, node_of[(value, state_to)])
+                        )
+
+        self._is_quasi_complete = [
+            is_final and not terminal_steps and not box_steps
+            for is_final, terminal_steps, box_steps in zip(
+                self._is_final, self._terminal_steps, self._box_steps
+            )
+        ]
+        self._start_value = start_value
+        self._start_node = self._box_start.get(start_value)
+
+    def _process_set(self, items: List[Tuple[int, int]]) -> None:
+        """Builds the set of items of the current position from scanned items
+        by prediction and completion
+
+        Parameters
+        ----------
+        items : List[Tuple[int, int]]
+            Items obtained by scanning the last symbol
+
+        Returns
+        -------
+        None
+        """
+        position = len(self._waiting)
+        waiting: Dict[Any, List[Tuple[int, int]]] = defaultdict(list)
+        self._waiting.append(waiting)
+        worklist = []
+
+        def add(item: Tuple[int, int]) -> None:
+            if item not in self._items:
+                self._items.add(item)
+                worklist.append(item)
+
+        for item in items:
+            add(item)
+        while worklist:
+            node, origin = worklist.pop()
+            for label, node_to in self._terminal_steps[node]:
+                self._scannable[label].append((node_to, origin))
+            for box, node_to, is_nullable in self._box_steps[node]:
+                waiting[box].append((node_to, origin))
+                add((self._box_start[box], position))
+                if is_nullable:
+                    add((node_to, origin))
+            if self._is_final[node]:
+                box = self._box_of[node]
+                if origin == 0 and box == self._start_value:
+                    self._accepted = True
+                # Boxes completed at the current position are nullable
+                # and have been stepped over when predicted
+                if origin == position:
+                    continue
+                leo_item = self._leo_item(origin, box)
+                if leo_item is None:
+                    for item in self._waiting[origin].get(box, []):
+                        add(item)
+                else:
+                    top_item, is_accepting = leo_item
+                    self._accepted |= is_accepting
+                    add(top_item)
+
+    def _leo_item(
+        self, origin: int, box: Any
+    ) -> Optional[Tuple[Tuple[int, int], bool]]:
+        """Finds the topmost item of the deterministic chain of completions
+        started by completion of box entered at the given position (Leo items)
+
+        Completion is deterministic if only one item waits for the box and
+        it is advanced to a final state without outgoing transitions. Such item
+        is used only to complete its own box, so intermediate items of the chain
+        are not added and right recursion is recognized in linear time
+
+        Parameters
+        ----------
+        origin : int
+            Position where the box has been entered, it precedes the current one
+        box : Any
+            Name of the completed non-terminal
+
+        Returns
+        -------
+        leo_item : Optional[Tuple[Tuple[int, int], bool]]
+            Topmost item of the chain and whether the chain passes through
+            an accepting item. None if the completion is not deterministic
+        """
+        key = (origin, box)
+        path, on_path = [], set()
+        while key not in self._leo and key not in on_path:
+            items = self._waiting[key[0]].get(key[1], [])
+            if len(items) != 1 or not self._is_quasi_complete[items[0][0]]:
+                self._leo[key] = None
+                break
+            path.append((key, items[0]))
+            on_path.add(key)
+            key = (items[0][1], self._box_of[items[0][0]])
+        # Chain ends in a non-deterministic completion, a known chain or a cycle
+        leo_item = self._leo.get(key)
+        for key, item in reversed(path):
+            node, item_origin = item
+            is_accepting = item_origin == 0 and self._box_of[node] == self._start_value
+            if leo_item is None:
+                leo_item = (item, is_accepting)
+            else:
+                leo_item = (leo_item[0], leo_item[1] or is_accepting)
+            self._leo[key] = leo_item
+        return self._leo[(origin, box)]
+
+
+def earley(s: Iterable[Any], grammar: Union[CFG, RSM]) -> bool:
+    """Determines whether a word belongs to the language generated
+    by the given grammar using Earley algorithm
+
+    Parameters
+    ----------
+    s : Iterable[Any]
+        Word to be checked, e.g. a string
+
+    grammar : Union[CFG, RSM]
+        Context free grammar or recursive state machine
+
+    Returns
+    -------
+    result: bool
+        Whether a word belongs to the language generated by the grammar
+    """
+    recognizer = EarleyRecognizer(grammar)
+    return recognizer.feed_many(s) and recognizer.is_accepted()
+
+
+class _Box(NamedTuple):
+    """Class represents box of non-terminal used by the recognizer
+
+    Attributes
+    ----------
+
+    start_state : Any
+        Start state
+    final_states : Set[Any]
+        Final states
+    transitions : Dict[Any, Dict[Tuple[bool, Any], Any]]
+        Transitions from states, labels are pairs of flag that the label
+        is a non-terminal and the name of the label
+    """
+
+    start_state: Any
+    final_states: Set[Any]
+    transitions: Dict[Any, Dict[Tuple[bool, Any], Any]]
+
+
+def _boxes_of_cfg(cfg: CFG) -> Dict[Any, _Box]:
+    """Builds boxes of non-terminals of context free grammar,
+    the box of non-terminal is the prefix tree of bodies of its productions
+
+    Parameters
+    ----------
+    cfg : CFG
+        Context free grammar
+
+    Returns
+    -------
+    boxes : Dict[Any, _Box]
+        Mapping from names of non-terminals to their boxes
+    """
+    boxes: Dict[Any, _Box] = dict()
+    for variable in cfg.variables | {cfg.start_symbol}:
+        boxes[variable.value] = _Box(start_state=0, final_states=set(), transitions={})
+    for production in cfg.productions:
+        box = boxes[production.head.value]
+        state = box.start_state
+        for symbol in production.body:
+            label = (isinstance(symbol, Variable), symbol.value)
+            steps = box.transitions.setdefault(state, dict())
+            if label not in steps:
+                steps[label] = 1 + sum(len(steps) for steps in box.transitions.values())
+            state = steps[label]
+        box.final_states.add(state)
+    return boxes
+
+
+def _boxes_of_rsm(rsm: RSM) -> Dict[Any, _Box]:
+    """Converts boxes of recursive state machine,
+    labels that are not names of boxes are terminals
+
+    Parameters
+    ----------
+    rsm : RSM
+        Recursive state machine
+
+    Returns
+    -------
+    boxes : Dict[Any, _Box]
+        Mapping from names of non-terminals to their boxes
+    """
+    box_values = {variable.value for variable in rsm.boxes}
+    return {
+        variable.value: _Box(
+            start_state=dfa.start_state,
+            final_states=set(dfa.final_states),
+            transitions={
+                state: {
+                    (label.value in box_values, label.value): state_to
+                    for label, state_to in steps.items()
+                }
+                for state, steps in dfa.to_dict().items()
+            },
+        )
+        for variable, dfa in rsm.boxes.items()
+        if dfa.start_state is not None
+    }
+
+
+def _nullable_boxes(boxes: Dict[Any, _Box]) -> Set[Any]:
+    """Finds boxes accepting the empty word
+
+    Parameters
+    ----------
+    boxes : Dict[Any, _Box]
+        Mapping from names of non-terminals to their boxes
+
+    Returns
+    -------
+    nullable : Set[Any]
+        Names of non-terminals deriving the empty word
+    """
+    nullable: Set[Any] = set()
+    while True:
+        new_nullable = {
+            value
+            for value, box in boxes.items()
+            if _reachable_states(box, lambda label: label[0] and label[1] in nullable)
+            & box.final_states
+        }
+        if new_nullable == nullable:
+            return nullable
+        nullable = new_nullable
+
+
+def _reachable_states(
+    box: _Box, is_allowed: Callable[[Tuple[bool, Any]], bool]
+) -> Set[Any]:
+    """Finds states of box reachable from its start state
+
+    Parameters
+    ----------
+    box : _Box
+        Box of non-terminal
+    is_allowed : Callable[[Tuple[bool, Any]], bool]
+        Predicate on labels of transitions that may be used
+
+    Returns
+    -------
+    states : Set[Any]
+        Reachable states
+    """
+    reached, worklist = {box.start_state}, [box.start_state]
+    while worklist:
+        for label, state_to in box.transitions.get(worklist.pop(), dict()).items():
+            if is_allowed(label) and state_to not in reached:
+                reached.add(state_to)
+                worklist.append(state_to)
+    return reached
+
+
+def _co_reachable_states(
+    box: _Box, is_allowed: Callable[[Tuple[bool, Any]], bool]
+) -> Set[Any]:
+    """Finds states of box reachable from its start state
+    from which a final state is reachable
+
+    Parameters
+    ----------
+    box : _Box
+        Box of non-terminal
+    is_allowed : Callable[[Tuple[bool, Any]], bool]
+        Predicate on labels of transitions that may be used
+
+    Returns
+    -------
+    states : Set[Any]
+        Useful states of the box
+    """
+    reached = _reachable_states(box, is_allowed)
+    predecessors = defaultdict(set)
+    for state in reached:
+        for label, state_to in box.transitions.get(state, dict()).items():
+            if is_allowed(label):
+                predecessors[state_to].add(state)
+    co_reached = box.final_states & reached
+    worklist = list(co_reached)
+    while worklist:
+        for state in predecessors[worklist.pop()]:
+            if state not in co_reached:
+                co_reached.add(state)
+                worklist.append(state)
+    return co_reached
@@ -13,6 +13,7 @@ __all__ = [
 from typing.io import IO
 
 from project import RSM
+from project.automata import determinize
 
 
 class ECFG(NamedTuple):
@@ -44,8 +45,7 @@ class ECFG(NamedTuple):
         return RSM(
             start_symbol=self.start_symbol,
             boxes={
-                h: r.to_epsilon_nfa().to_deterministic()
-                for h, r in self.productions.items()
+                h: determinize(r.to_epsilon_nfa()) for h, r in self.productions.items()
             },
         )
 
@@ -0,0 +1,695 @@
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from networkx import MultiDiGraph
+
+__all__ = [
+    "GraphStore",
+    "MemmapGraphStore",
+]
+
+# Version of file format, files of other versions are rejected
+_FORMAT_VERSION = 1
+# Version of directory format of MemmapGraphStore,
+# version 1 kept parallel edges with the same label as repeated entries
+_MEMMAP_FORMAT_VERSION = 2
+
+
+class GraphStore(NamedTuple):
+    """Class represents labeled graph as arrays of node indices,
+    it may be saved to compact binary file and loaded without networkx
+
+    Edges are grouped by labels and edges of a label are sorted by sources,
+    so the edges of a label are the rows of its adjacency matrix in CSR order
+
+    Attributes
+    ----------
+
+    nodes : List[Any]
+        Nodes of the graph, edges refer to nodes by their indices in this list
+    labels : List[Any]
+        Labels of edges, edges without label have the empty label ""
+    label_offsets : np.ndarray
+        Array of length len(labels) + 1, edges labeled with i-th label
+        are edges from label_offsets[i] to label_offsets[i + 1] - 1
+    sources : np.ndarray
+        Indices of source nodes of edges
+    targets : np.ndarray
+        Indices of target nodes of edges
+    """
+
+    nodes: List[Any]
+    labels: List[Any]
+    label_offsets: np.ndarray
+    sources: np.ndarray
+    targets: np.ndarray
+
+    @classmethod
+    def from_graph(cls, graph: MultiDiGraph) -> "GraphStore":
+        """Converts graph to arrays
+
+        Parameters
+        ----------
+        graph : MultiDiGraph
+            Graph, edge labels are stored in attribute "label"
+
+        Returns
+        -------
+        graph_store : GraphStore
+            Graph as arrays
+        """
+        node_to_idx = {node: idx for idx, node in enumerate(graph.nodes)}
+        label_to_id = dict()
+        sources, targets, label_ids = [], [], []
+        for node_from, node_to, label in graph.edges(data="label"):
+            sources.append(node_to_idx[node_from])
+            targets.append(node_to_idx[node_to])
+            label_ids.append(label_to_id.setdefault(label or "", len(label_to_id)))
+        sources, targets, label_ids = (
+            np.array(sources, dtype=np.int64),
+            np.array(targets, dtype=np.int64),
+            np.array(label_ids, dtype=np.int64),
+        )
+        order = np.lexsort((targets, sources, label_ids))
+        return cls(
+            nodes=list(node_to_idx),
+            labels=list(label_to_id),
+            label_offsets=np.searchsorted(
+                label_ids[order], np.arange(len(label_to_id) + 1)
+            ),
+            sources=sources[order],
+            targets=targets[order],
+        )
+
+    @property
+    def number_of_edges(self) -> int:
+        """Returns the number of edges
+
+        Returns
+        -------
+        number_of_edges : int
+            Number of edges of all labels
+        """
+        return len(self.sources)
+
+    def to_graph(self) -> MultiDiGraph:
+        """Converts arrays back to graph
+
+        Returns
+        -------
+        graph : MultiDiGraph
+            Graph, edge labels are stored in attribute "label"
+        """
+        graph = MultiDiGraph()
+        graph.add_nodes_from(self.nodes)
+        for i, label in enumerate(self.labels):
+            begin, end = self.label_offsets[i], self.label_offsets[i + 1]
+            graph.add_edges_from(
+                (self.nodes[node_from], self.nodes[node_to], {"label": label})
+                for node_from, node_to in zip(
+                    self.sources[begin:end].tolist(), self.targets[begin:end].tolist()
+                )
+            )
+        return graph
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Saves the graph to npz file
+
+        Integer nodes are stored as array, other nodes and labels are stored
+        as JSON, so they must be JSON serializable
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        None
+        """
+        int_nodes = all(
+            isinstance(node, int) and not isinstance(node, bool) for node in self.nodes
+        )
+        arrays = {
+            "label_offsets": np.asarray(self.label_offsets, dtype=np.int64),
+            "sources": np.asarray(self.sources, dtype=np.int64),
+            "targets": np.asarray(self.targets, dtype=np.int64),
+        }
+        metadata = {
+            "version": _FORMAT_VERSION,
+            "int_nodes": int_nodes,
+            "labels": self.labels,
+        }
+        if int_nodes:
+            arrays["nodes"] = np.array(self.nodes, dtype=np.int64)
+        else:
+            metadata["nodes"] = self.nodes
+        arrays["metadata"] = np.array(json.dumps(metadata))
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "GraphStore":
+        """Loads the graph from npz file created by save
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        graph_store : GraphStore
+            Loaded graph
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(str(arrays["metadata"]))
+            if metadata["version"] != _FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported graph store version {metadata['version']}"
+                )
+            return cls(
+                nodes=(
+                    arrays["nodes"].tolist()
+                    if metadata["int_nodes"]
+                    else metadata["nodes"]
+                ),
+                labels=metadata["labels"],
+                label_offsets=arrays["label_offsets"],
+                sources=arrays["sources"],
+                targets=arrays["targets"],
+            )
+
+
+class MemmapGraphStore(NamedTuple):
+    """Class represents labeled graph stored in a directory as CSR matrices
+    of labels, arrays are memory-mapped, so only the pages touched
+    by matrix operations are read into memory
+
+    Directory holds metadata.json with labels and nodes (or nodes.npy
+    for integer nodes), indptr_<i>.npy and indices_<i>.npy of i-th label
+    and data.npy of ones shared by matrices of all labels. Column indices
+    of each row are sorted and unique, so parallel edges with the same label
+    are stored once, as in matrices built from networkx graph
+
+    Attributes
+    ----------
+
+    nodes : List[Any]
+        Nodes of the graph, rows and columns of matrices are their indices
+    labels : List[Any]
+        Labels of edges, edges without label have the empty label ""
+    indptrs : List[np.ndarray]
+        Memory-mapped CSR index pointers of matrices of labels
+    indices : List[np.ndarray]
+        Memory-mapped CSR column indices of matrices of labels
+    data : np.ndarray
+        Memory-mapped ones, its prefixes are values of matrices of labels
+    """
+
+    nodes: List[Any]
+    labels: List[Any]
+    indptrs: List[np.ndarray]
+    indices: List[np.ndarray]
+    data: np.ndarray
+
+    @classmethod
+    def open(cls, directory: Union[str, os.PathLike]) -> "MemmapGraphStore":
+        """Opens graph stored in directory
+
+        Parameters
+        ----------
+        directory : Union[str, os.PathLike]
+            Directory created by from_graph_store or from_csv
+
+        Returns
+        -------
+        graph_store : MemmapGraphStore
+            Graph with memory-mapped arrays
+        """
+        directory = Path(directory)
+        with open(directory / "metadata.json") as f:
+            metadata = json.load(f)
+        if metadata["version"] != _MEMMAP_FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph store version {metadata['version']}")
+        labels_num = len(metadata["labels"])
+        return cls(
+            nodes=(
+                np.load(directory / "nodes.npy").tolist()
+                if metadata["int_nodes"]
+                else metadata["nodes"]
+            ),
+            labels=metadata["labels"],
+            indptrs=[
+                np.load(directory / f"indptr_{i}.npy", mmap_mode="r")
+                for i in range(labels_num)
+            ],
+            indices=[
+                np.load(directory / f"indices_{i}.npy", mmap_mode="r")
+                for i in range(labels_num)
+            ],
+            data=np.load(directory / "data.npy", mmap_mode="r"),
+        )
+
+    @classmethod
+    def from_graph_store(
+        cls, graph_store: GraphStore, directory: Union[str, os.PathLike]
+    ) -> "MemmapGraphStore":
+        """Writes graph stored as arrays to directory
+
+        Parameters
+        ----------
+        graph_store : GraphStore
+            Graph as arrays
+        directory : Union[str, os.PathLike]
+            Directory of the stored graph, it is created if it does not exist
+
+        Returns
+        -------
+        graph_store : MemmapGraphStore
+            Graph with memory-mapped arrays
+        """
+        nodes_num = len(graph_store.nodes)
+        writer = _MemmapWriter(directory, nodes_num)
+        for i in range(len(graph_store.labels)):
+            begin, end = graph_store.label_offsets[i], graph_store.label_offsets[i + 1]
+            codes = np.unique(
+                np.asarray(graph_store.sources[begin:end], dtype=np.int64) * nodes_num
+                + graph_store.targets[begin:end]
+            )
+            indptr = np.zeros(nodes_num + 1, dtype=np.int64)
+            np.cumsum(
+                np.bincount(codes // nodes_num, minlength=nodes_num), out=indptr[1:]
+            )
+            writer.write_label(i, indptr, codes % nodes_num)
+        return writer.finish(graph_store.nodes, graph_store.labels)
+
+    @classmethod
+    def from_csv(
+        cls,
+        path: Union[str, os.PathLike],
+        directory: Union[str, os.PathLike],
+        chunk_size: int = 1 << 20,
+    ) -> "MemmapGraphStore":
+        """Converts graph from CSV file of cfpq_data format to stored graph
+        without loading the whole graph into memory
+
+        Lines of the file are "source target label". The file is read
+        three times by chunks of lines: the first pass collects sorted nodes,
+        labels and numbers of their edges, the second one counts edges
+        of each source in memory-mapped index pointers, the third one writes
+        targets to their places in memory-mapped indices using index pointers
+        as cursors. Then rows of each label are sorted and repeated targets
+        are removed by chunks of rows.
+
+        Nodes are integers if all of them are written as integers, otherwise
+        they are strings. Besides chunks, memory holds only the sorted array
+        of nodes and labels, i.e. O(nodes + chunk_size), arrays of labels
+        are accessed through memory-mapped files. Opened store keeps
+        nodes as a list, as BoolMatrixAutomaton keeps states of nodes
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of CSV file
+        directory : Union[str, os.PathLike]
+            Directory of the stored graph, it is created if it does not exist
+        chunk_size : int
+            Number of lines or entries of arrays processed at once
+
+        Returns
+        -------
+        graph_store : MemmapGraphStore
+            Graph with memory-mapped arrays
+        """
+        try:
+            nodes, label_to_id, label_nnz = _csv_summary(path, chunk_size, np.int64)
+        except ValueError:
+            # Some node is not an integer, so nodes are strings
+            nodes, label_to_id, label_nnz = _csv_summary(path, chunk_size, str)
+
+        writer = _MemmapWriter(directory, len(nodes))
+        arrays = [
+            writer.create_label(label_id, nnz) for label_id, nnz in enumerate(label_nnz)
+        ]
+
+        # Edges of source are counted at indptr[source + 1]
+        for sources, _, label_ids in _csv_chunks(path, chunk_size, nodes, label_to_id):
+            for label_id in np.unique(label_ids).tolist():
+                label_sources, counts = np.unique(
+                    sources[label_ids == label_id], return_counts=True
+                )
+                indptr, _ = arrays[label_id]
+                indptr[label_sources + 1] += counts
+        for indptr, _ in arrays:
+            _cumsum_in_place(indptr, chunk_size)
+
+        # indptr[source] is the next free place of the row of source,
+        # after the pass it is the end of the row, so pointers are shifted back
+        for sources, targets, label_ids in _csv_chunks(
+            path, chunk_size, nodes, label_to_id
+        ):
+            for label_id in np.unique(label_ids).tolist():
+                is_label = label_ids == label_id
+                order = np.argsort(sources[is_label], kind="stable")
+                label_sources = sources[is_label][order]
+                unique_sources, group_starts, counts = np.unique(
+                    label_sources, return_index=True, return_counts=True
+                )
+                # Rank of the edge among the edges of the chunk with the same source
+                ranks = np.arange(len(label_sources)) - np.repeat(group_starts, counts)
+                indptr, indices = arrays[label_id]
+                indices[indptr[label_sources] + ranks] = targets[is_label][order]
+                indptr[unique_sources] += counts
+        for label_id, (indptr, indices) in enumerate(arrays):
+            _shift_right_in_place(indptr, chunk_size)
+            writer.deduplicate(label_id, indptr, indices, chunk_size)
+        return writer.finish(nodes, list(label_to_id))
+
+
+class _MemmapWriter:
+    def __init__(self, directory: Union[str, os.PathLike], nodes_num: int):
+        """Class writes arrays of MemmapGraphStore
+
+        Attributes
+        ----------
+
+        directory : Union[str, os.PathLike]
+            Directory of the stored graph, it is created if it does not exist
+        nodes_num : int
+            Number of nodes of the graph
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.nodes_num = nodes_num
+        self.nnz: Dict[int, int] = dict()
+
+    def create_label(self, label_id: int, nnz: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Creates memory-mapped CSR arrays of matrix of label
+
+        Parameters
+        ----------
+        label_id : int
+            Index of the label
+        nnz : int
+            Number of entries of the matrix
+
+        Returns
+        -------
+        arrays : Tuple[np.ndarray, np.ndarray]
+            Index pointers filled with zeros and uninitialized column indices,
+            both are opened for writing
+        """
+        self.nnz[label_id] = nnz
+        # scipy casts index arrays to the smallest sufficient type, so they
+        # are stored in that type to be used by matrices without copying
+        index_dtype = (
+            np.int32 if max(self.nodes_num, nnz) <= np.iinfo(np.int32).max else np.int64
+        )
+        indptr = np.lib.format.open_memmap(
+            self.directory / f"indptr_{label_id}.npy",
+            mode="w+",
+            dtype=index_dtype,
+            shape=(self.nodes_num + 1,),
+        )
+        indices = np.lib.format.open_memmap(
+            self.directory / f"indices_{label_id}.npy",
+            mode="w+",
+            dtype=index_dtype,
+            shape=(nnz,),
+        )
+        return indptr, indices
+
+    def write_label(
+        self, label_id: int, indptr: np.ndarray, indices: np.ndarray
+    ) -> None:
+        """Writes CSR arrays of matrix of label
+
+        Parameters
+        ----------
+        label_id : int
+            Index of the label
+        indptr : np.ndarray
+            CSR index pointers
+        indices : np.ndarray
+            CSR column indices
+        """
+        indptr_mmap, indices_mmap = self.create_label(label_id, len(indices))
+        indptr_mmap[:] = indptr
+        indices_mmap[:] = indices
+        indptr_mmap.flush()
+        indices_mmap.flush()
+
+    def deduplicate(
+        self,
+        label_id: int,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        chunk_size: int,
+    ) -> None:
+        """Sorts column indices of each row of label and removes repeated ones
+
+        Rows are processed by chunks of at most chunk_size rows and entries
+        (or by one row if it is longer), unique indices are moved
+        to the beginning in place and index pointers are updated in place.
+        If indices have been removed, arrays of the label are rewritten
+
+        Parameters
+        ----------
+        label_id : int
+            Index of the label
+        indptr : np.ndarray
+            Memory-mapped index pointers returned by create_label
+        indices : np.ndarray
+            Memory-mapped column indices returned by create_label
+        chunk_size : int
+            Number of rows and entries processed at once
+        """
+        rows_num = len(indptr) - 1
+        written, row, row_begin = 0, 0, 0
+        while row < rows_num:
+            # Pointers following the row are not updated yet
+            end_row = row + int(
+                np.searchsorted(
+                    indptr[row + 1 : row + 1 + chunk_size],
+                    row_begin + chunk_size,
+                    "right",
+                )
+            )
+            end_row = max(end_row, row + 1)
+            row_ends = np.array(indptr[row + 1 : end_row + 1], dtype=np.int64)
+            rows = np.repeat(
+                np.arange(end_row - row), np.diff(row_ends, prepend=row_begin)
+            )
+            codes = np.unique(
+                rows * self.nodes_num
+                + np.asarray(indices[row_begin : row_ends[-1]], dtype=np.int64)
+            )
+            indices[written : written + len(codes)] = codes % self.nodes_num
+            indptr[row + 1 : end_row + 1] = written + np.cumsum(
+                np.bincount(codes // self.nodes_num, minlength=end_row - row)
+            )
+            written += len(codes)
+            row, row_begin = end_row, row_ends[-1]
+        indptr.flush()
+        indices.flush()
+        if written == self.nnz[label_id]:
+            return
+        # Mappings stay valid after rename, so the arrays are copied from them
+        raw_paths = []
+        for name in ("indptr", "indices"):
+            raw_paths.append(self.directory / f"{name}_{label_id}.raw.npy")
+            os.replace(self.directory / f"{name}_{label_id}.npy", raw_paths[-1])
+        self.write_label(label_id, indptr, indices[:written])
+        for raw_path in raw_paths:
+            os.remove(raw_path)
+
+    def finish(
+        self, nodes: Union[List[Any], np.ndarray], labels: List[Any]
+    ) -> MemmapGraphStore:
+        """Writes nodes, labels and values and opens the stored graph
+
+        Parameters
+        ----------
+        nodes : Union[List[Any], np.ndarray]
+            Nodes of the graph
+        labels : List[Any]
+            Labels of edges
+
+        Returns
+        -------
+        graph_store : MemmapGraphStore
+            Graph with memory-mapped arrays
+        """
+        data = np.lib.format.open_memmap(
+            self.directory / "data.npy",
+            mode="w+",
+            dtype=bool,
+            shape=(max(self.nnz.values(), default=0),),
+        )
+        data[:] = True
+        data.flush()
+        int_nodes = (
+            np.issubdtype(nodes.dtype, np.integer)
+            if isinstance(nodes, np.ndarray)
+            else all(
+                isinstance(node, int) and not isinstance(node, bool) for node in nodes
+            )
+        )
+        metadata = {
+            "version": _MEMMAP_FORMAT_VERSION,
+            "int_nodes": int_nodes,
+            "labels": labels,
+        }
+        if int_nodes:
+            np.save(self.directory / "nodes.npy", np.asarray(nodes, dtype=np.int64))
+        else:
+            metadata["nodes"] = list(nodes)
+        with open(self.directory / "metadata.json", "w") as f:
+            json.dump(metadata, f)
+        return MemmapGraphStore.open(self.directory)
+
+
+def _cumsum_in_place(array: np.ndarray, chunk_size: int) -> None:
+    """Replaces array with its prefix sums by chunks
+
+    Parameters
+    ----------
+    array : np.ndarray
+        Array, it may be memory-mapped
+    chunk_size : int
+        Number of elements processed at once
+    """
+    total = 0
+    for begin in range(0, len(array), chunk_size):
+        chunk = np.cumsum(array[begin : begin + chunk_size], dtype=np.int64) + total
+        array[begin : begin + chunk_size] = chunk
+        total = chunk[-1]
+
+
+def _shift_right_in_place(array: np.ndarray, chunk_size: int) -> None:
+    """Shifts array by one element to the right by chunks, the first element
+    becomes zero and the last one is dropped
+
+    Parameters
+    ----------
+    array : np.ndarray
+        Array, it may be memory-mapped
+    chunk_size : int
+        Number of elements processed at once
+    """
+    end = len(array) - 1
+    while end > 0:
+        # Chunks are moved from the end, so sources are not overwritten
+        begin = max(0, end - chunk_size)
+        array[begin + 1 : end + 1] = np.array(array[begin:end])
+        end = begin
+    if len(array):
+        array[0] = 0
+
+
+def _csv_lines(
+    path: Union[str, os.PathLike], chunk_size: int
+) -> Iterator[Tuple[List[str], List[str], List[str]]]:
+    """Reads edges of CSV file of cfpq_data format by chunks
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Path of CSV file
+    chunk_size : int
+        Number of lines in a chunk
+
+    Returns
+    -------
+    chunks : Iterator[Tuple[List[str], List[str], List[str]]]
+        Texts of sources, targets and labels of edges of chunks,
+        edges without label have the empty label ""
+    """
+    with open(path) as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            sources, targets, labels = [], [], []
+            for line in lines:
+                parts = line.rstrip("\n").split(" ", 2)
+                if len(parts) < 2:
+                    continue
+                sources.append(parts[0])
+                targets.append(parts[1])
+                labels.append(parts[2] if len(parts) == 3 else "")
+            yield sources, targets, labels
+
+
+def _csv_summary(
+    path: Union[str, os.PathLike], chunk_size: int, node_type: Any
+) -> Tuple[np.ndarray, Dict[Any, int], List[int]]:
+    """Collects nodes and labels of CSV file of cfpq_data format
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Path of CSV file
+    chunk_size : int
+        Number of lines in a chunk
+    node_type : Any
+        Type of nodes, np.int64 or str
+
+    Returns
+    -------
+    summary : Tuple[np.ndarray, Dict[Any, int], List[int]]
+        Sorted array of nodes, numbering of labels and numbers of their edges
+
+    Raises
+    ------
+    ValueError
+        If a node is not of the given type
+    """
+    nodes = np.zeros(0, dtype=node_type)
+    label_to_id, label_nnz = dict(), []
+    for sources, targets, labels in _csv_lines(path, chunk_size):
+        nodes = np.union1d(nodes, np.array(sources + targets, dtype=node_type))
+        for label in labels:
+            label_id = label_to_id.setdefault(label, len(label_to_id))
+            if label_id == len(label_nnz):
+                label_nnz.append(0)
+            label_nnz[label_id] += 1
+    return nodes, label_to_id, label_nnz
+
+
+def _csv_chunks(
+    path: Union[str, os.PathLike],
+    chunk_size: int,
+    nodes: np.ndarray,
+    label_to_id: Dict[Any, int],
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Reads edges of CSV file of cfpq_data format by chunks as indices
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Path of CSV file
+    chunk_size : int
+        Number of lines in a chunk
+    nodes : np.ndarray
+        Sorted array of all nodes of the file
+    label_to_id : Dict[Any, int]
+        Numbering of all labels of the file
+
+    Returns
+    -------
+    chunks : Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]
+        Arrays of indices of sources, targets and labels of edges of chunks
+    """
+    node_type = np.int64 if np.issubdtype(nodes.dtype, np.integer) else str
+    for sources, targets, labels in _csv_lines(path, chunk_size):
+        yield (
+            np.searchsorted(nodes, np.array(sources, dtype=node_type)),
+            np.searchsorted(nodes, np.array(targets, dtype=node_type)),
+            np.array([label_to_id[label] for label in labels], dtype=np.int64),
+        )
@@ -1,10 +1,15 @@
-from typing import NamedTuple, Set, Tuple, Union
+import os
+import shutil
+from pathlib import Path
+from typing import NamedTuple, Optional, Set, Tuple, Union
 
 import cfpq_data
 import networkx.drawing.nx_pydot
 from networkx import MultiDiGraph
 from typing.io import IO
 
+from project.graph_store import GraphStore, MemmapGraphStore
+
 __all__ = [
     "GraphInfo",
     "create_and_save_two_cycle_labeled_graph",
@@ -12,6 +17,8 @@ __all__ = [
     "graph_info_of",
     "create_two_cycle_labeled_graph",
     "load_graph",
+    "load_graph_store",
+    "load_graph_memmap",
     "save_graph",
 ]
 
@@ -152,6 +159,90 @@ def load_graph(graph_name: str) -> MultiDiGraph:
     return graph
 
 
+def load_graph_store(
+    graph_name: str, cache_dir: Optional[Union[str, os.PathLike]] = None
+) -> GraphStore:
+    """Loads a graph by name as arrays using local cache
+
+    On the first load the graph is downloaded, parsed and saved to the cache
+    directory as GraphStore file, later loads read only this file,
+    so neither CSV is parsed nor networkx graph is built
+
+    Parameters
+    ----------
+    graph_name : str
+        The name of graph in dataset
+    cache_dir : Optional[Union[str, os.PathLike]]
+        Directory of cached graphs.
+        If parameter is None then ~/.cache/cfpq_graphs is used
+
+    Returns
+    -------
+    graph_store : GraphStore
+        Loaded graph
+    """
+    cache_dir = Path(
+        cache_dir if cache_dir is not None else Path.home() / ".cache" / "cfpq_graphs"
+    )
+    path = cache_dir / f"{graph_name}.npz"
+    if path.exists():
+        try:
+            return GraphStore.load(path)
+        except ValueError:
+            # The file is written by another version, so it is rebuilt
+            pass
+    graph_store = GraphStore.from_graph(load_graph(graph_name))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # The file is renamed after it is written, so concurrent loads never read a part of it
+    tmp_path = cache_dir / f"{graph_name}.{os.getpid()}.tmp"
+    graph_store.save(tmp_path)
+    os.replace(tmp_path, path)
+    return graph_store
+
+
+def load_graph_memmap(
+    graph_name: str, cache_dir: Optional[Union[str, os.PathLike]] = None
+) -> MemmapGraphStore:
+    """Loads a graph by name as memory-mapped CSR matrices using local cache
+
+    On the first load the downloaded CSV file is converted by chunks
+    to the directory of MemmapGraphStore, so neither the graph
+    nor networkx graph is kept in memory. Later loads only map the files
+
+    Parameters
+    ----------
+    graph_name : str
+        The name of graph in dataset
+    cache_dir : Optional[Union[str, os.PathLike]]
+        Directory of cached graphs.
+        If parameter is None then ~/.cache/cfpq_graphs is used
+
+    Returns
+    -------
+    graph_store : MemmapGraphStore
+        Loaded graph
+    """
+    cache_dir = Path(
+        cache_dir if cache_dir is not None else Path.home() / ".cache" / "cfpq_graphs"
+    )
+    directory = cache_dir / f"{graph_name}.mmap"
+    if directory.exists():
+        try:
+            return MemmapGraphStore.open(directory)
+        except (ValueError, OSError):
+            # The directory is written by another version, so it is rebuilt
+            shutil.rmtree(directory)
+    # The directory is renamed after it is written, so concurrent loads never read a part of it
+    tmp_directory = cache_dir / f"{graph_name}.{os.getpid()}.tmp"
+    MemmapGraphStore.from_csv(cfpq_data.download(graph_name), tmp_directory)
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # Another process has renamed its directory first
+        shutil.rmtree(tmp_directory)
+    return MemmapGraphStore.open(directory)
+
+
 def save_graph(graph: MultiDiGraph, file: Union[str, IO]) -> None:
     """Saves a graph into a file
 
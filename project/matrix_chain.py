@@ -0,0 +1,279 @@
+import math
+from collections import defaultdict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+__all__ = [
+    "MatrixStats",
+    "ChainPlan",
+    "matrix_stats",
+    "estimate_product",
+    "estimate_sum",
+    "plan_matrix_chain",
+    "multiply_chain",
+    "plan_product_sum",
+]
+
+
+class MatrixStats(NamedTuple):
+    """Class represents statistics of sparse matrix used to estimate products
+
+    Attributes
+    ----------
+
+    rows : int
+        Number of rows
+    cols : int
+        Number of columns
+    nnz : float
+        Number of stored entries, it is fractional for estimated matrices
+    """
+
+    rows: int
+    cols: int
+    nnz: float
+
+    @property
+    def density(self) -> float:
+        """Returns the fraction of stored entries
+
+        Returns
+        -------
+        density : float
+            Number of stored entries divided by the size of the matrix
+        """
+        size = self.rows * self.cols
+        return self.nnz / size if size else 0.0
+
+
+# Plan is either the index of a matrix in the chain
+# or the pair of plans of the left and the right factor
+ChainPlan = Union[int, Tuple["ChainPlan", "ChainPlan"]]
+
+
+def matrix_stats(mtx: Any) -> MatrixStats:
+    """Collects statistics of sparse matrix
+
+    Parameters
+    ----------
+    mtx : Any
+        Sparse matrix
+
+    Returns
+    -------
+    stats : MatrixStats
+        Shape and number of stored entries
+    """
+    rows, cols = mtx.shape
+    return MatrixStats(rows=rows, cols=cols, nnz=mtx.nnz)
+
+
+def estimate_product(
+    first: MatrixStats, second: MatrixStats
+) -> Tuple[MatrixStats, float]:
+    """Estimates statistics of the product of matrices and the cost of multiplication
+
+    Entries are assumed to be independent and uniformly distributed,
+    so an entry of the product is stored with probability
+    1 - (1 - d1 * d2) ^ n, where d1 and d2 are densities of factors
+    and n is the inner dimension
+
+    Parameters
+    ----------
+    first : MatrixStats
+        Statistics of the left factor
+    second : MatrixStats
+        Statistics of the right factor
+
+    Returns
+    -------
+    estimation : Tuple[MatrixStats, float]
+        Estimated statistics of the product and the expected number
+        of multiplications of stored entries
+    """
+    inner = first.cols
+    if not inner:
+        return MatrixStats(rows=first.rows, cols=second.cols, nnz=0.0), 0.0
+    probability = min(first.density * second.density, 1.0)
+    density = (
+        1.0 if probability == 1.0 else -math.expm1(inner * math.log1p(-probability))
+    )
+    product = MatrixStats(
+        rows=first.rows,
+        cols=second.cols,
+        nnz=density * first.rows * second.cols,
+    )
+    return product, first.nnz * second.nnz / inner
+
+
+def estimate_sum(stats: List[MatrixStats]) -> MatrixStats:
+    """Estimates statistics of the sum of matrices of the same shape
+
+    An entry of the sum is stored if it is stored in one of the summands,
+    summands are assumed to be independent
+
+    Parameters
+    ----------
+    stats : List[MatrixStats]
+        Statistics of summands, the list must not be empty
+
+    Returns
+    -------
+    stats : MatrixStats
+        Estimated statistics of the sum
+    """
+    empty_probability = 1.0
+    for summand in stats:
+        empty_probability *= 1.0 - min(summand.density, 1.0)
+    rows, cols = stats[0].rows, stats[0].cols
+    return MatrixStats(
+        rows=rows, cols=cols, nnz=(1.0 - empty_probability) * rows * cols
+    )
+
+
+def plan_product_sum(
+    pairs: List[Tuple[Hashable, Hashable]], stats: Dict[Hashable, MatrixStats]
+) -> List[Tuple[List[Hashable], List[Hashable]]]:
+    """Chooses how to calculate the sum of products of pairs of matrices
+    with minimal estimated cost
+
+    Products with a common factor may be replaced with one product by the sum
+    of the other factors, e.g. A @ B + A @ C = A @ (B + C). Products are
+    grouped by the left factor, by the right factor or are not grouped at all
+
+    Parameters
+    ----------
+    pairs : List[Tuple[Hashable, Hashable]]
+        Pairs of keys of the left and the right factor of products
+    stats : Dict[Hashable, MatrixStats]
+        Mapping from keys to statistics of matrices
+
+    Returns
+    -------
+    plan : List[Tuple[List[Hashable], List[Hashable]]]
+        Terms of the sum, where each term is the product of the sum of matrices
+        of the first list by the sum of matrices of the second list
+    """
+
+    def group(by_left: bool) -> List[Tuple[List[Hashable], List[Hashable]]]:
+        groups = defaultdict(list)
+        for left, right in pairs:
+            if by_left:
+                groups[left].append(right)
+            else:
+                groups[right].append(left)
+        return [
+            ([common], others) if by_left else (others, [common])
+            for common, others in groups.items()
+        ]
+
+    def cost(plan: List[Tuple[List[Hashable], List[Hashable]]]) -> float:
+        return sum(
+            estimate_product(
+                estimate_sum([stats[key] for key in lefts]),
+                estimate_sum([stats[key] for key in rights]),
+            )[1]
+            for lefts, rights in plan
+        )
+
+    plans = [[([left], [right]) for left, right in pairs], group(True), group(False)]
+    return min(plans, key=cost)
+
+
+def plan_matrix_chain(stats: List[MatrixStats]) -> ChainPlan:
+    """Chooses the order of multiplication of matrix chain with minimal estimated cost
+
+    Dynamic programming over subchains, the cost of a subchain is the sum
+    of estimated costs of its multiplications, see estimate_product
+
+    Parameters
+    ----------
+    stats : List[MatrixStats]
+        Statistics of matrices of the chain, the chain must not be empty
+
+    Returns
+    -------
+    plan : ChainPlan
+        Order of multiplication
+    """
+    if not stats:
+        raise ValueError("Matrix chain must not be empty")
+    length = len(stats)
+    estimations = {(i, i): (stats[i], 0.0, i) for i in range(length)}
+    for span in range(2, length + 1):
+        for begin in range(length - span + 1):
+            end = begin + span - 1
+            best = None
+            for split in range(begin, end):
+                left_stats, left_cost, left_plan = estimations[(begin, split)]
+                right_stats, right_cost, right_plan = estimations[(split + 1, end)]
+                product_stats, cost = estimate_product(left_stats, right_stats)
+                total_cost = left_cost + right_cost + cost
+                if best is None or total_cost < best[1]:
+                    best = (product_stats, total_cost, (left_plan, right_plan))
+            estimations[(begin, end)] = best
+    return estimations[(0, length - 1)][2]
+
+
+def multiply_chain(
+    matrices: List[Any],
+    plan: Optional[ChainPlan] = None,
+    multiply: Optional[Callable[[Any, Any], Any]] = None,
+) -> Any:
+    """Multiplies matrix chain in the planned order
+
+    Parameters
+    ----------
+    matrices : List[Any]
+        Sparse matrices of the chain, the chain must not be empty
+    plan : Optional[ChainPlan]
+        Order of multiplication. If parameter is None then it is planned
+        by plan_matrix_chain using statistics of matrices
+    multiply : Optional[Callable[[Any, Any], Any]]
+        Multiplication of two matrices, e.g. Semiring.mul.
+        If parameter is None then matrix product is used
+
+    Returns
+    -------
+    product : Any
+        Product of the chain
+    """
+    if plan is None:
+        plan = plan_matrix_chain([matrix_stats(mtx) for mtx in matrices])
+    if multiply is None:
+        multiply = _matmul
+
+    def execute(subplan: ChainPlan) -> Any:
+        if isinstance(subplan, int):
+            return matrices[subplan]
+        left, right = subplan
+        return multiply(execute(left), execute(right))
+
+    return execute(plan)
+
+
+def _matmul(first: Any, second: Any) -> Any:
+    """Multiplies sparse matrices
+
+    Parameters
+    ----------
+    first : Any
+        Left factor
+    second : Any
+        Right factor
+
+    Returns
+    -------
+    product : Any
+        Matrix product in csr format
+    """
+    return (first @ second).tocsr()
@@ -1,10 +1,17 @@
 from collections import defaultdict
-from typing import Dict, Set, Any, List
-
-from pyformlang.finite_automaton import State, EpsilonNFA
-from scipy.sparse import dok_matrix, kron, bmat, csr_matrix, lil_array, vstack
-from project.rsm import RSM
+from typing import Dict, Set, Any, List, Tuple, Iterable, Iterator, Optional, Union
 
+import numpy as np
+from networkx import MultiDiGraph
+from pyformlang.finite_automaton import (
+    DeterministicFiniteAutomaton,
+    State,
+    EpsilonNFA,
+)
+from scipy.sparse import dok_matrix, kron, block_diag, csr_matrix, eye, hstack
+from project.graph_store import GraphStore, MemmapGraphStore
+from project.rsm import RSM, CompactRSM
+from project.semiring import Semiring, BooleanSemiring
 
 __all__ = [
     "BoolMatrixAutomaton",
@@ -81,6 +88,126 @@ class BoolMatrixAutomaton:
             b_mtx=inter_b_mtx,
         )
 
+    def intersect_trimmed(self, other: "BoolMatrixAutomaton") -> "BoolMatrixAutomaton":
+        """Calculates intersection of two automatons keeping only useful states
+
+        Unlike the & operator, the product states are not enumerated in advance.
+        They are discovered by BFS from the pairs of start states, where the whole
+        front is expanded by each label at once, then the states from which
+        no pair of final states is reachable are removed. So the size of the result
+        is proportional to the useful part of the product
+
+        Parameters
+        ----------
+        other : BoolMatrixAutomaton
+            The automaton with which intersection will be calculated
+
+        Returns
+        -------
+        intersection : BoolMatrixAutomaton
+            Trimmed intersection of two automatons, its states are named
+            as the states of the intersection calculated by the & operator
+            and numbered in the order of discovery
+        """
+        self_states = _states_by_idx(self.state_to_idx)
+        other_states = _states_by_idx(other.state_to_idx)
+        other_num = len(other_states)
+        labels = list(self.b_mtx.keys() & other.b_mtx.keys())
+        matrices = [
+            (self.b_mtx[label].tocsr(), other.b_mtx[label].tocsr()) for label in labels
+        ]
+
+        # Product state (i, j) is encoded as i * other_num + j
+        codes = np.array(
+            [
+                self.state_to_idx[self_state] * other_num + other.state_to_idx[state]
+                for self_state in self.start_states
+                for state in other.start_states
+            ],
+            dtype=np.int64,
+        )
+        code_to_idx = {code: idx for idx, code in enumerate(codes.tolist())}
+        starts_num = len(codes)
+        front, front_codes, code_chunks = np.arange(starts_num), codes, [codes]
+        edges = [([], []) for _ in labels]
+        while len(front):
+            front_self, front_other = np.divmod(front_codes, other_num)
+            new_codes = []
+            for (self_mtx, other_mtx), (sources, targets) in zip(matrices, edges):
+                front_idx, self_to, other_to = _product_successors(
+                    self_mtx, other_mtx, front_self, front_other
+                )
+                if not len(front_idx):
+                    continue
+                target_codes = self_to * other_num + other_to
+                sources.append(front[front_idx])
+                targets.append(target_codes)
+                new_codes.append(target_codes)
+            if not new_codes:
+                break
+            new_codes = np.unique(np.concatenate(new_codes))
+            is_new = np.fromiter(
+                (code not in code_to_idx for code in new_codes.tolist()),
+                dtype=bool,
+                count=len(new_codes),
+            )
+            new_codes = new_codes[is_new]
+            front = np.arange(len(code_to_idx), len(code_to_idx) + len(new_codes))
+            code_to_idx.update(zip(new_codes.tolist(), front.tolist()))
+            front_codes = new_codes
+            code_chunks.append(new_codes)
+
+        codes = np.concatenate(code_chunks)
+        states_num = len(codes)
+        codes_order = np.argsort(codes)
+        sorted_codes = codes[codes_order]
+        b_mtx = defaultdict(lambda: dok_matrix((states_num, states_num), dtype=bool))
+        adjacency = csr_matrix((states_num, states_num), dtype=bool)
+        for label, (sources, targets) in zip(labels, edges):
+            if not sources:
+                continue
+            targets = np.concatenate(targets)
+            b_mtx[label] = csr_matrix(
+                (
+                    np.ones(len(targets), dtype=bool),
+                    (
+                        np.concatenate(sources),
+                        codes_order[np.searchsorted(sorted_codes, targets)],
+                    ),
+                ),
+                shape=(states_num, states_num),
+            )
+            adjacency = adjacency + b_mtx[label]
+
+        self_final = np.zeros(len(self_states), dtype=bool)
+        self_final[[self.state_to_idx[s] for s in self.final_states]] = True
+        other_final = np.zeros(other_num, dtype=bool)
+        other_final[[other.state_to_idx[s] for s in other.final_states]] = True
+        codes_self, codes_other = np.divmod(codes, other_num)
+        is_final = self_final[codes_self] & other_final[codes_other]
+        useful = np.flatnonzero(
+            _reachable_mask(adjacency.T.tocsr(), np.flatnonzero(is_final))
+        )
+
+        useful_num = len(useful)
+        trimmed_b_mtx = defaultdict(
+            lambda: dok_matrix((useful_num, useful_num), dtype=bool)
+        )
+        for label, mtx in b_mtx.items():
+            mtx = mtx[useful][:, useful]
+            if mtx.nnz:
+                trimmed_b_mtx[label] = mtx
+        states = [
+            State((self_states[i].value, other_states[j].value))
+            for i, j in zip(codes_self[useful].tolist(), codes_other[useful].tolist())
+        ]
+        return BoolMatrixAutomaton(
+            state_to_idx={state: idx for idx, state in enumerate(states)},
+            start_states={states[idx] for idx in np.flatnonzero(useful < starts_num)},
+            final_states={states[idx] for idx in np.flatnonzero(is_final[useful])},
+            b_mtx=trimmed_b_mtx,
+        )
+
     def transitive_closure(self) -> dok_matrix:
         """Calculates transitive closure
 
@@ -101,6 +228,78 @@ class BoolMatrixAutomaton:
             prev_nnz, cur_nnz = cur_nnz, transitive_closure.nnz
         return transitive_closure
 
+    def reachable_from(self, start_indices: List[int]) -> csr_matrix:
+        """Calculates reachability only from given states
+
+        Unlike transitive_closure, only rows of the given states are calculated
+        by iterated vector-matrix products, so memory is proportional
+        to the number of start states times the number of states reached
+
+        Parameters
+        ----------
+        start_indices : List[int]
+            Indices of states from which reachability is calculated
+
+        Returns
+        -------
+        reachable : csr_matrix
+            Matrix where i-th row holds the states reachable
+            from the state with index start_indices[i] by non-empty path
+        """
+        states_num = len(self.state_to_idx)
+        adjacency = sum(
+            (mtx.tocsr() for mtx in self.b_mtx.values()),
+            start=csr_matrix((states_num, states_num), dtype=bool),
+        )
+        front = csr_matrix(
+            (
+                np.ones(len(start_indices), dtype=bool),
+                (np.arange(len(start_indices)), start_indices),
+            ),
+            shape=(len(start_indices), states_num),
+        )
+        reachable = csr_matrix(front.shape, dtype=bool)
+        while front.nnz:
+            front = (front @ adjacency) > reachable
+            reachable = reachable + front
+        return reachable
+
+    def semiring_reachable_from(
+        self, start_indices: List[int], semiring: Semiring
+    ) -> csr_matrix:
+        """Calculates values of paths only from given states over semiring
+
+        Each edge has the value semiring.edge_value(), the value of path
+        is the product of its edges and the values of paths are summed,
+        e.g. number of paths or length of the shortest path
+
+        Parameters
+        ----------
+        start_indices : List[int]
+            Indices of states from which paths are considered
+        semiring : Semiring
+            Semiring in which values of paths are calculated
+
+        Returns
+        -------
+        values : csr_matrix
+            Matrix where i-th row holds values of non-empty paths
+            from the state with index start_indices[i]
+        """
+        if isinstance(semiring, BooleanSemiring):
+            return self.reachable_from(start_indices)
+        states_num = len(self.state_to_idx)
+        adjacency = semiring.zeros((states_num, states_num))
+        for mtx in self.b_mtx.values():
+            adjacency = semiring.add(adjacency, semiring.lift(mtx))
+        first_step = adjacency[start_indices]
+        values = first_step
+        while True:
+            new_values = semiring.add(first_step, semiring.mul(values, adjacency))
+            if semiring.equal(values, new_values):
+                return values
+            values = new_values
+
     @classmethod
     def from_rsm(cls, rsm: RSM) -> "BoolMatrixAutomaton":
         """Builds bool matrix from RSM
@@ -115,32 +314,47 @@ class BoolMatrixAutomaton:
         bool_matrix : BoolMatrixAutomaton
             Bool matrix representation of RSM
         """
-        states, start_states, final_states = set(), set(), set()
-        for nonterm, dfa in rsm.boxes.items():
-            for s in dfa.states:
-                state = State((nonterm, s.value))
-                states.add(state)
-                if s in dfa.start_states:
-                    start_states.add(state)
-                if s in dfa.final_states:
-                    final_states.add(state)
-        states = sorted(states, key=lambda s: s.value)
-        state_to_idx = {s: i for i, s in enumerate(states)}
-        b_mtx = defaultdict(lambda: dok_matrix((len(states), len(states)), dtype=bool))
-        for nonterm, dfa in rsm.boxes.items():
-            for state_from, transitions in dfa.to_dict().items():
-                for label, states_to in transitions.items():
-                    mtx = b_mtx[label.value]
-                    states_to = states_to if isinstance(states_to, set) else {states_to}
-                    for state_to in states_to:
-                        mtx[
-                            state_to_idx[State((nonterm, state_from.value))],
-                            state_to_idx[State((nonterm, state_to.value))],
-                        ] = True
+        return cls.from_compact_rsm(CompactRSM.from_rsm(rsm))
+
+    @classmethod
+    def from_compact_rsm(cls, rsm: CompactRSM) -> "BoolMatrixAutomaton":
+        """Builds bool matrix from RSM with integer states,
+        the matrix of each label is built from the array of its transitions at once
+
+        Parameters
+        ----------
+        rsm : CompactRSM
+            RSM to be converted to bool matrix
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of RSM, its states are
+            State((variable, name of state in the box))
+        """
+        states = [
+            State((box, name))
+            for box, name in zip(
+                (rsm.boxes[i] for i in rsm.box_of_states()), rsm.state_names
+            )
+        ]
+        states_num = len(states)
+        b_mtx = defaultdict(lambda: dok_matrix((states_num, states_num), dtype=bool))
+        for i, label in enumerate(rsm.labels):
+            transitions = rsm.transitions[
+                rsm.label_offsets[i] : rsm.label_offsets[i + 1]
+            ]
+            b_mtx[label] = csr_matrix(
+                (
+                    np.ones(len(transitions), dtype=bool),
+                    (transitions[:, 0], transitions[:, 1]),
+                ),
+                shape=(states_num, states_num),
+            )
         return cls(
-            state_to_idx=state_to_idx,
-            start_states=start_states,
-            final_states=final_states,
+            state_to_idx={s: i for i, s in enumerate(states)},
+            start_states={states[i] for i in np.flatnonzero(rsm.start_states)},
+            final_states={states[i] for i in np.flatnonzero(rsm.final_states)},
             b_mtx=b_mtx,
         )
 
@@ -169,6 +383,293 @@ class BoolMatrixAutomaton:
             ),
         )
 
+    @classmethod
+    def from_graph(
+        cls,
+        graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
+        start_states: Optional[Set] = None,
+        final_states: Optional[Set] = None,
+        fold_epsilons: bool = True,
+    ) -> "BoolMatrixAutomaton":
+        """Builds bool matrix directly from graph without intermediate NFA
+
+        Parameters
+        ----------
+        graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+            Graph to be converted, edge labels are stored in attribute "label".
+            Graph stored as arrays is converted without iterating over its edges.
+            Matrices of memory-mapped graph share its arrays, so the graph
+            is not read into memory, but matrices of labels are recomputed
+            in memory if epsilon transitions are folded
+        start_states : Optional[Set]
+            Set of nodes of the graph that will be treated as start states
+            If parameter is None then each graph node is considered the start state
+        final_states : Optional[Set]
+            Set of nodes of the graph that will be treated as final states
+            If parameter is None then each graph node is considered the final state
+        fold_epsilons : bool
+            Means edges with empty label are epsilon transitions or are skipped
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        """
+        if isinstance(graph, GraphStore):
+            return cls._from_edge_arrays(
+                nodes=graph.nodes,
+                labels=graph.labels,
+                label_offsets=graph.label_offsets,
+                sources=graph.sources,
+                targets=graph.targets,
+                start_states=start_states,
+                final_states=final_states,
+                fold_epsilons=fold_epsilons,
+            )
+        if isinstance(graph, MemmapGraphStore):
+            return cls._from_memmap_store(
+                graph_store=graph,
+                start_states=start_states,
+                final_states=final_states,
+                fold_epsilons=fold_epsilons,
+            )
+        return cls.from_edges(
+            nodes=graph.nodes,
+            edges=graph.edges(data="label"),
+            start_states=start_states,
+            final_states=final_states,
+            fold_epsilons=fold_epsilons,
+        )
+
+    @classmethod
+    def from_edges(
+        cls,
+        nodes: Iterable[Any],
+        edges: Iterable[Tuple[Any, Any, Any]],
+        start_states: Optional[Set] = None,
+        final_states: Optional[Set] = None,
+        fold_epsilons: bool = True,
+    ) -> "BoolMatrixAutomaton":
+        """Builds bool matrix from labeled edges
+
+        Edges of each label are collected into index arrays
+        and converted to sparse matrix at once. If fold_epsilons is true
+        then edges with empty label form epsilon transitions, their reflexive
+        transitive closure E is precomputed and each label matrix M
+        is replaced with E @ M @ E
+
+        Parameters
+        ----------
+        nodes : Iterable[Any]
+            Nodes of the graph
+        edges : Iterable[Tuple[Any, Any, Any]]
+            Triples of source node, target node and label
+        start_states : Optional[Set]
+            Set of nodes that will be treated as start states
+            If parameter is None then each node is considered the start state
+        final_states : Optional[Set]
+            Set of nodes that will be treated as final states
+            If parameter is None then each node is considered the final state
+        fold_epsilons : bool
+            Means edges with empty label are epsilon transitions or are skipped
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        """
+        node_to_idx = {node: idx for idx, node in enumerate(nodes)}
+        label_to_id = {}
+        sources, targets, label_ids = [], [], []
+        for node_from, node_to, label in edges:
+            sources.append(node_to_idx[node_from])
+            targets.append(node_to_idx[node_to])
+            label_ids.append(label_to_id.setdefault(label or "", len(label_to_id)))
+
+        sources, targets, label_ids = (
+            np.array(sources, dtype=np.int64),
+            np.array(targets, dtype=np.int64),
+            np.array(label_ids, dtype=np.int64),
+        )
+        order = np.argsort(label_ids, kind="stable")
+        return cls._from_edge_arrays(
+            nodes=node_to_idx,
+            labels=list(label_to_id),
+            label_offsets=np.searchsorted(
+                label_ids[order], np.arange(len(label_to_id) + 1)
+            ),
+            sources=sources[order],
+            targets=targets[order],
+            start_states=start_states,
+            final_states=final_states,
+            fold_epsilons=fold_epsilons,
+        )
+
+    @classmethod
+    def _from_edge_arrays(
+        cls,
+        nodes: Iterable[Any],
+        labels: List[Any],
+        label_offsets: np.ndarray,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        start_states: Optional[Set] = None,
+        final_states: Optional[Set] = None,
+        fold_epsilons: bool = True,
+    ) -> "BoolMatrixAutomaton":
+        """Builds bool matrix from edges grouped by labels
+
+        Parameters
+        ----------
+        nodes : Iterable[Any]
+            Nodes of the graph, edges refer to nodes by their indices
+        labels : List[Any]
+            Labels of edges, the empty label "" means epsilon transitions
+        label_offsets : np.ndarray
+            Edges of i-th label are edges from label_offsets[i] to label_offsets[i + 1] - 1
+        sources : np.ndarray
+            Indices of source nodes of edges
+        targets : np.ndarray
+            Indices of target nodes of edges
+        start_states : Optional[Set]
+            Set of nodes that will be treated as start states
+            If parameter is None then each node is considered the start state
+        final_states : Optional[Set]
+            Set of nodes that will be treated as final states
+            If parameter is None then each node is considered the final state
+        fold_epsilons : bool
+            Means edges with empty label are epsilon transitions or are skipped
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        """
+        node_to_idx = _node_to_idx(nodes, start_states, final_states)
+        states_num = len(node_to_idx)
+
+        b_mtx = defaultdict(lambda: csr_matrix((states_num, states_num), dtype=bool))
+        for label_id, label in enumerate(labels):
+            begin, end = label_offsets[label_id], label_offsets[label_id + 1]
+            b_mtx[label] = csr_matrix(
+                (
+                    np.ones(end - begin, dtype=bool),
+                    (sources[begin:end], targets[begin:end]),
+                ),
+                shape=(states_num, states_num),
+            )
+        return cls._from_label_matrices(
+            node_to_idx=node_to_idx,
+            b_mtx=b_mtx,
+            start_states=start_states,
+            final_states=final_states,
+            fold_epsilons=fold_epsilons,
+        )
+
+    @classmethod
+    def _from_memmap_store(
+        cls,
+        graph_store: MemmapGraphStore,
+        start_states: Optional[Set] = None,
+        final_states: Optional[Set] = None,
+        fold_epsilons: bool = True,
+    ) -> "BoolMatrixAutomaton":
+        """Builds bool matrix whose label matrices are views
+        of memory-mapped arrays of the graph
+
+        Parameters
+        ----------
+        graph_store : MemmapGraphStore
+            Graph with memory-mapped CSR matrices of labels
+        start_states : Optional[Set]
+            Set of nodes that will be treated as start states
+            If parameter is None then each node is considered the start state
+        final_states : Optional[Set]
+            Set of nodes that will be treated as final states
+            If parameter is None then each node is considered the final state
+        fold_epsilons : bool
+            Means edges with empty label are epsilon transitions or are skipped
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        """
+        node_to_idx = _node_to_idx(graph_store.nodes, start_states, final_states)
+        states_num = len(node_to_idx)
+        extra_states_num = states_num - len(graph_store.nodes)
+
+        b_mtx = defaultdict(lambda: csr_matrix((states_num, states_num), dtype=bool))
+        for label, indptr, indices in zip(
+            graph_store.labels, graph_store.indptrs, graph_store.indices
+        ):
+            if extra_states_num:
+                # Rows of start and final states which are not nodes are empty
+                indptr = np.concatenate(
+                    (indptr, np.full(extra_states_num, indptr[-1], dtype=indptr.dtype))
+                )
+            # Index arrays have the type chosen by scipy, so they are not copied
+            b_mtx[label] = csr_matrix(
+                (graph_store.data[: len(indices)], indices, indptr),
+                shape=(states_num, states_num),
+                copy=False,
+            )
+        return cls._from_label_matrices(
+            node_to_idx=node_to_idx,
+            b_mtx=b_mtx,
+            start_states=start_states,
+            final_states=final_states,
+            fold_epsilons=fold_epsilons,
+        )
+
+    @classmethod
+    def _from_label_matrices(
+        cls,
+        node_to_idx: Dict[Any, int],
+        b_mtx: Dict[Any, csr_matrix],
+        start_states: Optional[Set] = None,
+        final_states: Optional[Set] = None,
+        fold_epsilons: bool = True,
+    ) -> "BoolMatrixAutomaton":
+        """Builds bool matrix of graph from matrices of its labels
+
+        Parameters
+        ----------
+        node_to_idx : Dict[Any, int]
+            Mapping from nodes and start and final states to indices
+        b_mtx : Dict[Any, csr_matrix]
+            Matrices of labels, the empty label "" means epsilon transitions
+        start_states : Optional[Set]
+            Set of nodes that will be treated as start states
+            If parameter is None then each node is considered the start state
+        final_states : Optional[Set]
+            Set of nodes that will be treated as final states
+            If parameter is None then each node is considered the final state
+        fold_epsilons : bool
+            Means edges with empty label are epsilon transitions or are skipped
+
+        Returns
+        -------
+        bool_matrix : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        """
+        epsilon_mtx = b_mtx.pop("", None)
+        if fold_epsilons and epsilon_mtx is not None:
+            epsilon_closure = _reflexive_transitive_closure(epsilon_mtx)
+            for label, mtx in b_mtx.items():
+                b_mtx[label] = epsilon_closure @ mtx @ epsilon_closure
+
+        return cls(
+            state_to_idx={State(node): idx for node, idx in node_to_idx.items()},
+            start_states=set(
+                map(State, node_to_idx if start_states is None else start_states)
+            ),
+            final_states=set(
+                map(State, node_to_idx if final_states is None else final_states)
+            ),
+            b_mtx=b_mtx,
+        )
+
     def to_nfa(self) -> EpsilonNFA:
         """Converts bool matrix representation of automaton to epsilon nfa
         Returns
@@ -193,6 +694,248 @@ class BoolMatrixAutomaton:
             nfa.add_final_state(state)
         return nfa
 
+    def to_dfa(self) -> DeterministicFiniteAutomaton:
+        """Converts bool matrix representation of deterministic automaton to DFA
+
+        Returns
+        -------
+        dfa : DeterministicFiniteAutomaton
+            Created DFA
+        """
+        idx_to_state = {idx: state for state, idx in self.state_to_idx.items()}
+        dfa = DeterministicFiniteAutomaton()
+        for label, mtx in self.b_mtx.items():
+            for i, j in zip(*mtx.nonzero()):
+                dfa.add_transition(idx_to_state[i], label, idx_to_state[j])
+        for state in self.start_states:
+            dfa.add_start_state(state)
+        for state in self.final_states:
+            dfa.add_final_state(state)
+        return dfa
+
+    def determinize(
+        self, epsilon_mtx: Optional[Any] = None, name_by_subsets: bool = False
+    ) -> "BoolMatrixAutomaton":
+        """Determinizes automaton using subset construction over packed bool rows
+
+        Subsets of states are rows of bool matrix, so all subsets of a bfs level
+        are moved by a label at once by matrix multiplication, and a subset is
+        identified by bytes of its packed row. Empty subset is not a state,
+        so the result may be partial. States of the result are State(0), State(1), ...
+        in the order of discovery, State(0) is the start state
+
+        Parameters
+        ----------
+        epsilon_mtx : Optional[Any]
+            Bool matrix of epsilon transitions. Its reflexive transitive closure
+            is precomputed and applied to the start subset and after each step
+        name_by_subsets : bool
+            Means states of the result are named by their subsets
+            as in EpsilonNFA.to_deterministic, e.g. State("1;5"), instead of numbers
+
+        Returns
+        -------
+        dfa_bool_mtx : BoolMatrixAutomaton
+            Deterministic automaton
+        """
+        states_num = len(self.state_to_idx)
+        closure = (
+            None
+            if epsilon_mtx is None
+            else _reflexive_transitive_closure(csr_matrix(epsilon_mtx, dtype=bool))
+        )
+        labels = [label for label, mtx in self.b_mtx.items() if mtx.nnz]
+        steps = [
+            (
+                self.b_mtx[label] if closure is None else self.b_mtx[label] @ closure
+            ).tocsr()
+            for label in labels
+        ]
+        stacked_steps = (
+            hstack(steps, format="csr")
+            if steps
+            else csr_matrix((states_num, 0), dtype=bool)
+        )
+        final_mask = np.zeros(states_num, dtype=bool)
+        final_mask[[self.state_to_idx[s] for s in self.final_states]] = True
+
+        start_row = np.zeros(states_num, dtype=bool)
+        start_row[[self.state_to_idx[s] for s in self.start_states]] = True
+        if closure is not None:
+            start_row = closure.T @ start_row.astype(np.int32) > 0
+        if not start_row.any():
+            return BoolMatrixAutomaton(
+                state_to_idx=dict(),
+                start_states=set(),
+                final_states=set(),
+                b_mtx=defaultdict(lambda: csr_matrix((0, 0), dtype=bool)),
+            )
+
+        subset_to_idx = {np.packbits(start_row).tobytes(): 0}
+        is_final = [bool((start_row & final_mask).any())]
+        transitions = [([], []) for _ in labels]
+        front_indices, front = [0], csr_matrix(start_row[None, :])
+
+        while front_indices:
+            next_indices, next_rows = [], []
+            # One product per level: steps of all labels are stacked horizontally
+            reached = (
+                (front @ stacked_steps)
+                .toarray()
+                .reshape(len(front_indices), len(labels), states_num)
+            )
+            packed = np.packbits(reached, axis=2)
+            non_empty = packed.any(axis=2)
+            for row, label_idx in zip(*np.nonzero(non_empty)):
+                key = packed[row, label_idx].tobytes()
+                target = subset_to_idx.get(key)
+                if target is None:
+                    target = subset_to_idx[key] = len(subset_to_idx)
+                    is_final.append(bool((reached[row, label_idx] & final_mask).any()))
+                    next_indices.append(target)
+                    next_rows.append(reached[row, label_idx])
+                sources, targets = transitions[label_idx]
+                sources.append(front_indices[row])
+                targets.append(target)
+            front_indices = next_indices
+            if next_rows:
+                front = csr_matrix(np.array(next_rows))
+
+        dfa_states_num = len(subset_to_idx)
+        b_mtx = defaultdict(
+            lambda: csr_matrix((dfa_states_num, dfa_states_num), dtype=bool)
+        )
+        for label, (sources, targets) in zip(labels, transitions):
+            if sources:
+                b_mtx[label] = csr_matrix(
+                    (np.ones(len(sources), dtype=bool), (sources, targets)),
+                    shape=(dfa_states_num, dfa_states_num),
+                )
+        if name_by_subsets:
+            self_idx_to_state = {idx: state for state, idx in self.state_to_idx.items()}
+            dfa_states = [
+                State(
+                    ";".join(
+                        sorted(
+                            str(self_idx_to_state[i].value)
+                            for i in np.flatnonzero(
+                                np.unpackbits(
+                                    np.frombuffer(key, dtype=np.uint8),
+                                    count=states_num,
+                                )
+                            )
+                        )
+                    )
+                )
+                for key in subset_to_idx
+            ]
+        else:
+            dfa_states = [State(i) for i in range(dfa_states_num)]
+        return BoolMatrixAutomaton(
+            state_to_idx={state: i for i, state in enumerate(dfa_states)},
+            start_states={dfa_states[0]},
+            final_states={dfa_states[i] for i, final in enumerate(is_final) if final},
+            b_mtx=b_mtx,
+        )
+
+    def minimize(self) -> "BoolMatrixAutomaton":
+        """Minimizes deterministic automaton using Hopcroft partition refinement
+
+        States that are unreachable from the start state or from which
+        no final state is reachable are removed, so the result is the minimal
+        DFA without dead states. States of the result are State(0), State(1), ...
+        If the language is empty then the result has the only state State("Empty")
+
+        Returns
+        -------
+        minimized : BoolMatrixAutomaton
+            Minimal deterministic automaton
+        """
+        if len(self.start_states) > 1:
+            raise ValueError("Automaton must have at most one start state")
+
+        states_num = len(self.state_to_idx)
+        labels = [label for label, mtx in self.b_mtx.items() if mtx.nnz]
+        matrices = [self.b_mtx[label].tocsr() for label in labels]
+        adjacency = sum(
+            matrices, start=csr_matrix((states_num, states_num), dtype=bool)
+        ).tocsr()
+        start_indices = [self.state_to_idx[s] for s in self.start_states]
+        final_mask = np.zeros(states_num, dtype=bool)
+        final_mask[[self.state_to_idx[s] for s in self.final_states]] = True
+
+        useful = _reachable_mask(adjacency, start_indices) & _reachable_mask(
+            adjacency.T.tocsr(), np.flatnonzero(final_mask)
+        )
+        if not start_indices or not useful[start_indices[0]]:
+            empty_state = State("Empty")
+            return BoolMatrixAutomaton(
+                state_to_idx={empty_state: 0},
+                start_states={empty_state},
+                final_states=set(),
+                b_mtx=defaultdict(lambda: dok_matrix((1, 1), dtype=bool)),
+            )
+
+        # Useful states are renumbered and completed with a sink state,
+        # so each state has exactly one transition by each label
+        useful_indices = np.flatnonzero(useful)
+        sink = len(useful_indices)
+        new_idx = np.full(states_num, sink, dtype=np.int64)
+        new_idx[useful_indices] = np.arange(sink)
+        transitions = []
+        for mtx in matrices:
+            rows = mtx[useful_indices]
+            counts = np.diff(rows.indptr)
+            if (counts > 1).any():
+                raise ValueError("Automaton must be deterministic")
+            targets = np.full(sink + 1, sink, dtype=np.int64)
+            has_target = counts == 1
+            targets[:sink][has_target] = new_idx[
+                rows.indices[rows.indptr[:-1][has_target]]
+            ]
+            transitions.append(targets)
+
+        block_of = _hopcroft_partition(
+            transitions=transitions,
+            is_final=np.append(final_mask[useful_indices], False),
+        )
+
+        # Blocks are numbered in the order of their first states, the block of sink is dropped
+        sink_block = block_of[sink]
+        _, first_states = np.unique(block_of[:sink], return_index=True)
+        first_states.sort()
+        block_to_new = np.full(block_of.max() + 1, -1, dtype=np.int64)
+        block_to_new[block_of[first_states]] = np.arange(len(first_states))
+        blocks_num = len(first_states)
+
+        b_mtx = defaultdict(lambda: csr_matrix((blocks_num, blocks_num), dtype=bool))
+        for label, targets in zip(labels, transitions):
+            target_blocks = block_of[targets[first_states]]
+            kept = target_blocks != sink_block
+            if kept.any():
+                b_mtx[label] = csr_matrix(
+                    (
+                        np.ones(kept.sum(), dtype=bool),
+                        (
+                            np.arange(blocks_num)[kept],
+                            block_to_new[target_blocks[kept]],
+                        ),
+                    ),
+                    shape=(blocks_num, blocks_num),
+                )
+
+        new_final_blocks = block_to_new[
+            np.unique(block_of[:sink][final_mask[useful_indices]])
+        ]
+        return BoolMatrixAutomaton(
+            state_to_idx={State(i): i for i in range(blocks_num)},
+            start_states={
+                State(int(block_to_new[block_of[new_idx[start_indices[0]]]]))
+            },
+            final_states={State(int(i)) for i in new_final_blocks},
+            b_mtx=b_mtx,
+        )
+
     @staticmethod
     def _b_mtx_from_nfa(
         nfa: EpsilonNFA, state_to_idx: Dict[State, int]
@@ -226,48 +969,414 @@ class BoolMatrixAutomaton:
             b_mtx[label] = dok_mtx
         return b_mtx
 
-    def _direct_sum(self, other: "BoolMatrixAutomaton") -> "BoolMatrixAutomaton":
-        """Calculates direct sum of automatons represented by bool matrix
+    def sync_bfs(
+        self,
+        other: "BoolMatrixAutomaton",
+        reachable_per_node: bool,
+        with_distances: bool = False,
+        max_depth: Optional[int] = None,
+    ) -> Set[Any]:
+        """Executes sync bfs on two automatons represented by bool matrices
+
+        The front holds one block of rows per start node (or a single block
+        if reachable_per_node is false), where the row of a state of other
+        holds the nodes of self reached together with this state.
+        Other automaton is not required to be deterministic,
+        but it must not contain epsilon transitions
 
         Parameters
         ----------
         other : BoolMatrixAutomaton
-            The matrix with which sum will be calculated
+            The matrix with which bfs will be executed
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        with_distances: bool
+            Means each result is supplemented with the bfs level
+            at which it has been reached first, i.e. the length of the shortest path
+        max_depth: Optional[int]
+            Maximal number of bfs levels. If parameter is None then bfs is not bounded
+
+        Returns
+        -------
+        result : Set[Any]
+            Result depends on reachable_per_node
+        if reachable_per_node is false -- set of reachable nodes
+        if reachable_per_node is true -- set of tuples (U, V)
+        where U is start node and V is final node reachable from U
+        if with_distances is true -- length of the shortest path
+        is appended to each result, i.e. (V, D) or (U, V, D)
+        """
+
+        distances = self._sync_bfs_distances(
+            other=other,
+            reachable_per_node=reachable_per_node,
+            ordered_start_states=list(self.start_states),
+            max_depth=max_depth,
+        )
+        return self._sync_bfs_results(distances, reachable_per_node, with_distances)
+
+    def sync_bfs_chunked(
+        self,
+        other: "BoolMatrixAutomaton",
+        memory_budget: int,
+        with_distances: bool = False,
+        max_depth: Optional[int] = None,
+    ) -> Iterator[Set[Any]]:
+        """Executes sync bfs for each start node separately in batches of start nodes
+
+        The front of sync bfs holds a block of rows per start node,
+        so start nodes are split into batches whose front and visited matrices
+        fit into the memory budget even if all pairs of states are visited,
+        the results of a batch are yielded before the next batch begins
+
+        Parameters
+        ----------
+        other : BoolMatrixAutomaton
+            The matrix with which bfs will be executed
+        memory_budget : int
+            Maximal number of bytes of front and visited matrices of one batch.
+            A batch holds at least one start node whatever the budget is
+        with_distances: bool
+            Means each result is supplemented with the bfs level
+            at which it has been reached first, i.e. the length of the shortest path
+        max_depth: Optional[int]
+            Maximal number of bfs levels. If parameter is None then bfs is not bounded
+
+        Returns
+        -------
+        result : Iterator[Set[Any]]
+            For each batch, set of tuples (U, V) where U is start node of the batch
+            and V is final node reachable from U, or (U, V, D) if with_distances is true
+        """
+        if memory_budget <= 0:
+            raise ValueError("Memory budget must be positive")
+
+        # Front and visited matrices of a block hold at most all pairs of states,
+        # a stored entry of csr_matrix takes one byte of data and an index
+        block_bytes = (
+            2
+            * len(other.state_to_idx)
+            * len(self.state_to_idx)
+            * (np.dtype(bool).itemsize + np.dtype(np.int32).itemsize)
+        )
+        batch_size = max(1, memory_budget // max(1, block_bytes))
+
+        ordered_start_states = list(self.start_states)
+        for begin in range(0, len(ordered_start_states), batch_size):
+            distances = self._sync_bfs_distances(
+                other=other,
+                reachable_per_node=True,
+                ordered_start_states=ordered_start_states[begin : begin + batch_size],
+                max_depth=max_depth,
+            )
+            yield self._sync_bfs_results(
+                distances, reachable_per_node=True, with_distances=with_distances
+            )
+
+    def sync_bfs_many(
+        self,
+        others: List["BoolMatrixAutomaton"],
+        reachable_per_node: bool,
+        with_distances: bool = False,
+        max_depth: Optional[int] = None,
+    ) -> List[Set[Any]]:
+        """Executes sync bfs of self with each of several automatons at once
+
+        Automatons are combined into their tagged direct sum,
+        so the front is multiplied by matrices of self once per level for all of them.
+        The result for each automaton is the same as of sync_bfs
+
+        Parameters
+        ----------
+        others : List[BoolMatrixAutomaton]
+            The matrices with which bfs will be executed
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        with_distances: bool
+            Means each result is supplemented with the bfs level
+            at which it has been reached first, i.e. the length of the shortest path
+        max_depth: Optional[int]
+            Maximal number of bfs levels. If parameter is None then bfs is not bounded
+
+        Returns
+        -------
+        result : List[Set[Any]]
+            Results of sync_bfs in the order of others
+        """
+        tagged_sum = self.tagged_direct_sum(others)
+        tags = np.repeat(
+            np.arange(len(others)), [len(other.state_to_idx) for other in others]
+        )
+
+        self_idx_to_state = {idx: state for state, idx in self.state_to_idx.items()}
+        ordered_start_states = list(self.start_states)
+        distances = [dict() for _ in others]
+        for depth, blocks, other_indices, self_indices in self._sync_bfs_levels(
+            other=tagged_sum,
+            reachable_per_node=reachable_per_node,
+            ordered_start_states=ordered_start_states,
+            max_depth=max_depth,
+        ):
+            for block, tag, j in zip(blocks, tags[other_indices], self_indices):
+                distances[tag].setdefault(
+                    self._sync_bfs_result(
+                        self_idx_to_state,
+                        reachable_per_node,
+                        ordered_start_states,
+                        block,
+                        j,
+                    ),
+                    depth,
+                )
+
+        return [
+            self._sync_bfs_results(other_distances, reachable_per_node, with_distances)
+            for other_distances in distances
+        ]
+
+    @classmethod
+    def tagged_direct_sum(
+        cls, automatons: List["BoolMatrixAutomaton"]
+    ) -> "BoolMatrixAutomaton":
+        """Calculates direct sum of several automatons represented by bool matrices
+
+        States are tagged with the index of their automaton,
+        so automatons may share states, and labels of all automatons are kept
+
+        Parameters
+        ----------
+        automatons : List[BoolMatrixAutomaton]
+            Automatons to be summed
 
         Returns
         -------
         direct_sum : BoolMatrixAutomaton
-            Direct sum
+            Direct sum, where state S of automaton with index I is State((I, S.value))
         """
-        shifted_state_to_idx = {
-            state: len(self.state_to_idx) + idx
-            for state, idx in other.state_to_idx.items()
-        }
-        state_to_idx = {**self.state_to_idx, **shifted_state_to_idx}
-        start_states = self.start_states | other.start_states
-        final_states = self.final_states | other.final_states
+        state_to_idx = dict()
+        start_states, final_states = set(), set()
+        for tag, automaton in enumerate(automatons):
+            offset = len(state_to_idx)
+            for state, idx in automaton.state_to_idx.items():
+                tagged_state = State((tag, state.value))
+                state_to_idx[tagged_state] = offset + idx
+                if state in automaton.start_states:
+                    start_states.add(tagged_state)
+                if state in automaton.final_states:
+                    final_states.add(tagged_state)
+
+        labels = set().union(*(automaton.b_mtx.keys() for automaton in automatons))
         b_mtx = {
-            label: bmat(
+            label: block_diag(
                 [
-                    [self.b_mtx[label], None],
-                    [None, other.b_mtx[label]],
+                    (
+                        automaton.b_mtx[label]
+                        if label in automaton.b_mtx
+                        else csr_matrix((len(automaton.state_to_idx),) * 2, dtype=bool)
+                    )
+                    for automaton in automatons
                 ],
+                format="csr",
+                dtype=bool,
             )
-            for label in self.b_mtx.keys() & other.b_mtx.keys()
+            for label in labels
         }
-        return BoolMatrixAutomaton(
+        return cls(
             state_to_idx=state_to_idx,
             start_states=start_states,
             final_states=final_states,
             b_mtx=b_mtx,
         )
 
-    def sync_bfs(
+    def _sync_bfs_distances(
+        self,
+        other: "BoolMatrixAutomaton",
+        reachable_per_node: bool,
+        ordered_start_states: List[State],
+        max_depth: Optional[int],
+    ) -> Dict[Any, int]:
+        """Executes sync bfs collecting the level at which each result is reached first
+
+        Parameters
+        ----------
+        other : BoolMatrixAutomaton
+            The matrix with which bfs will be executed
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        ordered_start_states: List[State]
+            List of start states
+        max_depth: Optional[int]
+            Maximal number of bfs levels. If parameter is None then bfs is not bounded
+
+        Returns
+        -------
+        distances : Dict[Any, int]
+            Mapping from results to the bfs level at which they have been reached
+        """
+        self_idx_to_state = {idx: state for state, idx in self.state_to_idx.items()}
+        distances = dict()
+        for depth, blocks, _, self_indices in self._sync_bfs_levels(
+            other=other,
+            reachable_per_node=reachable_per_node,
+            ordered_start_states=ordered_start_states,
+            max_depth=max_depth,
+        ):
+            for block, j in zip(blocks, self_indices):
+                distances.setdefault(
+                    self._sync_bfs_result(
+                        self_idx_to_state,
+                        reachable_per_node,
+                        ordered_start_states,
+                        block,
+                        j,
+                    ),
+                    depth,
+                )
+        return distances
+
+    def _sync_bfs_levels(
         self,
         other: "BoolMatrixAutomaton",
         reachable_per_node: bool,
+        ordered_start_states: List[State],
+        max_depth: Optional[int],
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+        """Executes sync bfs level by level reporting newly reached pairs of final states
+
+        Parameters
+        ----------
+        other : BoolMatrixAutomaton
+            The matrix with which bfs will be executed
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        ordered_start_states: List[State]
+            List of start states
+        max_depth: Optional[int]
+            Maximal number of bfs levels. If parameter is None then bfs is not bounded
+
+        Returns
+        -------
+        levels : Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]
+            For each level, its depth and arrays of blocks of the front,
+            indices of final states of other and indices of final states of self
+            that have been reached first at this level
+        """
+        if not self.state_to_idx or not other.state_to_idx:
+            return
+
+        initial_front = self._init_sync_bfs_front(
+            other=other,
+            reachable_per_node=reachable_per_node,
+            ordered_start_states=ordered_start_states,
+        )
+        if not initial_front.nnz:
+            return
+
+        other_states_num = len(other.state_to_idx)
+        steps = self._sync_bfs_steps(
+            other=other,
+            blocks_num=initial_front.shape[0] // other_states_num,
+            backward=False,
+        )
+
+        other_final_mask = np.zeros(other_states_num, dtype=bool)
+        other_final_mask[[other.state_to_idx[s] for s in other.final_states]] = True
+        self_final_mask = np.zeros(len(self.state_to_idx), dtype=bool)
+        self_final_mask[[self.state_to_idx[s] for s in self.final_states]] = True
+
+        front = initial_front
+        # Only pairs reached by non-empty paths are visited, so pairs
+        # of the initial front are reported when a cycle leads back to them
+        visited = csr_matrix(front.shape, dtype=bool)
+        depth = 0
+
+        while front.nnz and (max_depth is None or depth < max_depth):
+            front = self._sync_bfs_next_front(front=front, visited=visited, steps=steps)
+            visited = visited + front
+            depth += 1
+
+            rows, cols = front.nonzero()
+            other_indices = rows % other_states_num
+            reached_final = other_final_mask[other_indices] & self_final_mask[cols]
+            yield (
+                depth,
+                rows[reached_final] // other_states_num,
+                other_indices[reached_final],
+                cols[reached_final],
+            )
+
+    @staticmethod
+    def _sync_bfs_result(
+        self_idx_to_state: Dict[int, State],
+        reachable_per_node: bool,
+        ordered_start_states: List[State],
+        block: int,
+        self_idx: int,
+    ) -> Any:
+        """Converts reached pair of block of the front and state of self to the result
+
+        Parameters
+        ----------
+        self_idx_to_state : Dict[int, State]
+            Mapping from indices to states of self
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        ordered_start_states: List[State]
+            List of start states
+        block : int
+            Block of the front
+        self_idx : int
+            Index of reached state of self
+
+        Returns
+        -------
+        result : Any
+            Reached node or pair of start node and reached node
+        """
+        self_value = self_idx_to_state[self_idx].value
+        if not reachable_per_node:
+            return self_value
+        return ordered_start_states[block].value, self_value
+
+    @staticmethod
+    def _sync_bfs_results(
+        distances: Dict[Any, int], reachable_per_node: bool, with_distances: bool
     ) -> Set[Any]:
-        """Executes sync bfs on two automatons represented by bool matrices
+        """Converts reached results and their distances to the result of sync bfs
+
+        Parameters
+        ----------
+        distances : Dict[Any, int]
+            Mapping from results to the bfs level at which they have been reached
+        reachable_per_node: bool
+            Means calculates reachability for each node separately or not
+        with_distances: bool
+            Means each result is supplemented with its distance
+
+        Returns
+        -------
+        result : Set[Any]
+            Results of sync bfs
+        """
+        if not with_distances:
+            return set(distances)
+        return {
+            (*result, distance) if reachable_per_node else (result, distance)
+            for result, distance in distances.items()
+        }
+
+    def bidirectional_bfs(
+        self,
+        other: "BoolMatrixAutomaton",
+        reachable_per_node: bool,
+    ) -> Set[Any]:
+        """Executes bidirectional sync bfs on two automatons represented by bool matrices
+
+        Forward front starts from start states and backward front starts
+        from pairs of final states, the smaller front is expanded until
+        fronts meet for all pairs or one of the fronts is exhausted.
+        It explores less than sync_bfs when there are few start and final states,
+        the result is the same as of sync_bfs
 
         Parameters
         ----------
@@ -289,71 +1398,173 @@ class BoolMatrixAutomaton:
             return set()
 
         ordered_start_states = list(self.start_states)
+        ordered_final_pairs = [
+            (other_state, self_state)
+            for other_state in other.final_states
+            for self_state in self.final_states
+        ]
 
-        direct_sum = other._direct_sum(self)
-        initial_front = self._init_sync_bfs_front(
+        forward_front = self._init_sync_bfs_front(
             other=other,
             reachable_per_node=reachable_per_node,
             ordered_start_states=ordered_start_states,
         )
-        front = initial_front
-        visited = front.copy()
+        if not forward_front.nnz or not ordered_final_pairs:
+            return set()
 
         other_states_num = len(other.state_to_idx)
+        forward_blocks_num = forward_front.shape[0] // other_states_num
+        backward_blocks_num = len(ordered_final_pairs)
+        backward_front = csr_matrix(
+            (
+                np.ones(backward_blocks_num, dtype=bool),
+                (
+                    np.arange(backward_blocks_num) * other_states_num
+                    + [other.state_to_idx[o] for o, _ in ordered_final_pairs],
+                    [self.state_to_idx[s] for _, s in ordered_final_pairs],
+                ),
+            ),
+            shape=(backward_blocks_num * other_states_num, len(self.state_to_idx)),
+        )
 
-        while True:
-            visited_nnz = visited.nnz
-            new_front = front.copy()
-
-            for _, mtx in direct_sum.b_mtx.items():
-                product: csr_matrix = front @ mtx
-                new_front_step = lil_array(product.shape)
-                for i, j in zip(*product.nonzero()):
-                    if j >= other_states_num:
-                        continue
-                    row = product.getrow(i).tolil()[[0], other_states_num:]
-                    if not row.nnz:
-                        continue
-                    row_shift = i // other_states_num * other_states_num
-                    new_front_step[row_shift + j, j] = 1
-                    new_front_step[[row_shift + j], other_states_num:] += row
-                new_front += new_front_step.tocsr()
-
-            for i, j in zip(*new_front.nonzero()):
-                if visited[i, j]:
-                    new_front[i, j] = 0
-
-            visited += new_front
-            front = new_front
-
-            if visited_nnz == visited.nnz:
-                break
-
-        self_idx_to_state = {idx: state for state, idx in self.state_to_idx.items()}
-        other_idx_to_state = {idx: state for state, idx in other.state_to_idx.items()}
+        # Final pairs that are initial themselves are reported by sync_bfs
+        # only if they are reached by non-empty paths
+        start_block_of = (
+            {state: block for block, state in enumerate(ordered_start_states)}
+            if reachable_per_node
+            else {state: 0 for state in ordered_start_states}
+        )
+        excluded_rows, excluded_cols = [], []
+        for final_idx, (other_state, self_state) in enumerate(ordered_final_pairs):
+            if other_state in other.start_states and self_state in start_block_of:
+                excluded_rows.append(start_block_of[self_state])
+                excluded_cols.append(final_idx)
+        excluded = csr_matrix(
+            (np.ones(len(excluded_rows), dtype=bool), (excluded_rows, excluded_cols)),
+            shape=(forward_blocks_num, backward_blocks_num),
+        )
+        candidates_num = forward_blocks_num * backward_blocks_num
 
-        result = set()
-        nonzero = set(zip(*visited.nonzero())).difference(
-            set(zip(*initial_front.nonzero()))
+        forward_steps = self._sync_bfs_steps(
+            other=other, blocks_num=forward_blocks_num, backward=False
         )
-        for i, j in nonzero:
-            if (
-                other_idx_to_state[i % other_states_num] not in other.final_states
-                or j < other_states_num
-            ):
-                continue
-            self_state = self_idx_to_state[j - other_states_num]
-            if self_state not in self.final_states:
-                continue
-            result.add(
-                self_state.value
-                if not reachable_per_node
-                else (
-                    ordered_start_states[i // other_states_num].value,
-                    self_state.value,
+        backward_steps = self._sync_bfs_steps(
+            other=other, blocks_num=backward_blocks_num, backward=True
+        )
+        # Forward visited pairs are reached by non-empty paths, as in sync_bfs.
+        # The first step is always made, so non-empty paths are found
+        # even if the backward front is exhausted first
+        initial_front = forward_front
+        forward_front = self._sync_bfs_next_front(
+            front=initial_front,
+            visited=csr_matrix(initial_front.shape, dtype=bool),
+            steps=forward_steps,
+        )
+        forward_visited = forward_front.copy()
+        backward_visited = backward_front.copy()
+
+        def meet() -> csr_matrix:
+            flat_shape = other_states_num * len(self.state_to_idx)
+            backward_flat = backward_visited.reshape(
+                (backward_blocks_num, flat_shape)
+            ).T.tocsr()
+            return (
+                forward_visited.reshape((forward_blocks_num, flat_shape)).tocsr()
+                @ backward_flat
+            ) + (
+                (
+                    initial_front.reshape((forward_blocks_num, flat_shape)).tocsr()
+                    @ backward_flat
                 )
+                > excluded
+            )
+
+        met = meet()
+        while met.nnz < candidates_num and forward_front.nnz and backward_front.nnz:
+            if forward_front.nnz <= backward_front.nnz:
+                forward_front = self._sync_bfs_next_front(
+                    front=forward_front, visited=forward_visited, steps=forward_steps
+                )
+                forward_visited = forward_visited + forward_front
+            else:
+                backward_front = self._sync_bfs_next_front(
+                    front=backward_front, visited=backward_visited, steps=backward_steps
+                )
+                backward_visited = backward_visited + backward_front
+            met = meet()
+
+        return {
+            (
+                ordered_final_pairs[j][1].value
+                if not reachable_per_node
+                else (ordered_start_states[i].value, ordered_final_pairs[j][1].value)
+            )
+            for i, j in zip(*met.nonzero())
+        }
+
+    def _sync_bfs_steps(
+        self,
+        other: "BoolMatrixAutomaton",
+        blocks_num: int,
+        backward: bool,
+    ) -> List[Tuple[csr_matrix, csr_matrix]]:
+        """Builds matrices of one step of sync bfs for each common label
+
+        Parameters
+        ----------
+        other : BoolMatrixAutomaton
+            The matrix with which bfs will be executed
+        blocks_num : int
+            Number of blocks of rows in the front
+        backward : bool
+            Means the step goes along transitions or against them
+
+        Returns
+        -------
+        steps : List[Tuple[csr_matrix, csr_matrix]]
+            Pairs of matrices by which the front is multiplied on the left and on the right
+        """
+        return [
+            (
+                kron(
+                    eye(blocks_num, dtype=bool),
+                    other.b_mtx[label] if backward else other.b_mtx[label].T,
+                    format="csr",
+                ),
+                (self.b_mtx[label].T if backward else self.b_mtx[label]).tocsr(),
+            )
+            for label in self.b_mtx.keys() & other.b_mtx.keys()
+        ]
+
+    @staticmethod
+    def _sync_bfs_next_front(
+        front: csr_matrix,
+        visited: csr_matrix,
+        steps: List[Tuple[csr_matrix, csr_matrix]],
+    ) -> csr_matrix:
+        """Calculates the next front of sync bfs
+
+        Parameters
+        ----------
+        front : csr_matrix
+            Current front
+        visited : csr_matrix
+            Pairs of states visited so far
+        steps : List[Tuple[csr_matrix, csr_matrix]]
+            Matrices of one step of sync bfs
+
+        Returns
+        -------
+        front : csr_matrix
+            Pairs of states reached from the current front and not visited before
+        """
+        return (
+            sum(
+                (left @ front @ right for left, right in steps),
+                start=csr_matrix(front.shape, dtype=bool),
             )
-        return result
+            > visited
+        )
 
     def _init_sync_bfs_front(
         self,
@@ -369,7 +1580,7 @@ class BoolMatrixAutomaton:
             The matrix with which bfs will be executed
         reachable_per_node: bool
             Means calculates reachability for each node separately or not
-            ordered_start_states: List[State]
+        ordered_start_states: List[State]
             List of start states
 
         Returns
@@ -377,52 +1588,238 @@ class BoolMatrixAutomaton:
         result : csr_matrix
             Initial front for sync bfs
         """
-
-        def front_with_self_start_row(self_start_row: lil_array):
-            front = lil_array(
-                (
-                    len(other.state_to_idx),
-                    len(self.state_to_idx) + len(other.state_to_idx),
-                )
-            )
-            for state in other.start_states:
-                idx = other.state_to_idx[state]
-                front[idx, idx] = 1
-                front[idx, len(other.state_to_idx) :] = self_start_row
-            return front
+        other_states_num = len(other.state_to_idx)
+        other_start_indices = np.array(
+            [other.state_to_idx[state] for state in other.start_states], dtype=int
+        )
+        self_start_indices = np.array(
+            [self.state_to_idx[state] for state in ordered_start_states], dtype=int
+        )
 
         if not reachable_per_node:
-            start_indices = set(
-                self.state_to_idx[state] for state in ordered_start_states
+            rows = np.repeat(other_start_indices, len(self_start_indices))
+            cols = np.tile(self_start_indices, len(other_start_indices))
+            shape = (other_states_num, len(self.state_to_idx))
+        else:
+            rows = (
+                np.arange(len(self_start_indices))[:, None] * other_states_num
+                + other_start_indices[None, :]
+            ).ravel()
+            cols = np.repeat(self_start_indices, len(other_start_indices))
+            shape = (
+                len(self_start_indices) * other_states_num,
+                len(self.state_to_idx),
             )
-            return front_with_self_start_row(
-                lil_array(
-                    [
-                        1 if idx in start_indices else 0
-                        for idx in range(len(self.state_to_idx))
-                    ]
-                )
-            ).tocsr()
 
-        fronts = [
-            front_with_self_start_row(
-                lil_array(
-                    [
-                        1 if idx == self.state_to_idx[start] else 0
-                        for idx in range(len(self.state_to_idx))
-                    ]
-                )
-            )
-            for start in ordered_start_states
-        ]
-
-        return (
-            csr_matrix(vstack(fronts))
-            if fronts
-            else csr_matrix(
-                (
-                    len(other.state_to_idx),
-                    len(self.state_to_idx) + len(other.state_to_idx),
-                )
-            )
+        return csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)),
+            shape=shape,
         )
+
+
+def _node_to_idx(
+    nodes: Iterable[Any], start_states: Optional[Set], final_states: Optional[Set]
+) -> Dict[Any, int]:
+    """Numbers nodes of graph and start and final states which are not its nodes
+
+    Parameters
+    ----------
+    nodes : Iterable[Any]
+        Nodes of the graph
+    start_states : Optional[Set]
+        Set of nodes that will be treated as start states
+    final_states : Optional[Set]
+        Set of nodes that will be treated as final states
+
+    Returns
+    -------
+    node_to_idx : Dict[Any, int]
+        Mapping from nodes to indices, nodes of the graph go first
+    """
+    node_to_idx = {node: idx for idx, node in enumerate(nodes)}
+    for node in (start_states or set()) | (final_states or set()):
+        node_to_idx.setdefault(node, len(node_to_idx))
+    return node_to_idx
+
+
+def _states_by_idx(state_to_idx: Dict[State, int]) -> List[State]:
+    """Inverts numbering of states
+
+    Parameters
+    ----------
+    state_to_idx : Dict[State, int]
+        Mapping from states to indices
+
+    Returns
+    -------
+    states : List[State]
+        List where i-th element is the state with index i
+    """
+    states = [None] * len(state_to_idx)
+    for state, idx in state_to_idx.items():
+        states[idx] = state
+    return states
+
+
+def _product_successors(
+    first: csr_matrix,
+    second: csr_matrix,
+    first_states: np.ndarray,
+    second_states: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Finds successors of pairs of states in the product of two automatons
+    by transitions labeled with the same label
+
+    Parameters
+    ----------
+    first : csr_matrix
+        Adjacency matrix of the label in the first automaton
+    second : csr_matrix
+        Adjacency matrix of the label in the second automaton
+    first_states : np.ndarray
+        States of the first automaton of the pairs
+    second_states : np.ndarray
+        States of the second automaton of the pairs
+
+    Returns
+    -------
+    successors : Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Indices of pairs, successors in the first automaton
+        and successors in the second automaton
+    """
+    first_counts = np.diff(first.indptr)[first_states]
+    second_counts = np.diff(second.indptr)[second_states]
+    pair_counts = first_counts * second_counts
+    pair_idx = np.repeat(np.arange(len(first_states)), pair_counts)
+    # Position of the successor among the successors of its pair
+    offsets = np.arange(len(pair_idx)) - np.repeat(
+        np.cumsum(pair_counts) - pair_counts, pair_counts
+    )
+    first_offsets, second_offsets = np.divmod(offsets, second_counts[pair_idx])
+    return (
+        pair_idx,
+        first.indices[first.indptr[first_states[pair_idx]] + first_offsets],
+        second.indices[second.indptr[second_states[pair_idx]] + second_offsets],
+    )
+
+
+def _reachable_mask(adjacency: csr_matrix, sources: Iterable[int]) -> np.ndarray:
+    """Finds states reachable from sources by paths of any length
+
+    Parameters
+    ----------
+    adjacency : csr_matrix
+        Square bool adjacency matrix
+    sources : Iterable[int]
+        Indices of source states
+
+    Returns
+    -------
+    reachable : np.ndarray
+        Bool mask of reachable states
+    """
+    reachable = np.zeros(adjacency.shape[0], dtype=bool)
+    front = np.zeros(adjacency.shape[0], dtype=bool)
+    front[list(sources)] = True
+    transposed = adjacency.T.tocsr()
+    while front.any():
+        reachable |= front
+        front = (transposed @ front.astype(np.int32) > 0) & ~reachable
+    return reachable
+
+
+def _hopcroft_partition(
+    transitions: List[np.ndarray], is_final: np.ndarray
+) -> np.ndarray:
+    """Splits states of complete DFA into classes of equivalent states
+    using Hopcroft partition refinement
+
+    Parameters
+    ----------
+    transitions : List[np.ndarray]
+        For each label, the target state of each state
+    is_final : np.ndarray
+        Bool mask of final states
+
+    Returns
+    -------
+    block_of : np.ndarray
+        Class of each state
+    """
+    states_num = len(is_final)
+    # Inverse transitions of each label: sources of state t are
+    # inverse_order[inverse_bounds[t] : inverse_bounds[t + 1]]
+    inverse = []
+    for targets in transitions:
+        order = np.argsort(targets, kind="stable")
+        bounds = np.searchsorted(targets[order], np.arange(states_num + 1))
+        inverse.append((order, bounds))
+
+    block_of = np.where(is_final, 0, 1)
+    members = [np.flatnonzero(is_final), np.flatnonzero(~is_final)]
+    if not len(members[0]) or not len(members[1]):
+        return np.zeros(states_num, dtype=np.int64)
+
+    smaller = 0 if len(members[0]) <= len(members[1]) else 1
+    worklist = [(smaller, label) for label in range(len(transitions))]
+    in_worklist = set(worklist)
+    in_splitter = np.zeros(states_num, dtype=bool)
+
+    while worklist:
+        splitter = worklist.pop()
+        in_worklist.discard(splitter)
+        block, label = splitter
+        order, bounds = inverse[label]
+        splitter_members = members[block]
+        starts, ends = bounds[splitter_members], bounds[splitter_members + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            continue
+        positions = np.repeat(
+            starts - np.cumsum(lengths) + lengths, lengths
+        ) + np.arange(lengths.sum())
+        sources = order[positions]
+
+        in_splitter[sources] = True
+        for touched in np.unique(block_of[sources]):
+            touched_members = members[touched]
+            inside = in_splitter[touched_members]
+            if inside.all():
+                continue
+            new_block = len(members)
+            members[touched] = touched_members[~inside]
+            members.append(touched_members[inside])
+            block_of[members[new_block]] = new_block
+            for other_label in range(len(transitions)):
+                if (touched, other_label) in in_worklist:
+                    added = (new_block, other_label)
+                elif len(members[touched]) <= len(members[new_block]):
+                    added = (touched, other_label)
+                else:
+                    added = (new_block, other_label)
+                worklist.append(added)
+                in_worklist.add(added)
+        in_splitter[sources] = False
+
+    return block_of
+
+
+def _reflexive_transitive_closure(mtx: Any) -> csr_matrix:
+    """Calculates reflexive transitive closure of bool matrix by repeated squaring
+
+    Parameters
+    ----------
+    mtx : Any
+        Square bool sparse matrix
+
+    Returns
+    -------
+    closure : csr_matrix
+        Reflexive transitive closure
+    """
+    closure = eye(mtx.shape[0], dtype=bool, format="csr") + mtx.tocsr()
+    prev_nnz = None
+    while prev_nnz != closure.nnz:
+        prev_nnz = closure.nnz
+        closure = closure @ closure
+    return closure
@@ -0,0 +1,246 @@
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union, IO
+
+import pydot
+from pyformlang.cfg import Production, Terminal, Variable
+from pyformlang.cfg.parse_tree import ParseTree
+
+__all__ = [
+    "SymbolNode",
+    "IntermediateNode",
+    "ParseForest",
+    "save_parse_forest_as_dot",
+]
+
+
+class SymbolNode(NamedTuple):
+    """Class represents node of parse forest for symbol deriving a subword
+
+    Attributes
+    ----------
+
+    symbol : Union[Variable, Terminal]
+        Non-terminal or terminal
+    begin : int
+        Index of the first character of the subword
+    end : int
+        Index following the last character of the subword
+    """
+
+    symbol: Union[Variable, Terminal]
+    begin: int
+    end: int
+
+
+class IntermediateNode(NamedTuple):
+    """Class represents node of parse forest for prefix of production body
+    deriving a subword, such nodes binarize families of symbol nodes
+
+    Attributes
+    ----------
+
+    production : Production
+        Production of the grammar
+    dot : int
+        Length of the prefix of the body
+    begin : int
+        Index of the first character of the subword
+    end : int
+        Index following the last character of the subword
+    """
+
+    production: Production
+    dot: int
+    begin: int
+    end: int
+
+
+# Family of symbol node of non-terminal is the intermediate node of the whole body
+# of its production. Family of intermediate node is the intermediate node of the
+# shorter prefix, None for the empty one, and the node of the last symbol of the prefix
+Family = Union[IntermediateNode, Tuple[Optional[IntermediateNode], SymbolNode]]
+
+
+class ParseForest(NamedTuple):
+    """Class represents shared packed parse forest of a word
+
+    Each node has the list of its families (packed nodes), alternative
+    derivations of the node share their common subderivations,
+    so the size of the forest is polynomial in the length of the word
+    even if the number of parse trees is exponential
+
+    Attributes
+    ----------
+
+    root : SymbolNode
+        Node of the start symbol deriving the whole word
+    families : Dict[Union[SymbolNode, IntermediateNode], List[Family]]
+        Mapping from nodes to their families, nodes of terminals have no families
+    """
+
+    root: SymbolNode
+    families: Dict[Union[SymbolNode, IntermediateNode], List[Family]]
+
+    def is_ambiguous(self) -> bool:
+        """Checks that the word has more than one parse tree
+
+        Returns
+        -------
+        result : bool
+            Whether a node of the forest has several families
+        """
+        return any(len(families) > 1 for families in self.families.values())
+
+    def trees(self) -> Iterator[ParseTree]:
+        """Lazily enumerates parse trees of the word
+
+        Trees are generated one by one, so only the current tree and
+        the forest are kept in memory. Derivations where a symbol node
+        is a proper descendant of itself are skipped, so the number of
+        enumerated trees is finite even for cyclic grammars
+
+        Returns
+        -------
+        trees : Iterator[ParseTree]
+            Parse trees, sons of nodes of empty productions are empty
+        """
+        return self._symbol_trees(self.root, frozenset())
+
+    def _symbol_trees(
+        self, node: SymbolNode, ancestors: frozenset
+    ) -> Iterator[ParseTree]:
+        """Enumerates trees of symbol node
+
+        Parameters
+        ----------
+        node : SymbolNode
+            Node of the forest
+        ancestors : frozenset
+            Symbol nodes on the path from the root
+
+        Returns
+        -------
+        trees : Iterator[ParseTree]
+            Parse trees of the node
+        """
+        if isinstance(node.symbol, Terminal):
+            yield ParseTree(node.symbol)
+            return
+        if node in ancestors:
+            return
+        ancestors = ancestors | {node}
+        for body_node in self.families.get(node, []):
+            for sons in self._prefix_trees(body_node, ancestors):
+                tree = ParseTree(node.symbol)
+                tree.sons = sons
+                yield tree
+
+    def _prefix_trees(
+        self, node: IntermediateNode, ancestors: frozenset
+    ) -> Iterator[List[ParseTree]]:
+        """Enumerates lists of trees of symbols of the body prefix
+
+        Parameters
+        ----------
+        node : IntermediateNode
+            Node of the forest
+        ancestors : frozenset
+            Symbol nodes on the path from the root
+
+        Returns
+        -------
+        trees : Iterator[List[ParseTree]]
+            Lists of parse trees of the symbols of the prefix
+        """
+        if node.dot == 0:
+            yield []
+            return
+        for prefix_node, last_node in self.families.get(node, []):
+            prefixes = (
+                self._prefix_trees(prefix_node, ancestors)
+                if prefix_node is not None
+                else iter([[]])
+            )
+            for prefix in prefixes:
+                for last_tree in self._symbol_trees(last_node, ancestors):
+                    yield prefix + [last_tree]
+
+
+def save_parse_forest_as_dot(forest: ParseForest, file: Union[str, IO]) -> None:
+    """Saves parse forest as dot
+
+    Symbol nodes are ellipses, terminals are boxes, intermediate nodes are
+    dotted productions and families are points
+
+    Parameters
+    ----------
+    forest : ParseForest
+        Parse forest
+
+    file: Union[str, IO]
+        The name of file or file itself
+    """
+    dot = pydot.Dot("parse_forest", strict=True)
+    ids: Dict[Union[SymbolNode, IntermediateNode], int] = dict()
+    visited: Set[Union[SymbolNode, IntermediateNode]] = set()
+
+    def node_id(node: Union[SymbolNode, IntermediateNode]) -> int:
+        if node not in ids:
+            ids[node] = len(ids)
+            if isinstance(node, SymbolNode):
+                is_terminal = isinstance(node.symbol, Terminal)
+                dot.add_node(
+                    pydot.Node(
+                        ids[node],
+                        label=f'"{_escape(node.symbol.value)}, {node.begin}, {node.end}"',
+                        shape="box" if is_terminal else "ellipse",
+                    )
+                )
+            else:
+                body = [_escape(symbol.value) for symbol in node.production.body]
+                body.insert(node.dot, ".")
+                dot.add_node(
+                    pydot.Node(
+                        ids[node],
+                        label=f'"{_escape(node.production.head.value)} -> '
+                        f'{" ".join(body)}, {node.begin}, {node.end}"',
+                        shape="note",
+                    )
+                )
+        return ids[node]
+
+    node_id(forest.root)
+    stack = [forest.root]
+    visited.add(forest.root)
+    packed_num = 0
+    while stack:
+        node = stack.pop()
+        for family in forest.families.get(node, []):
+            packed_id = f"p{packed_num}"
+            packed_num += 1
+            dot.add_node(pydot.Node(packed_id, shape="point"))
+            dot.add_edge(pydot.Edge(node_id(node), packed_id))
+            children = (family,) if isinstance(family, IntermediateNode) else family
+            for child in children:
+                if child is None:
+                    continue
+                dot.add_edge(pydot.Edge(packed_id, node_id(child)))
+                if child not in visited:
+                    visited.add(child)
+                    stack.append(child)
+    dot.write(str(file))
+
+
+def _escape(value) -> str:
+    """Escapes quotes and backslashes of a label of dot node
+
+    Parameters
+    ----------
+    value : Any
+        Value of a symbol
+
+    Returns
+    -------
+    label : str
+        Escaped text of the value
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict, defaultdict
+from typing import NamedTuple, Optional, Union
+
+from pyformlang.regular_expression import Regex
+from scipy.sparse import dok_matrix
+
+from project.automata import regex_to_min_dfa
+from project.matrix_utils import BoolMatrixAutomaton
+from project.regex_compiler import _tree_of_regex
+
+__all__ = [
+    "QueryCacheInfo",
+    "RegexQueryCache",
+]
+
+
+class QueryCacheInfo(NamedTuple):
+    """Class represents statistics of regex query cache
+
+    Attributes
+    ----------
+
+    hits : int
+        Number of queries found in memory
+    disk_hits : int
+        Number of queries loaded from persistent tier
+    misses : int
+        Number of queries that have been compiled
+    size : int
+        Number of queries stored in memory
+    max_size : int
+        Maximal number of queries stored in memory
+    """
+
+    hits: int
+    disk_hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class RegexQueryCache:
+    # Version of persistent tier format, files of other versions are ignored
+    _DISK_FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        cache_dir: Optional[Union[str, os.PathLike]] = None,
+    ):
+        """Class represents bounded cache from regex text
+        to compiled minimal DFA represented by bool matrices
+
+        Attributes
+        ----------
+
+        max_size : int
+            Maximal number of queries stored in memory,
+            the least recently used query is evicted first
+        cache_dir : Optional[Union[str, os.PathLike]]
+            Directory of persistent tier. If parameter is None
+            then compiled queries are stored only in memory
+        """
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive")
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, query: Union[str, Regex]) -> BoolMatrixAutomaton:
+        """Returns compiled query, compiles it if it is not cached
+
+        Parameters
+        ----------
+        query : Union[str, Regex]
+            Regular expression or its text
+
+        Returns
+        -------
+        query_bool_mtx : BoolMatrixAutomaton
+            Minimal DFA of query represented by bool matrices.
+            It is shared between calls so must not be modified
+        """
+        key = self._key_of(query)
+        with self._lock:
+            if key in self._queries:
+                self._hits += 1
+                self._queries.move_to_end(key)
+                return self._queries[key]
+
+        query_bool_mtx = self._load_from_disk(key)
+        if query_bool_mtx is None:
+            query_bool_mtx = self._compile(query)
+            self._save_to_disk(key, query_bool_mtx)
+            with self._lock:
+                self._misses += 1
+        else:
+            with self._lock:
+                self._disk_hits += 1
+
+        with self._lock:
+            self._queries[key] = query_bool_mtx
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_size:
+                self._queries.popitem(last=False)
+        return query_bool_mtx
+
+    def cache_info(self) -> QueryCacheInfo:
+        """Returns statistics of the cache
+
+        Returns
+        -------
+        info : QueryCacheInfo
+            Hit and miss counters and size of the cache
+        """
+        with self._lock:
+            return QueryCacheInfo(
+                hits=self._hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                size=len(self._queries),
+                max_size=self.max_size,
+            )
+
+    def clear(self) -> None:
+        """Clears in-memory tier and counters, persistent tier is kept
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._queries.clear()
+            self._hits = self._disk_hits = self._misses = 0
+
+    @staticmethod
+    def _key_of(query: Union[str, Regex]) -> str:
+        """Returns the cache key of the query
+
+        Parameters
+        ----------
+        query : Union[str, Regex]
+            Regular expression or its text
+
+        Returns
+        -------
+        key : str
+            Serialized tree of the parsed query, so text and the equivalent Regex
+            have the same key. Unlike the text of Regex, the tree tells
+            epsilon from the symbol "$"
+        """
+        return repr(_tree_of_regex(Regex(query) if isinstance(query, str) else query))
+
+    @staticmethod
+    def _compile(query: Union[str, Regex]) -> BoolMatrixAutomaton:
+        """Compiles query to minimal DFA represented by bool matrices
+
+        Parameters
+        ----------
+        query : Union[str, Regex]
+            Regular expression or its text
+
+        Returns
+        -------
+        query_bool_mtx : BoolMatrixAutomaton
+            Compiled query
+        """
+        regex = Regex(query) if isinstance(query, str) else query
+        return BoolMatrixAutomaton.from_nfa(regex_to_min_dfa(regex=regex))
+
+    def _path_of(self, key: str) -> str:
+        """Returns the path of file of persistent tier storing the query
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the query
+
+        Returns
+        -------
+        path : str
+            Path of the file
+        """
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(
+            self.cache_dir, f"{digest}.v{self._DISK_FORMAT_VERSION}.pickle"
+        )
+
+    def _load_from_disk(self, key: str) -> Optional[BoolMatrixAutomaton]:
+        """Loads compiled query from persistent tier
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the query
+
+        Returns
+        -------
+        query_bool_mtx : Optional[BoolMatrixAutomaton]
+            Compiled query or None if it is not stored
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path_of(key), "rb") as f:
+                stored_key, state_to_idx, start_states, final_states, b_mtx = (
+                    pickle.load(f)
+                )
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if stored_key != key:
+            return None
+        # Matrices are pickled as dict, missing labels get empty matrices
+        # as in the compiled query
+        states_num = len(state_to_idx)
+        return BoolMatrixAutomaton(
+            state_to_idx=state_to_idx,
+            start_states=start_states,
+            final_states=final_states,
+            b_mtx=defaultdict(
+                lambda: dok_matrix((states_num, states_num), dtype=bool), b_mtx
+            ),
+        )
+
+    def _save_to_disk(self, key: str, query_bool_mtx: BoolMatrixAutomaton) -> None:
+        """Saves compiled query to persistent tier
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the query
+        query_bool_mtx : BoolMatrixAutomaton
+            Compiled query
+
+        Returns
+        -------
+        None
+        """
+        if self.cache_dir is None:
+            return
+        path = self._path_of(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                (
+                    key,
+                    query_bool_mtx.state_to_idx,
+                    query_bool_mtx.start_states,
+                    query_bool_mtx.final_states,
+                    dict(query_bool_mtx.b_mtx),
+                ),
+                f,
+            )
+        os.replace(tmp_path, path)
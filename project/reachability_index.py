@@ -0,0 +1,334 @@
+import json
+import os
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple, Union
+
+import numpy as np
+from networkx import MultiDiGraph
+from pyformlang.finite_automaton import State
+from scipy.sparse import csr_matrix, eye, hstack
+from scipy.sparse.csgraph import connected_components
+
+from project.graph_store import GraphStore, MemmapGraphStore
+from project.matrix_utils import BoolMatrixAutomaton
+
+__all__ = [
+    "ReachabilityIndex",
+]
+
+
+class ReachabilityIndex:
+    # Version of file format, files of other versions are rejected
+    _FORMAT_VERSION = 1
+
+    # Only for internal use
+    def __init__(
+        self,
+        nodes: List[Any],
+        label_nnz: Dict[Any, int],
+        components: Dict[FrozenSet, np.ndarray],
+        component_closures: Dict[FrozenSet, csr_matrix],
+    ):
+        """Class represents precomputed reflexive transitive closures
+        of graph restricted to edges with labels from chosen label sets
+
+        Each closure is stored condensed: nodes are mapped to their strongly
+        connected components and the closure is calculated for the acyclic graph
+        of components, so node U reaches node V if the component of U
+        reaches the component of V
+
+        Attributes
+        ----------
+
+        nodes : List[Any]
+            Nodes of the graph in the order of indices of its bool matrix
+        label_nnz : Dict[Any, int]
+            Number of distinct edges of each indexed label when the index
+            has been built, it is used to detect that the index does not match
+            the graph, so it does not depend on repeated or explicit False entries
+        components : Dict[FrozenSet, np.ndarray]
+            Mapping from label set to the component of each node
+        component_closures : Dict[FrozenSet, csr_matrix]
+            Mapping from label set to reflexive transitive closure of components
+        """
+        self.nodes = nodes
+        self.label_nnz = label_nnz
+        self.components = components
+        self.component_closures = component_closures
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
+        label_sets: Iterable[Iterable[Any]],
+    ) -> "ReachabilityIndex":
+        """Builds reachability index of graph for given label sets
+
+        Parameters
+        ----------
+        graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+            Graph to be indexed, edge labels are stored in attribute "label"
+        label_sets : Iterable[Iterable[Any]]
+            Sets of labels, for each of them the closure of edges
+            with labels from the set is calculated, e.g. [{"a"}, {"a", "b"}]
+
+        Returns
+        -------
+        index : ReachabilityIndex
+            Reachability index of the graph
+        """
+        return cls.from_bool_matrix(
+            graph_bool_mtx=BoolMatrixAutomaton.from_graph(graph),
+            label_sets=label_sets,
+        )
+
+    @classmethod
+    def from_bool_matrix(
+        cls, graph_bool_mtx: BoolMatrixAutomaton, label_sets: Iterable[Iterable[Any]]
+    ) -> "ReachabilityIndex":
+        """Builds reachability index of graph represented by bool matrices
+
+        Parameters
+        ----------
+        graph_bool_mtx : BoolMatrixAutomaton
+            Bool matrix representation of graph
+        label_sets : Iterable[Iterable[Any]]
+            Sets of labels, for each of them the closure of edges
+            with labels from the set is calculated
+
+        Returns
+        -------
+        index : ReachabilityIndex
+            Reachability index of the graph
+        """
+        idx_to_state = {
+            idx: state for state, idx in graph_bool_mtx.state_to_idx.items()
+        }
+        nodes = [idx_to_state[idx].value for idx in range(len(idx_to_state))]
+        states_num = len(nodes)
+
+        components, component_closures, label_nnz = dict(), dict(), dict()
+        for labels in map(frozenset, label_sets):
+            adjacency = csr_matrix((states_num, states_num), dtype=bool)
+            for label in labels:
+                mtx = graph_bool_mtx.b_mtx.get(label)
+                label_nnz[label] = 0 if mtx is None else _edges_num(mtx)
+                if mtx is not None:
+                    adjacency = adjacency + mtx
+            components[labels], component_closures[labels] = _condensed_closure(
+                adjacency
+            )
+
+        return cls(
+            nodes=nodes,
+            label_nnz=label_nnz,
+            components=components,
+            component_closures=component_closures,
+        )
+
+    @property
+    def label_sets(self) -> List[FrozenSet]:
+        """Returns indexed label sets
+
+        Returns
+        -------
+        label_sets : List[FrozenSet]
+            Label sets for which closures are stored
+        """
+        return list(self.components)
+
+    def is_built_for(self, graph_bool_mtx: BoolMatrixAutomaton) -> bool:
+        """Checks that the index may be used for graph represented by bool matrices
+
+        Nodes of the graph must have the same indices, nodes added to the graph
+        as start or final states must follow them, and indexed labels
+        must have the same number of edges
+
+        Parameters
+        ----------
+        graph_bool_mtx : BoolMatrixAutomaton
+            Bool matrix representation of graph
+
+        Returns
+        -------
+        result : bool
+            Does the index match the graph
+        """
+        if len(graph_bool_mtx.state_to_idx) < len(self.nodes):
+            return False
+        if any(
+            graph_bool_mtx.state_to_idx.get(State(node)) != idx
+            for idx, node in enumerate(self.nodes)
+        ):
+            return False
+        return all(
+            (
+                _edges_num(graph_bool_mtx.b_mtx[label])
+                if label in graph_bool_mtx.b_mtx
+                else 0
+            )
+            == nnz
+            for label, nnz in self.label_nnz.items()
+        )
+
+    def reach_from(self, front: csr_matrix, labels: Iterable[Any]) -> csr_matrix:
+        """Calculates nodes reachable from front by paths
+        of any length with labels from given label set
+
+        Parameters
+        ----------
+        front : csr_matrix
+            Bool matrix where each row is a set of nodes.
+            Columns that follow nodes of the index are nodes without edges
+        labels : Iterable[Any]
+            Indexed label set
+
+        Returns
+        -------
+        reachable : csr_matrix
+            Bool matrix of the same shape as front, where each row
+            is the set of nodes reachable from nodes of the row of front
+        """
+        labels = frozenset(labels)
+        component_closure = self.component_closures[labels]
+        indexed_num = len(self.nodes)
+        membership = csr_matrix(
+            (
+                np.ones(indexed_num, dtype=bool),
+                self.components[labels],
+                np.arange(indexed_num + 1),
+            ),
+            shape=(indexed_num, component_closure.shape[0]),
+        )
+        front = front.tocsr()
+        reachable = (
+            front[:, :indexed_num] @ membership @ component_closure @ membership.T
+        ).tocsr()
+        if front.shape[1] == indexed_num:
+            return reachable
+        return hstack([reachable, front[:, indexed_num:]], format="csr")
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Saves the index to npz file
+
+        Nodes and labels are stored as JSON, so they must be JSON serializable
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        None
+        """
+        label_sets = self.label_sets
+        metadata = {
+            "version": self._FORMAT_VERSION,
+            "nodes": self.nodes,
+            "label_nnz": list(self.label_nnz.items()),
+            "label_sets": [list(labels) for labels in label_sets],
+        }
+        arrays = {"metadata": np.array(json.dumps(metadata))}
+        for i, labels in enumerate(label_sets):
+            component_closure = self.component_closures[labels]
+            arrays[f"components_{i}"] = self.components[labels]
+            arrays[f"indptr_{i}"] = component_closure.indptr
+            arrays[f"indices_{i}"] = component_closure.indices
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "ReachabilityIndex":
+        """Loads the index from npz file created by save
+
+        Parameters
+        ----------
+        path : Union[str, os.PathLike]
+            Path of the file
+
+        Returns
+        -------
+        index : ReachabilityIndex
+            Loaded index
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(str(arrays["metadata"]))
+            if metadata["version"] != cls._FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported reachability index version {metadata['version']}"
+                )
+            components, component_closures = dict(), dict()
+            for i, labels in enumerate(map(frozenset, metadata["label_sets"])):
+                indptr = arrays[f"indptr_{i}"]
+                components_num = len(indptr) - 1
+                components[labels] = arrays[f"components_{i}"]
+                component_closures[labels] = csr_matrix(
+                    (
+                        np.ones(indptr[-1], dtype=bool),
+                        arrays[f"indices_{i}"],
+                        indptr,
+                    ),
+                    shape=(components_num, components_num),
+                )
+        return cls(
+            nodes=metadata["nodes"],
+            label_nnz=dict(metadata["label_nnz"]),
+            components=components,
+            component_closures=component_closures,
+        )
+
+
+def _edges_num(mtx: Any) -> int:
+    """Counts distinct edges of adjacency matrix
+
+    Parameters
+    ----------
+    mtx : Any
+        Bool sparse matrix, it may hold repeated and explicit False entries
+
+    Returns
+    -------
+    edges_num : int
+        Number of distinct pairs of nodes with True value
+    """
+    mtx = mtx.tocsr()
+    if not mtx.has_canonical_format:
+        # Matrix is not changed in place, it may be memory-mapped
+        mtx = mtx.copy()
+        mtx.sum_duplicates()
+    return mtx.count_nonzero()
+
+
+def _condensed_closure(adjacency: csr_matrix) -> Tuple[np.ndarray, csr_matrix]:
+    """Calculates reflexive transitive closure of graph condensed
+    to its strongly connected components
+
+    Parameters
+    ----------
+    adjacency : csr_matrix
+        Bool adjacency matrix of graph
+
+    Returns
+    -------
+    condensed_closure : Tuple[np.ndarray, csr_matrix]
+        Component of each node and reflexive transitive closure of components
+    """
+    components_num, components = connected_components(
+        adjacency, directed=True, connection="strong"
+    )
+    coo = adjacency.tocoo()
+    between = components[coo.row] != components[coo.col]
+    condensed = csr_matrix(
+        (
+            np.ones(between.sum(), dtype=bool),
+            (components[coo.row[between]], components[coo.col[between]]),
+        ),
+        shape=(components_num, components_num),
+    )
+    closure = eye(components_num, dtype=bool, format="csr") + condensed
+    prev_nnz = None
+    while prev_nnz != closure.nnz:
+        prev_nnz = closure.nnz
+        closure = closure @ closure
+    closure.sort_indices()
+    return components.astype(np.int64), closure
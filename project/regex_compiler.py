@@ -0,0 +1,492 @@
+import re
+from itertools import accumulate
+from typing import Any, List, Optional, Tuple, Union
+
+import numpy as np
+from pyformlang.finite_automaton import State, Symbol
+from pyformlang.regular_expression import Regex, regex_objects
+from pyformlang.regular_expression.regex_objects import MisformedRegexError
+from scipy.sparse import csr_matrix
+
+from project.matrix_utils import BoolMatrixAutomaton
+
+__all__ = [
+    "RegexTree",
+    "parse_regex",
+    "regex_to_bool_matrix",
+]
+
+# Node of regex tree: kind of node, value of symbol and subtrees.
+# Kinds are "symbol", "epsilon", "empty", "concatenation", "union" and "star"
+RegexTree = Tuple[str, Optional[str], List["RegexTree"]]
+
+_CONCATENATION_SYMBOLS = ["."]
+_UNION_SYMBOLS = ["|", "+"]
+_KLEENE_STAR_SYMBOLS = ["*"]
+_EPSILON_SYMBOLS = ["epsilon", "$"]
+_SPECIAL_SYMBOLS = (
+    _CONCATENATION_SYMBOLS
+    + _UNION_SYMBOLS
+    + _KLEENE_STAR_SYMBOLS
+    + _EPSILON_SYMBOLS
+    + ["(", ")"]
+)
+
+_MISFORMED_MESSAGE = "The regex is misformed here."
+_WRONG_PARENTHESIS_MESSAGE = "Wrong parenthesis regex"
+
+
+def parse_regex(text: str) -> RegexTree:
+    """Parses regex text without building pyformlang objects
+
+    The syntax and the precedence of operators are the same as in Regex:
+    tokens are separated by spaces and special symbols, a token starting
+    with backslash is a symbol without the backslash, adjacent groups
+    are concatenated
+
+    Parameters
+    ----------
+    text : str
+        Text of regular expression
+
+    Returns
+    -------
+    tree : RegexTree
+        Tree of the regular expression, the same as Regex(text) has
+    """
+    return _parse_components(_tokenize(text), text)
+
+
+def regex_to_bool_matrix(regex: Union[str, Regex]) -> BoolMatrixAutomaton:
+    """Compiles regex to Glushkov position automaton represented by bool matrices
+
+    The automaton has no epsilon transitions: state 0 is the start state,
+    each other state is an occurrence of a symbol in the regex
+    and all transitions entering a state are labeled with its symbol
+
+    Parameters
+    ----------
+    regex : Union[str, Regex]
+        Regular expression or its text, the text is parsed by parse_regex
+
+    Returns
+    -------
+    regex_bool_mtx : BoolMatrixAutomaton
+        Automaton accepting the language of the regex
+    """
+    tree = parse_regex(regex) if isinstance(regex, str) else _tree_of_regex(regex)
+    return _glushkov_automaton(tree)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Splits regex text into tokens as RegexReader does
+
+    Parameters
+    ----------
+    text : str
+        Text of regular expression
+
+    Returns
+    -------
+    tokens : List[str]
+        Tokens of the regex, it is [""] for empty regex
+    """
+    text = text.strip(" ")
+    if text.endswith("\\") and not text.endswith("\\\\"):
+        text += " "
+    text = re.sub(r" +", " ", text)
+    text = re.sub(r"\\ ", "\\  ", text)
+    if text.endswith("  "):
+        text = text[:-1]
+
+    chars, previous_is_escape = [], False
+    for pos, char in enumerate(text):
+        is_special = not previous_is_escape and char in _SPECIAL_SYMBOLS
+        if is_special and pos != 0 and chars[-1] != " ":
+            chars.append(" ")
+        chars.append(char)
+        if is_special and pos != len(text) - 1 and text[pos + 1] != " ":
+            chars.append(" ")
+        previous_is_escape = char == "\\"
+
+    tokens = "".join(chars).split(" ")
+    for i, token in enumerate(tokens):
+        if token.endswith("\\") and not token.endswith("\\\\"):
+            tokens[i] += " "
+    if len(tokens) > 1 and not tokens[-1]:
+        del tokens[-1]
+    return [token for token in tokens if token] or [""]
+
+
+def _token_kind(token: str) -> str:
+    """Returns the kind of node represented by token
+
+    Parameters
+    ----------
+    token : str
+        Token of regex
+
+    Returns
+    -------
+    kind : str
+        Kind of node, see RegexTree
+    """
+    if not token:
+        return "empty"
+    if token in _CONCATENATION_SYMBOLS:
+        return "concatenation"
+    if token in _UNION_SYMBOLS:
+        return "union"
+    if token in _KLEENE_STAR_SYMBOLS:
+        return "star"
+    if token in _EPSILON_SYMBOLS:
+        return "epsilon"
+    return "symbol"
+
+
+def _leaf(token: str) -> RegexTree:
+    """Builds leaf of regex tree from token
+
+    Parameters
+    ----------
+    token : str
+        Token of symbol, epsilon or empty regex
+
+    Returns
+    -------
+    leaf : RegexTree
+        Node without subtrees
+    """
+    kind = _token_kind(token)
+    if kind != "symbol":
+        return kind, None, []
+    return kind, token[1:] if token[0] == "\\" else token, []
+
+
+def _parse_components(components: List[str], text: str) -> RegexTree:
+    """Builds regex tree from tokens following RegexReader
+
+    Subregexes are processed with an explicit stack, so long regexes
+    do not exceed the recursion limit
+
+    Parameters
+    ----------
+    components : List[str]
+        Tokens of regex
+    text : str
+        Text of regex used in error messages
+
+    Returns
+    -------
+    tree : RegexTree
+        Tree of the regular expression
+    """
+    root: List[Any] = [None]
+    stack = [(components, root, 0)]
+    while stack:
+        components, slot, slot_idx = stack.pop()
+        components = list(components)
+        _remove_extreme_parentheses(components, text)
+        _compute_precedence(components, text)
+        _remove_extreme_parentheses(components, text)
+
+        if not components:
+            slot[slot_idx] = _leaf("")
+        elif len(components) == 1:
+            leaf = _leaf(components[0])
+            if leaf[0] not in ("symbol", "epsilon", "empty"):
+                raise MisformedRegexError(_MISFORMED_MESSAGE, text)
+            slot[slot_idx] = leaf
+        else:
+            end = _end_of_group(components, 0, text)
+            if end == len(components):
+                raise MisformedRegexError(_MISFORMED_MESSAGE, text)
+            kind = _token_kind(components[end])
+            if kind == "star":
+                sons = [None]
+                stack.append((components[:end], sons, 0))
+            else:
+                begin_second = end
+                if kind in ("concatenation", "union"):
+                    begin_second += 1
+                else:
+                    kind = "concatenation"
+                sons = [None, None]
+                stack.append((components[begin_second:], sons, 1))
+                stack.append((components[:end], sons, 0))
+            slot[slot_idx] = (kind, None, sons)
+    return root[0]
+
+
+def _parenthesis_depths(components: List[str]) -> List[int]:
+    """Calculates depth of parentheses after each token
+
+    Parameters
+    ----------
+    components : List[str]
+        Tokens of regex
+
+    Returns
+    -------
+    depths : List[int]
+        Depth after each token
+    """
+    return list(
+        accumulate(
+            1 if token == "(" else -1 if token == ")" else 0 for token in components
+        )
+    )
+
+
+def _first_complete_closing(depths: List[int], idx_from: int = 0) -> int:
+    """Returns the index of the first token after which all parentheses are closed
+
+    Parameters
+    ----------
+    depths : List[int]
+        Depth after each token
+    idx_from : int
+        Index to start search from
+
+    Returns
+    -------
+    idx : int
+        Index of the token or -2 if there is no such token
+    """
+    try:
+        return depths.index(0, idx_from)
+    except ValueError:
+        return -2
+
+
+def _remove_extreme_parentheses(components: List[str], text: str) -> None:
+    """Removes parentheses surrounding the whole regex in place
+
+    Parameters
+    ----------
+    components : List[str]
+        Tokens of regex
+    text : str
+        Text of regex used in error messages
+
+    Returns
+    -------
+    None
+    """
+    if not components or components[0] != "(":
+        return
+    while (
+        _first_complete_closing(_parenthesis_depths(components)) == len(components) - 1
+    ):
+        del components[0], components[-1]
+        if not components:
+            raise MisformedRegexError(_MISFORMED_MESSAGE, text)
+        if components[0] != "(":
+            return
+
+
+def _end_of_group(components: List[str], idx_from: int, text: str) -> int:
+    """Returns the index following the group starting at given index
+
+    Parameters
+    ----------
+    components : List[str]
+        Tokens of regex
+    idx_from : int
+        Index of the first token of the group
+    text : str
+        Text of regex used in error messages
+
+    Returns
+    -------
+    end : int
+        Index following the last token of the group
+    """
+    if idx_from >= len(components):
+        return idx_from
+    if components[idx_from] == ")":
+        raise MisformedRegexError(_WRONG_PARENTHESIS_MESSAGE, text)
+    if components[idx_from] == "(":
+        closing = _first_complete_closing(_parenthesis_depths(components), idx_from)
+        if closing <= 0:
+            raise MisformedRegexError(_WRONG_PARENTHESIS_MESSAGE, text)
+        return closing + 1
+    return idx_from + 1
+
+
+def _compute_precedence(components: List[str], text: str) -> None:
+    """Adds parentheses around the first operand of the top operator in place
+
+    Kleene star binds the group preceding it, then concatenations
+    are grouped up to the first union
+
+    Parameters
+    ----------
+    components : List[str]
+        Tokens of regex
+    text : str
+        Text of regex used in error messages
+
+    Returns
+    -------
+    None
+    """
+    while True:
+        end, kind = 0, None
+        if len(components) > 1:
+            end = _end_of_group(components, 0, text)
+            if end < len(components):
+                kind = _token_kind(components[end])
+        if kind != "star":
+            break
+        components.insert(0, "(")
+        components.insert(end + 2, ")")
+
+    if kind == "union":
+        return
+    while end < len(components) and kind != "union":
+        if kind in ("concatenation", "union"):
+            end += 1
+        end = _end_of_group(components, end, text)
+        if end < len(components):
+            kind = _token_kind(components[end])
+    if kind == "union":
+        components.insert(0, "(")
+        components.insert(end + 1, ")")
+
+
+def _tree_of_regex(regex: Regex) -> RegexTree:
+    """Converts parsed pyformlang regex to regex tree
+
+    Parameters
+    ----------
+    regex : Regex
+        Regular expression
+
+    Returns
+    -------
+    tree : RegexTree
+        Tree of the regular expression
+    """
+    root: List[Any] = [None]
+    stack = [(regex, root, 0)]
+    while stack:
+        regex, slot, slot_idx = stack.pop()
+        head = regex.head
+        if isinstance(head, regex_objects.Epsilon):
+            slot[slot_idx] = ("epsilon", None, [])
+        elif isinstance(head, regex_objects.Empty):
+            slot[slot_idx] = ("empty", None, [])
+        elif isinstance(head, regex_objects.Symbol):
+            slot[slot_idx] = ("symbol", head.value, [])
+        else:
+            if isinstance(head, regex_objects.Concatenation):
+                kind = "concatenation"
+            elif isinstance(head, regex_objects.Union):
+                kind = "union"
+            else:
+                kind = "star"
+            sons = [None] * len(regex.sons)
+            for i, son in enumerate(regex.sons):
+                stack.append((son, sons, i))
+            slot[slot_idx] = (kind, None, sons)
+    return root[0]
+
+
+def _glushkov_automaton(tree: RegexTree) -> BoolMatrixAutomaton:
+    """Builds Glushkov position automaton of regex tree
+
+    For each subtree nullability and the sets of its first and last positions
+    are calculated, pairs of consecutive positions are the products
+    of last and first positions of concatenated operands and of starred subtree
+
+    Parameters
+    ----------
+    tree : RegexTree
+        Tree of the regular expression
+
+    Returns
+    -------
+    regex_bool_mtx : BoolMatrixAutomaton
+        Position automaton represented by bool matrices
+    """
+    labels = [None]
+    follow: List[Tuple[List[int], List[int]]] = []
+    # Post-order traversal, results of subtrees are pushed to the stack
+    results: List[Tuple[bool, List[int], List[int]]] = []
+    stack = [(tree, False)]
+    while stack:
+        node, is_visited = stack.pop()
+        kind, value, sons = node
+        if not is_visited and sons:
+            stack.append((node, True))
+            stack.extend((son, False) for son in reversed(sons))
+            continue
+        if kind == "symbol":
+            labels.append(value)
+            results.append((False, [len(labels) - 1], [len(labels) - 1]))
+        elif kind == "epsilon":
+            results.append((True, [], []))
+        elif kind == "empty":
+            results.append((False, [], []))
+        elif kind == "star":
+            _, first, last = results.pop()
+            follow.append((last, first))
+            results.append((True, first, last))
+        else:
+            right_nullable, right_first, right_last = results.pop()
+            left_nullable, left_first, left_last = results.pop()
+            if kind == "union":
+                results.append(
+                    (
+                        left_nullable or right_nullable,
+                        left_first + right_first,
+                        left_last + right_last,
+                    )
+                )
+            else:
+                follow.append((left_last, right_first))
+                results.append(
+                    (
+                        left_nullable and right_nullable,
+                        left_first + right_first if left_nullable else left_first,
+                        right_last + left_last if right_nullable else right_last,
+                    )
+                )
+    nullable, first, last = results.pop()
+    follow.append(([0], first))
+
+    states_num = len(labels)
+    sources = np.concatenate(
+        [np.repeat(np.array(a, dtype=np.int64), len(b)) for a, b in follow]
+    )
+    targets = np.concatenate(
+        [np.tile(np.array(b, dtype=np.int64), len(a)) for a, b in follow]
+    )
+
+    label_to_id = {}
+    position_label_ids = np.array(
+        [-1]
+        + [label_to_id.setdefault(label, len(label_to_id)) for label in labels[1:]],
+        dtype=np.int64,
+    )
+    label_ids = position_label_ids[targets]
+    order = np.argsort(label_ids, kind="stable")
+    bounds = np.searchsorted(label_ids[order], np.arange(len(label_to_id) + 1))
+    b_mtx = {}
+    for label, label_id in label_to_id.items():
+        edge_indices = order[bounds[label_id] : bounds[label_id + 1]]
+        b_mtx[Symbol(label)] = csr_matrix(
+            (
+                np.ones(len(edge_indices), dtype=bool),
+                (sources[edge_indices], targets[edge_indices]),
+            ),
+            shape=(states_num, states_num),
+        )
+
+    return BoolMatrixAutomaton(
+        state_to_idx={State(idx): idx for idx in range(states_num)},
+        start_states={State(0)},
+        final_states={State(idx) for idx in last + ([0] if nullable else [])},
+        b_mtx=b_mtx,
+    )
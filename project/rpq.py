@@ -1,30 +1,67 @@
 import enum
-from typing import Set, Optional, Tuple, Any, Dict
+from typing import Set, Optional, Tuple, Any, Dict, List, Iterator, FrozenSet, Union
 
+import numpy as np
 from networkx import MultiDiGraph
-from pyformlang.regular_expression import Regex
+from pyformlang.regular_expression import Regex, regex_objects
+from scipy.sparse import csr_matrix
 
-from project import graph_to_epsilon_nfa, BoolMatrixAutomaton, regex_to_min_dfa
+from project import BoolMatrixAutomaton, regex_to_min_dfa
+from project.graph_store import GraphStore, MemmapGraphStore
+from project.matrix_chain import multiply_chain
+from project.query_cache import RegexQueryCache
+from project.reachability_index import ReachabilityIndex
+from project.regex_compiler import regex_to_bool_matrix
+from project.semiring import Semiring
 
 __all__ = [
+    "TensorRpqMode",
     "rpq_tensor",
+    "rpq_semiring",
     "rpq_bfs",
+    "rpq_bfs_many",
+    "rpq_bfs_chunked",
     "MultipleSourceRpqMode",
+    "QueryAutomatonMode",
+    "BfsDirection",
 ]
 
 
+class TensorRpqMode(enum.Enum):
+    """Class represents mode of tensor rpq task
+
+    Values
+    ----------
+
+    FULL_TRANSITIVE_CLOSURE : TensorRpqMode
+        Calculate transitive closure of the whole intersection automaton
+    START_RESTRICTED_REACHABILITY : TensorRpqMode
+        Calculate reachability only from start states of the intersection automaton
+    """
+
+    FULL_TRANSITIVE_CLOSURE = enum.auto()
+    START_RESTRICTED_REACHABILITY = enum.auto()
+
+
 def rpq_tensor(
-    graph: MultiDiGraph,
+    graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
     query: Regex,
     start_states: Optional[Set],
     final_states: Optional[Set],
+    mode: TensorRpqMode = TensorRpqMode.FULL_TRANSITIVE_CLOSURE,
+    query_cache: Optional[RegexQueryCache] = None,
+    reachability_index: Optional[ReachabilityIndex] = None,
 ) -> Set[Tuple[Any, Any]]:
     """Executes regular query on graph using tensor multiplication
 
+    Queries built from labels by union, concatenation and star of label sets
+    are evaluated directly on graph matrices without the product automaton
+
     Parameters
     ----------
-    graph : MultiDiGraph
-        The graph on which query will be executed
+    graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+        The graph on which query will be executed, e.g. loaded by load_graph_store
+        or load_graph_memmap
     query: Regex
         Query represented by regular expression
     start_states: Optional[Set]
@@ -33,6 +70,15 @@ def rpq_tensor(
     final_states: Optional[Set]
         Set of nodes of the graph that will be treated as final states in NFA
         If parameter is None then each graph node is considered the final state
+    mode: TensorRpqMode
+        The mode that determines how reachability in the intersection is calculated
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+    reachability_index: Optional[ReachabilityIndex]
+        Precomputed closures of the graph. Stars of indexed label sets
+        in queries evaluated directly on graph matrices are calculated using them
+        The index is not used by other queries, even for their starred label sets,
+        e.g. (c|d)* in (a.b)*.(c|d)* is traversed by the product with the query
 
     Returns
     -------
@@ -40,24 +86,41 @@ def rpq_tensor(
         The set of pairs where the node in second place is reachable
          from the node in first place with a constraint on a given query
     """
-    nfa_bool_mtx = BoolMatrixAutomaton.from_nfa(
-        graph_to_epsilon_nfa(
-            graph=graph,
-            start_states=start_states,
-            final_states=final_states,
-        )
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(
+        graph=graph,
+        start_states=start_states,
+        final_states=final_states,
     )
-    query_bool_mtx = BoolMatrixAutomaton.from_nfa(
-        regex_to_min_dfa(regex=query),
+    direct_result = _rpq_directly(
+        graph_bool_mtx=graph_bool_mtx,
+        query=query,
+        reachability_index=reachability_index,
+        allow_nullable=True,
     )
-    intersection_bool_mtx = nfa_bool_mtx & query_bool_mtx
+    if direct_result is not None:
+        return direct_result
+    query_bool_mtx = _compile_query(query=query, query_cache=query_cache)
+    intersection_bool_mtx = graph_bool_mtx & query_bool_mtx
     idx_to_state = {
         idx: state for state, idx in intersection_bool_mtx.state_to_idx.items()
     }
-    transitive_closure = intersection_bool_mtx.transitive_closure()
+    if mode == TensorRpqMode.START_RESTRICTED_REACHABILITY:
+        ordered_start_states = list(intersection_bool_mtx.start_states)
+        reachable = intersection_bool_mtx.reachable_from(
+            [intersection_bool_mtx.state_to_idx[s] for s in ordered_start_states]
+        )
+        reachable_pairs = (
+            (ordered_start_states[i], idx_to_state[j])
+            for i, j in zip(*reachable.nonzero())
+        )
+    else:
+        transitive_closure = intersection_bool_mtx.transitive_closure()
+        reachable_pairs = (
+            (idx_to_state[i], idx_to_state[j])
+            for i, j in zip(*transitive_closure.nonzero())
+        )
     result = set()
-    for state_from_idx, state_to_idx in zip(*transitive_closure.nonzero()):
-        state_from, state_to = idx_to_state[state_from_idx], idx_to_state[state_to_idx]
+    for state_from, state_to in reachable_pairs:
         if (
             state_from in intersection_bool_mtx.start_states
             and state_to in intersection_bool_mtx.final_states
@@ -70,6 +133,74 @@ def rpq_tensor(
     return result
 
 
+def rpq_semiring(
+    graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
+    query: Regex,
+    start_states: Optional[Set],
+    final_states: Optional[Set],
+    semiring: Semiring,
+    query_cache: Optional[RegexQueryCache] = None,
+) -> Dict[Tuple[Any, Any], Any]:
+    """Executes regular query on graph calculating values of paths over semiring
+
+    Paths between two nodes with a constraint on a given query are summed
+    in the semiring, e.g. CountingSemiring gives the number of paths
+    and TROPICAL_SEMIRING gives the length of the shortest path
+
+    Parameters
+    ----------
+    graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+        The graph on which query will be executed, e.g. loaded by load_graph_store
+        or load_graph_memmap
+    query: Regex
+        Query represented by regular expression
+    start_states: Optional[Set]
+        Set of nodes of the graph that will be treated as start states in NFA
+        If parameter is None then each graph node is considered the start state
+    final_states: Optional[Set]
+        Set of nodes of the graph that will be treated as final states in NFA
+        If parameter is None then each graph node is considered the final state
+    semiring: Semiring
+        Semiring in which values of paths are calculated
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+
+    Returns
+    -------
+    result : Dict[Tuple[Any, Any], Any]
+        Mapping from pairs of nodes where the node in second place is reachable
+        from the node in first place with a constraint on a given query
+        to the value of paths between them
+    """
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(
+        graph=graph,
+        start_states=start_states,
+        final_states=final_states,
+    )
+    query_bool_mtx = _compile_query(query=query, query_cache=query_cache)
+    intersection_bool_mtx = graph_bool_mtx & query_bool_mtx
+    idx_to_state = {
+        idx: state for state, idx in intersection_bool_mtx.state_to_idx.items()
+    }
+    ordered_start_states = list(intersection_bool_mtx.start_states)
+    values = intersection_bool_mtx.semiring_reachable_from(
+        start_indices=[
+            intersection_bool_mtx.state_to_idx[s] for s in ordered_start_states
+        ],
+        semiring=semiring,
+    )
+    result = dict()
+    for i, j, value in semiring.entries(values):
+        state_to = idx_to_state[j]
+        if state_to not in intersection_bool_mtx.final_states:
+            continue
+        state_from_graph_value, _ = ordered_start_states[i].value
+        state_to_graph_value, _ = state_to.value
+        pair = (state_from_graph_value, state_to_graph_value)
+        result[pair] = semiring.plus(result[pair], value) if pair in result else value
+    return result
+
+
 class MultipleSourceRpqMode(enum.Enum):
     """Class represents mode of multiple source rpq task
 
@@ -80,25 +211,75 @@ class MultipleSourceRpqMode(enum.Enum):
         Find all reachable nodes from set of start nodes
     FIND_REACHABLE_FOR_EACH_START_NODE : MultipleSourceRpqMode
         Find reachable nodes for each start node separately
+    FIND_DISTANCES_FOR_EACH_START_NODE : MultipleSourceRpqMode
+        Find reachable nodes for each start node separately
+        together with the lengths of the shortest paths to them
     """
 
     FIND_ALL_REACHABLE = enum.auto()
     FIND_REACHABLE_FOR_EACH_START_NODE = enum.auto()
+    FIND_DISTANCES_FOR_EACH_START_NODE = enum.auto()
+
+
+class QueryAutomatonMode(enum.Enum):
+    """Class represents the kind of automaton the query is compiled to
+
+    Values
+    ----------
+
+    MINIMAL_DFA : QueryAutomatonMode
+        Query is determinized and minimized before evaluation
+    NFA : QueryAutomatonMode
+        Query is kept nondeterministic, it is compiled to Glushkov position
+        automaton without epsilon transitions, so product states
+        are created only when bfs reaches them
+    """
+
+    MINIMAL_DFA = enum.auto()
+    NFA = enum.auto()
+
+
+class BfsDirection(enum.Enum):
+    """Class represents direction of multiple source bfs
+
+    Values
+    ----------
+
+    FORWARD : BfsDirection
+        Bfs goes from start nodes only
+    BIDIRECTIONAL : BfsDirection
+        Bfs goes from start nodes and backward from final nodes
+        expanding the smaller front until fronts meet.
+        Useful when both sets of start and final nodes are small
+    """
+
+    FORWARD = enum.auto()
+    BIDIRECTIONAL = enum.auto()
 
 
 def rpq_bfs(
-    graph: MultiDiGraph,
+    graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
     query: Regex,
     start_states: Optional[Set],
     final_states: Optional[Set],
     mode: MultipleSourceRpqMode,
+    query_cache: Optional[RegexQueryCache] = None,
+    query_automaton: QueryAutomatonMode = QueryAutomatonMode.MINIMAL_DFA,
+    direction: BfsDirection = BfsDirection.FORWARD,
+    max_depth: Optional[int] = None,
+    reachability_index: Optional[ReachabilityIndex] = None,
 ) -> Set[Any]:
     """Executes regular query on graph using multiple source bfs
 
+    Queries built from labels by union, concatenation and star of label sets
+    that do not accept the empty word are evaluated directly on graph matrices
+    unless distances or max_depth are requested
+
     Parameters
     ----------
-    graph : MultiDiGraph
-        The graph on which query will be executed
+    graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+        The graph on which query will be executed, e.g. loaded by load_graph_store
+        or load_graph_memmap
     query: Regex
         Query represented by regular expression
     start_states: Optional[Set]
@@ -109,6 +290,22 @@ def rpq_bfs(
         If parameter is None then each graph node is considered the final state
     mode: MultipleSourceRpqMode
         The mode that determines which vertices should be found
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+        Only minimal DFAs are cached
+    query_automaton: QueryAutomatonMode
+        The kind of automaton the query is compiled to
+    direction: BfsDirection
+        The direction of bfs, it does not affect the result
+        Only forward bfs supports distances and max_depth
+    max_depth: Optional[int]
+        Maximal length of paths to be considered
+        If parameter is None then paths of any length are considered
+    reachability_index: Optional[ReachabilityIndex]
+        Precomputed closures of the graph. Stars of indexed label sets
+        in queries evaluated directly on graph matrices are calculated using them
+        The index is not used by other queries, even for their starred label sets,
+        e.g. (c|d)* in (a.b)*.(c|d)* is traversed by the product with the query
 
     Returns
     -------
@@ -117,19 +314,546 @@ def rpq_bfs(
         if mode is FIND_ALL_REACHABLE -- set of reachable nodes
         if mode is FIND_REACHABLE_FOR_EACH_START_NODE -- set of tuples (U, V)
         where U is start node and V is final node reachable from U
+        if mode is FIND_DISTANCES_FOR_EACH_START_NODE -- set of tuples (U, V, D)
+        where D is the length of the shortest path from U to V
     """
-    nfa_bool_mtx = BoolMatrixAutomaton.from_nfa(
-        graph_to_epsilon_nfa(
-            graph=graph,
-            start_states=start_states,
-            final_states=final_states,
+    if direction == BfsDirection.BIDIRECTIONAL and (
+        mode == MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE
+        or max_depth is not None
+    ):
+        raise ValueError("Bidirectional bfs supports neither distances nor max depth")
+
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(
+        graph=graph,
+        start_states=start_states,
+        final_states=final_states,
+    )
+    if (
+        mode != MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE
+        and max_depth is None
+    ):
+        # Bfs does not report pairs of initial states reached again,
+        # so only queries that do not accept the empty word are evaluated directly
+        direct_result = _rpq_directly(
+            graph_bool_mtx=graph_bool_mtx,
+            query=query,
+            reachability_index=reachability_index,
+            allow_nullable=False,
         )
+        if direct_result is not None:
+            if mode == MultipleSourceRpqMode.FIND_ALL_REACHABLE:
+                return {node_to for _, node_to in direct_result}
+            return direct_result
+    query_bool_mtx = _compile_bfs_query(
+        query=query, query_cache=query_cache, query_automaton=query_automaton
     )
-    query_bool_mtx = BoolMatrixAutomaton.from_nfa(
-        regex_to_min_dfa(regex=query),
+    if direction == BfsDirection.BIDIRECTIONAL:
+        return graph_bool_mtx.bidirectional_bfs(
+            other=query_bool_mtx,
+            reachable_per_node=mode
+            == MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        )
+    return graph_bool_mtx.sync_bfs(
+        other=query_bool_mtx,
+        reachable_per_node=mode != MultipleSourceRpqMode.FIND_ALL_REACHABLE,
+        with_distances=mode == MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+        max_depth=max_depth,
+    )
+
+
+def rpq_bfs_many(
+    graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
+    queries: List[Regex],
+    start_states: Optional[Set],
+    final_states: Optional[Set],
+    mode: MultipleSourceRpqMode,
+    query_cache: Optional[RegexQueryCache] = None,
+    query_automaton: QueryAutomatonMode = QueryAutomatonMode.MINIMAL_DFA,
+    max_depth: Optional[int] = None,
+) -> List[Set[Any]]:
+    """Executes several regular queries on graph using one multiple source bfs
+
+    Query automatons are combined into their tagged direct sum,
+    so the graph is multiplied once per bfs level for all queries
+
+    Parameters
+    ----------
+    graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+        The graph on which queries will be executed, e.g. loaded by load_graph_store
+    queries: List[Regex]
+        Queries represented by regular expressions
+    start_states: Optional[Set]
+        Set of nodes of the graph that will be treated as start states in NFA
+        If parameter is None then each graph node is considered the start state
+    final_states: Optional[Set]
+        Set of nodes of the graph that will be treated as final states in NFA
+        If parameter is None then each graph node is considered the final state
+    mode: MultipleSourceRpqMode
+        The mode that determines which vertices should be found
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then queries are compiled anew
+        Only minimal DFAs are cached
+    query_automaton: QueryAutomatonMode
+        The kind of automaton queries are compiled to
+    max_depth: Optional[int]
+        Maximal length of paths to be considered
+        If parameter is None then paths of any length are considered
+
+    Returns
+    -------
+    result : List[Set[Any]]
+        Results of rpq_bfs for each query in the order of queries
+    """
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(
+        graph=graph,
+        start_states=start_states,
+        final_states=final_states,
+    )
+    queries_bool_mtx = [
+        _compile_bfs_query(
+            query=query, query_cache=query_cache, query_automaton=query_automaton
+        )
+        for query in queries
+    ]
+    return graph_bool_mtx.sync_bfs_many(
+        others=queries_bool_mtx,
+        reachable_per_node=mode != MultipleSourceRpqMode.FIND_ALL_REACHABLE,
+        with_distances=mode == MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+        max_depth=max_depth,
+    )
+
+
+def rpq_bfs_chunked(
+    graph: Union[MultiDiGraph, GraphStore, MemmapGraphStore],
+    query: Regex,
+    start_states: Optional[Set],
+    final_states: Optional[Set],
+    mode: MultipleSourceRpqMode,
+    memory_budget: int = 1 << 28,
+    query_cache: Optional[RegexQueryCache] = None,
+    query_automaton: QueryAutomatonMode = QueryAutomatonMode.MINIMAL_DFA,
+    max_depth: Optional[int] = None,
+) -> Iterator[Set[Any]]:
+    """Executes regular query on graph using multiple source bfs
+    processing start nodes in batches that fit into the memory budget
+
+    Parameters
+    ----------
+    graph : Union[MultiDiGraph, GraphStore, MemmapGraphStore]
+        The graph on which query will be executed, e.g. loaded by load_graph_store
+        or load_graph_memmap
+    query: Regex
+        Query represented by regular expression
+    start_states: Optional[Set]
+        Set of nodes of the graph that will be treated as start states in NFA
+        If parameter is None then each graph node is considered the start state
+    final_states: Optional[Set]
+        Set of nodes of the graph that will be treated as final states in NFA
+        If parameter is None then each graph node is considered the final state
+    mode: MultipleSourceRpqMode
+        The mode that determines which vertices should be found
+        The front of FIND_ALL_REACHABLE mode is not split, so its result is one batch
+    memory_budget: int
+        Maximal number of bytes of bfs matrices of one batch
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+        Only minimal DFAs are cached
+    query_automaton: QueryAutomatonMode
+        The kind of automaton the query is compiled to
+    max_depth: Optional[int]
+        Maximal length of paths to be considered
+        If parameter is None then paths of any length are considered
+
+    Returns
+    -------
+    result : Iterator[Set[Any]]
+        Results of rpq_bfs for consecutive batches of start nodes,
+        their union is the result of rpq_bfs
+    """
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(
+        graph=graph,
+        start_states=start_states,
+        final_states=final_states,
+    )
+    query_bool_mtx = _compile_bfs_query(
+        query=query, query_cache=query_cache, query_automaton=query_automaton
     )
-    return nfa_bool_mtx.sync_bfs(
+    if mode == MultipleSourceRpqMode.FIND_ALL_REACHABLE:
+        yield graph_bool_mtx.sync_bfs(
+            other=query_bool_mtx, reachable_per_node=False, max_depth=max_depth
+        )
+        return
+    yield from graph_bool_mtx.sync_bfs_chunked(
         other=query_bool_mtx,
-        reachable_per_node=mode
-        == MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        memory_budget=memory_budget,
+        with_distances=mode == MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+        max_depth=max_depth,
+    )
+
+
+def _rpq_directly(
+    graph_bool_mtx: BoolMatrixAutomaton,
+    query: Regex,
+    reachability_index: Optional[ReachabilityIndex],
+    allow_nullable: bool,
+) -> Optional[Set[Tuple[Any, Any]]]:
+    """Executes regular query built from labels by union, concatenation
+    and star of label sets directly on graph matrices
+
+    Rows of nodes reachable from start nodes are calculated over the expression
+    tree: union is sum, concatenation is product and star is bfs by the matrix
+    of the label set, separately for all words and for non-empty words,
+    since pairs of nodes are connected by paths of positive length only
+
+    Parameters
+    ----------
+    graph_bool_mtx : BoolMatrixAutomaton
+        Bool matrix representation of graph
+    query: Regex
+        Query represented by regular expression
+    reachability_index: Optional[ReachabilityIndex]
+        Precomputed closures of the graph used for stars of indexed label sets
+    allow_nullable: bool
+        Means the query may accept the empty word or such query is not executed
+
+    Returns
+    -------
+    result : Optional[Set[Tuple[Any, Any]]]
+        The set of pairs where the node in second place is reachable
+        from the node in first place by a non-empty word of the query,
+        or None if the query must be executed by the general engine
+    """
+    if not _is_direct_query(query):
+        return None
+    if not allow_nullable and _accepts_empty_word(query):
+        return None
+    if reachability_index is not None and not reachability_index.is_built_for(
+        graph_bool_mtx
+    ):
+        raise ValueError("Reachability index has been built for another graph")
+
+    idx_to_state = {idx: state for state, idx in graph_bool_mtx.state_to_idx.items()}
+    ordered_start_states = list(graph_bool_mtx.start_states)
+    starts_num = len(ordered_start_states)
+
+    words = csr_matrix(
+        (
+            np.ones(starts_num, dtype=bool),
+            (
+                np.arange(starts_num),
+                [graph_bool_mtx.state_to_idx[s] for s in ordered_start_states],
+            ),
+        ),
+        shape=(starts_num, len(idx_to_state)),
+    )
+    _, non_empty_words = _evaluate_directly(
+        query=query,
+        graph_bool_mtx=graph_bool_mtx,
+        words=words,
+        non_empty_words=csr_matrix(words.shape, dtype=bool),
+        reachability_index=reachability_index,
+    )
+
+    return {
+        (ordered_start_states[i].value, idx_to_state[j].value)
+        for i, j in zip(*non_empty_words.nonzero())
+        if idx_to_state[j] in graph_bool_mtx.final_states
+    }
+
+
+def _evaluate_directly(
+    query: Regex,
+    graph_bool_mtx: BoolMatrixAutomaton,
+    words: csr_matrix,
+    non_empty_words: csr_matrix,
+    reachability_index: Optional[ReachabilityIndex],
+) -> Tuple[csr_matrix, csr_matrix]:
+    """Continues paths from rows of nodes by words of regular expression
+
+    Parameters
+    ----------
+    query: Regex
+        Regular expression accepted by _is_direct_query
+    graph_bool_mtx : BoolMatrixAutomaton
+        Bool matrix representation of graph
+    words : csr_matrix
+        Rows of nodes reached from start nodes by words read so far
+    non_empty_words : csr_matrix
+        Rows of nodes reached from start nodes by non-empty words read so far
+    reachability_index: Optional[ReachabilityIndex]
+        Precomputed closures of the graph used for stars of indexed label sets
+
+    Returns
+    -------
+    rows : Tuple[csr_matrix, csr_matrix]
+        Rows of nodes reached by all words and by non-empty words
+        after words of the expression are appended
+    """
+    head = query.head
+    if isinstance(head, regex_objects.Epsilon):
+        return words, non_empty_words
+    if isinstance(head, regex_objects.Empty):
+        return csr_matrix(words.shape, dtype=bool), csr_matrix(words.shape, dtype=bool)
+    if isinstance(head, regex_objects.Symbol):
+        words = (words @ _label_set_matrix(graph_bool_mtx, {head.value})).tocsr()
+        return words, words
+    if isinstance(head, regex_objects.Union):
+        (left_words, left_non_empty), (right_words, right_non_empty) = (
+            _evaluate_directly(
+                query=son,
+                graph_bool_mtx=graph_bool_mtx,
+                words=words,
+                non_empty_words=non_empty_words,
+                reachability_index=reachability_index,
+            )
+            for son in query.sons
+        )
+        return left_words + right_words, left_non_empty + right_non_empty
+    if isinstance(head, regex_objects.Concatenation):
+        # Runs of label sets are multiplied in the order chosen by the planner,
+        # words read after a label set are not empty
+        label_set_matrices = []
+        for factor in _concatenation_factors(query) + [None]:
+            labels = None if factor is None else _label_set(factor)
+            if labels is not None:
+                label_set_matrices.append(_label_set_matrix(graph_bool_mtx, labels))
+                continue
+            if label_set_matrices:
+                words = non_empty_words = multiply_chain([words] + label_set_matrices)
+                label_set_matrices = []
+            if factor is not None:
+                words, non_empty_words = _evaluate_directly(
+                    query=factor,
+                    graph_bool_mtx=graph_bool_mtx,
+                    words=words,
+                    non_empty_words=non_empty_words,
+                    reachability_index=reachability_index,
+                )
+        return words, non_empty_words
+
+    labels = _label_set(_unwrap_stars(query))
+    step = _label_set_matrix(graph_bool_mtx, labels)
+    if reachability_index is not None and labels in reachability_index.label_sets:
+        return (
+            reachability_index.reach_from(words, labels),
+            reachability_index.reach_from(non_empty_words + words @ step, labels),
+        )
+    return (
+        _reach_by_star(words, step),
+        _reach_by_star(non_empty_words + words @ step, step),
+    )
+
+
+def _concatenation_factors(query: Regex) -> List[Regex]:
+    """Splits nested concatenations of regular expression into the list of factors
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+
+    Returns
+    -------
+    factors : List[Regex]
+        Subexpressions that are not concatenations in the order of concatenation
+    """
+    if not isinstance(query.head, regex_objects.Concatenation):
+        return [query]
+    return [factor for son in query.sons for factor in _concatenation_factors(son)]
+
+
+def _is_direct_query(query: Regex) -> bool:
+    """Checks that regular expression is built from labels by union,
+    concatenation and star of label sets
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+
+    Returns
+    -------
+    result : bool
+        Can the expression be evaluated directly on graph matrices
+    """
+    head = query.head
+    if isinstance(
+        head, (regex_objects.Epsilon, regex_objects.Empty, regex_objects.Symbol)
+    ):
+        return True
+    if isinstance(head, (regex_objects.Union, regex_objects.Concatenation)):
+        return all(_is_direct_query(son) for son in query.sons)
+    if isinstance(head, regex_objects.KleeneStar):
+        return _label_set(_unwrap_stars(query)) is not None
+    return False
+
+
+def _accepts_empty_word(query: Regex) -> bool:
+    """Checks that regular expression accepts the empty word
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+
+    Returns
+    -------
+    result : bool
+        Does the expression accept the empty word
+    """
+    head = query.head
+    if isinstance(head, (regex_objects.Epsilon, regex_objects.KleeneStar)):
+        return True
+    if isinstance(head, regex_objects.Union):
+        return any(_accepts_empty_word(son) for son in query.sons)
+    if isinstance(head, regex_objects.Concatenation):
+        return all(_accepts_empty_word(son) for son in query.sons)
+    return False
+
+
+def _unwrap_stars(query: Regex) -> Regex:
+    """Removes stars from the top of regular expression
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+
+    Returns
+    -------
+    query : Regex
+        The first subexpression that is not a star
+    """
+    while isinstance(query.head, regex_objects.KleeneStar):
+        query = query.sons[0]
+    return query
+
+
+def _label_set_matrix(
+    graph_bool_mtx: BoolMatrixAutomaton, labels: FrozenSet
+) -> csr_matrix:
+    """Calculates adjacency matrix of edges with labels from the set
+
+    Parameters
+    ----------
+    graph_bool_mtx : BoolMatrixAutomaton
+        Bool matrix representation of graph
+    labels : FrozenSet
+        Set of labels
+
+    Returns
+    -------
+    step : csr_matrix
+        Sum of matrices of labels
+    """
+    states_num = len(graph_bool_mtx.state_to_idx)
+    matrices = [
+        graph_bool_mtx.b_mtx[label] for label in labels if label in graph_bool_mtx.b_mtx
+    ]
+    if len(matrices) == 1:
+        # Matrix of a single label is not copied, it may be memory-mapped
+        return matrices[0].tocsr()
+    return sum(
+        matrices,
+        start=csr_matrix((states_num, states_num), dtype=bool),
+    ).tocsr()
+
+
+def _reach_by_star(rows: csr_matrix, step: csr_matrix) -> csr_matrix:
+    """Calculates nodes reachable from rows of nodes by paths of any length
+    along edges of the matrix
+
+    Parameters
+    ----------
+    rows : csr_matrix
+        Bool matrix where each row is a set of nodes
+    step : csr_matrix
+        Adjacency matrix
+
+    Returns
+    -------
+    reachable : csr_matrix
+        Rows of reachable nodes
+    """
+    reachable = front = rows.tocsr()
+    while front.nnz:
+        front = (front @ step) > reachable
+        reachable = reachable + front
+    return reachable
+
+
+def _label_set(query: Regex) -> Optional[FrozenSet]:
+    """Converts regular expression that is a union of labels to the set of labels
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+
+    Returns
+    -------
+    labels : Optional[FrozenSet]
+        Set of labels or None if the expression is not a union of labels
+    """
+    # Epsilon and Empty are symbols of pyformlang too
+    if isinstance(query.head, (regex_objects.Epsilon, regex_objects.Empty)):
+        return None
+    if isinstance(query.head, regex_objects.Symbol):
+        return frozenset([query.head.value])
+    if isinstance(query.head, regex_objects.Union):
+        left, right = (_label_set(son) for son in query.sons)
+        if left is None or right is None:
+            return None
+        return left | right
+    return None
+
+
+def _compile_bfs_query(
+    query: Regex,
+    query_cache: Optional[RegexQueryCache],
+    query_automaton: QueryAutomatonMode,
+) -> BoolMatrixAutomaton:
+    """Compiles query to automaton without epsilon transitions used by bfs
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+        Only minimal DFAs are cached
+    query_automaton: QueryAutomatonMode
+        The kind of automaton the query is compiled to
+
+    Returns
+    -------
+    query_bool_mtx : BoolMatrixAutomaton
+        Compiled query
+    """
+    if query_automaton == QueryAutomatonMode.NFA:
+        return regex_to_bool_matrix(query)
+    return _compile_query(query=query, query_cache=query_cache)
+
+
+def _compile_query(
+    query: Regex, query_cache: Optional[RegexQueryCache]
+) -> BoolMatrixAutomaton:
+    """Compiles query to minimal DFA represented by bool matrices
+
+    Parameters
+    ----------
+    query: Regex
+        Query represented by regular expression
+    query_cache: Optional[RegexQueryCache]
+        Cache of compiled queries. If parameter is None then query is compiled anew
+
+    Returns
+    -------
+    query_bool_mtx : BoolMatrixAutomaton
+        Compiled query
+    """
+    if query_cache is not None:
+        return query_cache.get(query)
+    return BoolMatrixAutomaton.from_nfa(
+        regex_to_min_dfa(regex=query),
     )
@@ -1,10 +1,14 @@
-from typing import NamedTuple, Dict
+from typing import Any, NamedTuple, Dict, List
 
+import numpy as np
 from pyformlang.cfg import Variable
 from pyformlang.finite_automaton import DeterministicFiniteAutomaton
 
+from project import automata
+
 __all__ = [
     "RSM",
+    "CompactRSM",
 ]
 
 
@@ -33,5 +37,119 @@ class RSM(NamedTuple):
         """
         return RSM(
             start_symbol=self.start_symbol,
-            boxes={v: a.minimize() for v, a in self.boxes.items()},
+            boxes={v: automata.minimize_dfa(a) for v, a in self.boxes.items()},
         )
+
+
+class CompactRSM(NamedTuple):
+    """Class represents Recursive State Machine with integer states,
+    states of all boxes are numbered consecutively, so the RSM
+    is converted to matrices without lookups of states
+
+    Attributes
+    ----------
+
+    start_symbol: Variable
+        Start symbol of automaton
+    boxes: List[Variable]
+        Variables of boxes sorted by their names
+    box_offsets: np.ndarray
+        Array of length len(boxes) + 1, states of i-th box
+        are numbered from box_offsets[i] to box_offsets[i + 1] - 1
+    state_names: List[Any]
+        Names of states in their boxes, states of a box are sorted by names
+    start_states: np.ndarray
+        Bool array of start states
+    final_states: np.ndarray
+        Bool array of final states
+    labels: List[Any]
+        Names of labels of transitions
+    label_offsets: np.ndarray
+        Array of length len(labels) + 1, transitions labeled with i-th label
+        are rows from label_offsets[i] to label_offsets[i + 1] - 1 of transitions
+    transitions: np.ndarray
+        Array of shape (transitions number, 2) of source and target states
+    """
+
+    start_symbol: Variable
+    boxes: List[Variable]
+    box_offsets: np.ndarray
+    state_names: List[Any]
+    start_states: np.ndarray
+    final_states: np.ndarray
+    labels: List[Any]
+    label_offsets: np.ndarray
+    transitions: np.ndarray
+
+    @classmethod
+    def from_rsm(cls, rsm: RSM) -> "CompactRSM":
+        """Numbers states and labels of RSM
+
+        Parameters
+        ----------
+        rsm : RSM
+            Recursive state machine
+
+        Returns
+        -------
+        compact_rsm : CompactRSM
+            Recursive state machine with integer states
+        """
+        # Non-terminals are not ordered, so boxes are sorted by their names
+        boxes = sorted(rsm.boxes, key=lambda v: v.value)
+        box_offsets = [0]
+        state_names, start_states, final_states = [], [], []
+        label_to_idx: Dict[Any, int] = dict()
+        transitions = []
+        for box in boxes:
+            dfa = rsm.boxes[box]
+            states = sorted(dfa.states, key=lambda s: s.value)
+            state_to_idx = {s: box_offsets[-1] + i for i, s in enumerate(states)}
+            box_offsets.append(box_offsets[-1] + len(states))
+            state_names.extend(s.value for s in states)
+            start_states.extend(s in dfa.start_states for s in states)
+            final_states.extend(s in dfa.final_states for s in states)
+            for state_from, steps in dfa.to_dict().items():
+                for label, states_to in steps.items():
+                    label_idx = label_to_idx.setdefault(label.value, len(label_to_idx))
+                    states_to = states_to if isinstance(states_to, set) else {states_to}
+                    transitions.extend(
+                        (label_idx, state_to_idx[state_from], state_to_idx[state_to])
+                        for state_to in states_to
+                    )
+        transitions = np.array(transitions, dtype=np.int64).reshape(-1, 3)
+        transitions = transitions[np.argsort(transitions[:, 0], kind="stable")]
+        return cls(
+            start_symbol=rsm.start_symbol,
+            boxes=boxes,
+            box_offsets=np.array(box_offsets, dtype=np.int64),
+            state_names=state_names,
+            start_states=np.array(start_states, dtype=bool),
+            final_states=np.array(final_states, dtype=bool),
+            labels=list(label_to_idx),
+            label_offsets=np.searchsorted(
+                transitions[:, 0], np.arange(len(label_to_idx) + 1)
+            ),
+            transitions=transitions[:, 1:],
+        )
+
+    @property
+    def states_num(self) -> int:
+        """Returns the number of states of all boxes
+
+        Returns
+        -------
+        states_num : int
+            Number of states
+        """
+        return len(self.state_names)
+
+    def box_of_states(self) -> np.ndarray:
+        """Returns indices of boxes of states
+
+        Returns
+        -------
+        box_of_states : np.ndarray
+            Array where i-th element is the index in boxes of the box of i-th state
+        """
+        return np.repeat(np.arange(len(self.boxes)), np.diff(self.box_offsets))
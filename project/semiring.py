@@ -0,0 +1,362 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterator, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, eye
+
+__all__ = [
+    "Semiring",
+    "BooleanSemiring",
+    "CountingSemiring",
+    "TropicalSemiring",
+    "BOOLEAN_SEMIRING",
+    "TROPICAL_SEMIRING",
+]
+
+
+class Semiring(ABC):
+    """Base class of semirings over sparse matrices
+
+    Entries that are not stored in a matrix are equal to zero of the semiring,
+    stored entries may be equal to zero of the number type,
+    e.g. distance 0 in tropical semiring
+
+    Attributes
+    ----------
+
+    dtype : Any
+        Number type of matrix entries
+    idempotent : bool
+        Means addition of the semiring is idempotent, i.e. a + a = a.
+        Closures over idempotent semirings may be calculated by repeated squaring
+    """
+
+    dtype: Any = None
+    idempotent: bool = False
+
+    def lift(self, mtx: Any) -> csr_matrix:
+        """Converts bool adjacency matrix to the matrix of the semiring
+
+        Parameters
+        ----------
+        mtx : Any
+            Bool sparse matrix, each edge is a path of length one,
+            stored False entries are not edges
+
+        Returns
+        -------
+        lifted : csr_matrix
+            Matrix where each edge is replaced with one of the semiring
+        """
+        # Kronecker products store whole blocks with explicit False entries,
+        # they are not edges. Matrix is copied, it may be memory-mapped
+        mtx = mtx.tocsr(copy=True)
+        mtx.sum_duplicates()
+        mtx.eliminate_zeros()
+        return csr_matrix(
+            (
+                np.full(mtx.nnz, self.edge_value(), dtype=self.dtype),
+                mtx.indices,
+                mtx.indptr,
+            ),
+            shape=mtx.shape,
+        )
+
+    @abstractmethod
+    def edge_value(self) -> Any:
+        """Returns the value of path consisting of one edge
+
+        Returns
+        -------
+        value : Any
+            Value of single edge
+        """
+
+    @abstractmethod
+    def plus(self, first: Any, second: Any) -> Any:
+        """Calculates sum of two values of the semiring
+
+        Parameters
+        ----------
+        first : Any
+            First summand
+        second : Any
+            Second summand
+
+        Returns
+        -------
+        sum : Any
+            Sum in the semiring
+        """
+
+    @abstractmethod
+    def identity(self, n: int) -> csr_matrix:
+        """Returns identity matrix of the semiring, i.e. paths of length zero
+
+        Parameters
+        ----------
+        n : int
+            Size of the matrix
+
+        Returns
+        -------
+        identity : csr_matrix
+            Identity matrix
+        """
+
+    def zeros(self, shape: Tuple[int, int]) -> csr_matrix:
+        """Returns zero matrix of the semiring
+
+        Parameters
+        ----------
+        shape : Tuple[int, int]
+            Shape of the matrix
+
+        Returns
+        -------
+        zeros : csr_matrix
+            Matrix without stored entries
+        """
+        return csr_matrix(shape, dtype=self.dtype)
+
+    @abstractmethod
+    def add(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        """Calculates elementwise sum of matrices
+
+        Parameters
+        ----------
+        first : csr_matrix
+            First summand
+        second : csr_matrix
+            Second summand
+
+        Returns
+        -------
+        sum : csr_matrix
+            Elementwise sum in the semiring
+        """
+
+    @abstractmethod
+    def mul(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        """Calculates matrix product
+
+        Parameters
+        ----------
+        first : csr_matrix
+            Left factor
+        second : csr_matrix
+            Right factor
+
+        Returns
+        -------
+        product : csr_matrix
+            Matrix product in the semiring
+        """
+
+    def equal(self, first: csr_matrix, second: csr_matrix) -> bool:
+        """Checks that matrices store the same entries
+
+        Parameters
+        ----------
+        first : csr_matrix
+            First matrix
+        second : csr_matrix
+            Second matrix
+
+        Returns
+        -------
+        result : bool
+            Are matrices equal
+        """
+        first, second = first.tocsr(), second.tocsr()
+        first.sum_duplicates()
+        second.sum_duplicates()
+        return (
+            first.shape == second.shape
+            and np.array_equal(first.indptr, second.indptr)
+            and np.array_equal(first.indices, second.indices)
+            and np.array_equal(first.data, second.data)
+        )
+
+    def entries(self, mtx: csr_matrix) -> Iterator[Tuple[int, int, Any]]:
+        """Iterates over stored entries of matrix
+
+        Parameters
+        ----------
+        mtx : csr_matrix
+            Matrix of the semiring
+
+        Returns
+        -------
+        entries : Iterator[Tuple[int, int, Any]]
+            Triples of row, column and value
+        """
+        coo = mtx.tocoo()
+        return zip(coo.row.tolist(), coo.col.tolist(), coo.data.tolist())
+
+    def closure(self, mtx: csr_matrix) -> csr_matrix:
+        """Calculates the sum of all non-zero powers of matrix, i.e. paths of positive length
+
+        Parameters
+        ----------
+        mtx : csr_matrix
+            Matrix of the semiring
+
+        Returns
+        -------
+        closure : csr_matrix
+            Closure of the matrix
+        """
+        closure = mtx
+        while True:
+            if self.idempotent:
+                new_closure = self.add(closure, self.mul(closure, closure))
+            else:
+                new_closure = self.add(mtx, self.mul(mtx, closure))
+            if self.equal(closure, new_closure):
+                return closure
+            closure = new_closure
+
+
+class BooleanSemiring(Semiring):
+    """Class represents semiring of reachability, i.e. (OR, AND)"""
+
+    dtype = bool
+    idempotent = True
+
+    def edge_value(self) -> Any:
+        return True
+
+    def plus(self, first: Any, second: Any) -> Any:
+        return first or second
+
+    def identity(self, n: int) -> csr_matrix:
+        return eye(n, dtype=bool, format="csr")
+
+    def add(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        return (first + second).tocsr()
+
+    def mul(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        return (first @ second).tocsr()
+
+    def equal(self, first: csr_matrix, second: csr_matrix) -> bool:
+        return first.shape == second.shape and (first != second).nnz == 0
+
+
+class CountingSemiring(Semiring):
+    dtype = np.int64
+    idempotent = False
+
+    def __init__(self, bound: int):
+        """Class represents semiring of path counting, i.e. (+, *),
+        where counts are saturated at the bound, so the fixpoint is reached
+        on graphs with cycles
+
+        Attributes
+        ----------
+
+        bound : int
+            Maximal count, greater counts are replaced with it
+        """
+        if bound <= 0:
+            raise ValueError("Bound must be positive")
+        self.bound = bound
+
+    def edge_value(self) -> Any:
+        return 1
+
+    def plus(self, first: Any, second: Any) -> Any:
+        return min(first + second, self.bound)
+
+    def identity(self, n: int) -> csr_matrix:
+        return eye(n, dtype=self.dtype, format="csr")
+
+    def add(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        return (first + second).minimum(self.bound).tocsr()
+
+    def mul(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        return (first @ second).minimum(self.bound).tocsr()
+
+
+class TropicalSemiring(Semiring):
+    """Class represents semiring of shortest paths, i.e. (min, +),
+    where each edge has length one"""
+
+    dtype = np.float64
+    idempotent = True
+
+    def edge_value(self) -> Any:
+        return 1.0
+
+    def plus(self, first: Any, second: Any) -> Any:
+        return min(first, second)
+
+    def identity(self, n: int) -> csr_matrix:
+        return csr_matrix(
+            (np.zeros(n, dtype=self.dtype), np.arange(n), np.arange(n + 1)),
+            shape=(n, n),
+        )
+
+    def add(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        first, second = first.tocoo(), second.tocoo()
+        return _min_reduce(
+            rows=np.concatenate((first.row, second.row)),
+            cols=np.concatenate((first.col, second.col)),
+            values=np.concatenate((first.data, second.data)),
+            shape=first.shape,
+        )
+
+    def mul(self, first: csr_matrix, second: csr_matrix) -> csr_matrix:
+        first, second = first.tocoo(), second.tocsr()
+        counts = np.diff(second.indptr)[first.col]
+        total = int(counts.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(second.indptr[first.col], counts) + offsets
+        return _min_reduce(
+            rows=np.repeat(first.row, counts),
+            cols=second.indices[positions],
+            values=np.repeat(first.data, counts) + second.data[positions],
+            shape=(first.shape[0], second.shape[1]),
+        )
+
+
+def _min_reduce(
+    rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape: Tuple[int, int]
+) -> csr_matrix:
+    """Builds matrix keeping the minimal value among duplicate entries
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        Row indices of entries
+    cols : np.ndarray
+        Column indices of entries
+    values : np.ndarray
+        Values of entries
+    shape : Tuple[int, int]
+        Shape of the matrix
+
+    Returns
+    -------
+    mtx : csr_matrix
+        Matrix with explicitly stored entries
+    """
+    if not len(values):
+        return csr_matrix(shape, dtype=np.float64)
+    keys = rows.astype(np.int64) * shape[1] + cols
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    is_first = np.ones(len(keys), dtype=bool)
+    is_first[1:] = keys[1:] != keys[:-1]
+    keys, values = keys[is_first], values[is_first]
+    rows, cols = keys // shape[1], keys % shape[1]
+    indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+    return csr_matrix(
+        (values.astype(np.float64), cols, indptr),
+        shape=shape,
+    )
+
+
+BOOLEAN_SEMIRING = BooleanSemiring()
+TROPICAL_SEMIRING = TropicalSemiring()
@@ -115,6 +115,43 @@ def test_intersection_with_non_empty_automaton_matrix(non_empty_nfa):
     )
 
 
+def test_trimmed_intersection_with_empty(non_empty_nfa, empty_nfa):
+    intersection = BoolMatrixAutomaton.from_nfa(non_empty_nfa).intersect_trimmed(
+        BoolMatrixAutomaton.from_nfa(empty_nfa)
+    )
+    assert all(
+        (
+            not intersection.start_states,
+            not intersection.final_states,
+            not intersection.state_to_idx,
+            not intersection.b_mtx,
+        )
+    )
+
+
+def test_trimmed_intersection_keeps_useful_states(non_empty_nfa):
+    other_nfa = non_empty_nfa.copy()
+    # States unreachable from the start state or not reaching the final one
+    other_nfa.add_transition(State(2), Symbol("a"), State(0))
+    other_nfa.add_transition(State(0), Symbol("c"), State(3))
+    intersection = BoolMatrixAutomaton.from_nfa(non_empty_nfa).intersect_trimmed(
+        BoolMatrixAutomaton.from_nfa(other_nfa)
+    )
+    assert all(
+        (
+            {State((0, 0))} == intersection.start_states,
+            {State((1, 1))} == intersection.final_states,
+            {State((0, 0)): 0, State((1, 1)): 1} == intersection.state_to_idx,
+            [[True, False], [False, False]]
+            == intersection.b_mtx["a"].toarray().tolist(),
+            [[False, True], [False, False]]
+            == intersection.b_mtx["b"].toarray().tolist(),
+            [[False, False], [False, True]]
+            == intersection.b_mtx["c"].toarray().tolist(),
+        )
+    )
+
+
 def test_transitive_closure_empty(empty_nfa):
     tc = BoolMatrixAutomaton.from_nfa(empty_nfa).transitive_closure()
     assert not tc.toarray().tolist()
@@ -123,3 +160,14 @@ def test_transitive_closure_empty(empty_nfa):
 def test_transitive_closure_non_empty(non_empty_nfa):
     tc = BoolMatrixAutomaton.from_nfa(non_empty_nfa).transitive_closure()
     assert [[2, 3], [0, 2]] == tc.toarray().tolist()
+
+
+def test_reachable_from_empty(empty_nfa):
+    reachable = BoolMatrixAutomaton.from_nfa(empty_nfa).reachable_from([])
+    assert not reachable.toarray().tolist()
+
+
+def test_reachable_from_non_empty(non_empty_nfa):
+    mtx = BoolMatrixAutomaton.from_nfa(non_empty_nfa)
+    reachable = mtx.reachable_from([mtx.state_to_idx[State(1)]])
+    assert [[False, True]] == reachable.toarray().tolist()
@@ -0,0 +1,80 @@
+import pytest
+from networkx import MultiDiGraph
+from pyformlang.finite_automaton import State
+from pyformlang.regular_expression import Regex
+
+from project.matrix_utils import *
+from project.rpq import *
+
+
+@pytest.fixture
+def graph():
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="")
+    graph.add_edge(2, 0, label="b")
+    return graph
+
+
+def test_bool_matrix_from_empty_graph():
+    mtx = BoolMatrixAutomaton.from_graph(MultiDiGraph())
+    assert all(
+        (
+            not mtx.start_states,
+            not mtx.final_states,
+            not mtx.state_to_idx,
+            not mtx.b_mtx,
+        )
+    )
+
+
+def test_bool_matrix_from_graph_states(graph):
+    mtx = BoolMatrixAutomaton.from_graph(graph, start_states={0}, final_states=None)
+    assert all(
+        (
+            {State(0)} == mtx.start_states,
+            {State(0), State(1), State(2)} == mtx.final_states,
+            {State(0): 0, State(1): 1, State(2): 2} == mtx.state_to_idx,
+        )
+    )
+
+
+def test_bool_matrix_from_graph_folds_epsilons(graph):
+    mtx = BoolMatrixAutomaton.from_graph(graph)
+    assert all(
+        (
+            {"a", "b"} == set(mtx.b_mtx.keys()),
+            [[False, True, True], [False, False, False], [False, False, False]]
+            == mtx.b_mtx["a"].toarray().tolist(),
+            [[False, False, False], [True, False, False], [True, False, False]]
+            == mtx.b_mtx["b"].toarray().tolist(),
+        )
+    )
+
+
+def test_bool_matrix_from_graph_skips_epsilons(graph):
+    mtx = BoolMatrixAutomaton.from_graph(graph, fold_epsilons=False)
+    assert all(
+        (
+            {"a", "b"} == set(mtx.b_mtx.keys()),
+            [[False, True, False], [False, False, False], [False, False, False]]
+            == mtx.b_mtx["a"].toarray().tolist(),
+        )
+    )
+
+
+def test_bool_matrix_from_edges():
+    mtx = BoolMatrixAutomaton.from_edges(
+        nodes=["x", "y"],
+        edges=[("x", "y", "a"), ("x", "y", "a"), ("y", "x", "b")],
+    )
+    assert all(
+        (
+            [[False, True], [False, False]] == mtx.b_mtx["a"].toarray().tolist(),
+            [[False, False], [True, False]] == mtx.b_mtx["b"].toarray().tolist(),
+        )
+    )
+
+
+def test_rpq_over_epsilon_edges(graph):
+    assert rpq_tensor(graph, Regex("a.b"), {0}, {0}) == {(0, 0)}
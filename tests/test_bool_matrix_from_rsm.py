@@ -1,8 +1,9 @@
 import pytest
-from pyformlang.cfg import CFG
+from pyformlang.cfg import CFG, Variable
 
 from project.ecfg import *
 from project.matrix_utils import *
+from project.rsm import *
 
 
 @pytest.mark.parametrize(
@@ -70,3 +71,40 @@ def test_bool_matrix_from_rsm(
             == expected_b_mtx,
         )
     )
+
+
+def test_compact_rsm():
+    cfg = CFG.from_text("""
+        S -> A S b | $
+        A -> a | A c
+        """)
+    rsm = ECFG.from_cfg(cfg).to_rsm()
+    compact_rsm = CompactRSM.from_rsm(rsm)
+    assert [box.value for box in compact_rsm.boxes] == ["A", "S"]
+    assert compact_rsm.box_offsets.tolist() == [
+        0,
+        len(rsm.boxes[Variable("A")].states),
+        compact_rsm.states_num,
+    ]
+    assert compact_rsm.box_of_states().tolist() == [
+        0 if i < compact_rsm.box_offsets[1] else 1
+        for i in range(compact_rsm.states_num)
+    ]
+    assert compact_rsm.label_offsets[-1] == len(compact_rsm.transitions)
+    assert sorted(compact_rsm.labels) == ["A", "S", "a", "b", "c"]
+
+    bool_mtx = BoolMatrixAutomaton.from_compact_rsm(compact_rsm)
+    assert len(bool_mtx.state_to_idx) == compact_rsm.states_num
+    assert {bool_mtx.state_to_idx[s] for s in bool_mtx.start_states} == set(
+        compact_rsm.start_states.nonzero()[0]
+    )
+    for i, label in enumerate(compact_rsm.labels):
+        rows, cols = bool_mtx.b_mtx[label].nonzero()
+        assert sorted(zip(rows, cols)) == sorted(
+            map(
+                tuple,
+                compact_rsm.transitions[
+                    compact_rsm.label_offsets[i] : compact_rsm.label_offsets[i + 1]
+                ].tolist(),
+            )
+        )
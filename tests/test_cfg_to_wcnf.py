@@ -76,3 +76,71 @@ def test_both_forms_accept_same(cfg, words):
     cfg = CFG.from_text(cfg)
     wcnf = cfg_to_wcnf(cfg)
     assert all(cfg.contains(word) == wcnf.contains(word) for word in words)
+
+
+@pytest.mark.parametrize(
+    "cfg, words",
+    [
+        (
+            """
+            S -> S
+            """,
+            ["", "abc"],
+        ),
+        (
+            """
+            S -> T
+            T -> t
+            """,
+            ["", "t", "a"],
+        ),
+        (
+            """
+            S ->
+            S -> a S b S
+            """,
+            ["", "ab", "ba", "aabb", "abba", "abab"],
+        ),
+        (
+            """
+            S -> A | a b c
+            A -> B | A a b c
+            B -> S | b
+            """,
+            ["", "b", "abc", "babc", "babcabc", "ab"],
+        ),
+    ],
+)
+def test_compact_wcnf_accepts_same(cfg, words):
+    cfg = CFG.from_text(cfg)
+    wcnf, stats = cfg_to_compact_wcnf(cfg)
+    assert stats.productions_before == len(cfg.productions)
+    assert stats.productions_after == len(wcnf.productions)
+    assert all(
+        len(p.body) == 0
+        or len(p.body) == 1
+        and isinstance(p.body[0], Terminal)
+        or len(p.body) == 2
+        and all(isinstance(s, Variable) for s in p.body)
+        for p in wcnf.productions
+    )
+    assert all(cfg.contains(word) == wcnf.contains(word) for word in words)
+
+
+def test_compact_wcnf_merges_unit_cycles():
+    cfg = CFG.from_text("""
+        S -> A | a b c
+        A -> B | A a b c
+        B -> S | b
+        """)
+    wcnf, stats = cfg_to_compact_wcnf(cfg)
+    assert wcnf.variables == {
+        Variable("S"),
+        Variable("a#CNF#"),
+        Variable("b#CNF#"),
+        Variable("c#CNF#"),
+        Variable("C#CNF#1"),
+        Variable("C#CNF#2"),
+    }
+    assert stats.productions_after == 8
+    assert len(cfg_to_wcnf(cfg).productions) == 11
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from pyformlang.cfg import CFG, Variable
+
+from project import BoolMatrixAutomaton, CompiledGrammar, ECFG
+from project.graph_utils import *
+from project.cfpq import *
+
+CFG_TEXTS = [
+    """
+    S ->
+    """,
+    """
+    S -> a S b S
+    S ->
+    """,
+    """
+    S -> A B
+    A -> a | a A
+    B -> b | S
+    C -> c
+    """,
+]
+
+
+@pytest.mark.parametrize("cfg_as_text", CFG_TEXTS)
+def test_save_and_load_keep_grammar(cfg_as_text, tmp_path):
+    compiled = CompiledGrammar.from_cfg(CFG.from_text(cfg_as_text))
+    path = tmp_path / "grammar.npz"
+    compiled.save(path)
+    loaded = CompiledGrammar.load(path)
+
+    assert loaded.start_symbol == compiled.start_symbol
+    assert set(loaded.wcnf.productions) == set(compiled.wcnf.productions)
+    assert loaded.nullable_symbols == compiled.nullable_symbols
+    expected_bool_mtx = BoolMatrixAutomaton.from_rsm(compiled.rsm)
+    actual_bool_mtx = BoolMatrixAutomaton.from_rsm(loaded.rsm)
+    assert {
+        expected_bool_mtx.state_to_idx[s] for s in expected_bool_mtx.final_states
+    } == {actual_bool_mtx.state_to_idx[s] for s in actual_bool_mtx.final_states}
+    assert {k: v.toarray().tolist() for k, v in expected_bool_mtx.b_mtx.items()} == {
+        k: v.toarray().tolist() for k, v in actual_bool_mtx.b_mtx.items()
+    }
+
+
+@pytest.mark.parametrize("cfg_as_text", CFG_TEXTS)
+@pytest.mark.parametrize("algo", list(CFPQAlgorithm))
+def test_cfpq_with_loaded_grammar(cfg_as_text, algo, tmp_path):
+    cfg = CFG.from_text(cfg_as_text)
+    graph = create_two_cycle_labeled_graph(2, 3, ("a", "b"))
+    path = tmp_path / "grammar.npz"
+    CompiledGrammar.from_cfg(cfg).save(path)
+    assert cfpq(algo, graph, CompiledGrammar.load(path)) == cfpq(algo, graph, cfg)
+
+
+def test_ecfg_nullable_symbols():
+    ecfg = ECFG.from_text("""
+        S -> A B* | a
+        A -> (a | $) B*
+        B -> b
+        """)
+    compiled = CompiledGrammar.from_ecfg(ecfg)
+    assert compiled.wcnf is None
+    assert compiled.nullable_symbols == {Variable("S"), Variable("A")}
+
+
+def test_load_rejects_other_version(tmp_path):
+    path = tmp_path / "grammar.npz"
+    CompiledGrammar.from_cfg(CFG.from_text("S -> a")).save(path)
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    arrays["metadata"] = np.array(
+        str(arrays["metadata"]).replace('"version": 1', '"version": 0')
+    )
+    np.savez(path, **arrays)
+    with pytest.raises(ValueError):
+        CompiledGrammar.load(path)
+
+
+def test_cfpq_rejects_grammar_compiled_for_other_start_symbol():
+    compiled = CompiledGrammar.from_cfg(CFG.from_text("S -> a"))
+    graph = create_two_cycle_labeled_graph(1, 1, ("a", "b"))
+    with pytest.raises(ValueError):
+        cfpq(CFPQAlgorithm.MATRIX, graph, compiled, start_symbol=Variable("A"))
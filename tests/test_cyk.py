@@ -33,8 +33,43 @@ from project.cyk import *
         ),
     ],
 )
-def test_cyk(cfg_as_text, words_in_grammar, words_not_in_grammar):
+@pytest.mark.parametrize("recognize", [cyk, cyk_bitset])
+def test_cyk(cfg_as_text, words_in_grammar, words_not_in_grammar, recognize):
     cfg = CFG.from_text(cfg_as_text)
-    assert all(cyk(s, cfg) for s in words_in_grammar) and all(
-        not cyk(s, cfg) for s in words_not_in_grammar
+    assert all(recognize(s, cfg) for s in words_in_grammar) and all(
+        not recognize(s, cfg) for s in words_not_in_grammar
     )
+
+
+def test_cyk_bitset_with_many_non_terminals():
+    # More than one chunk of bits per cell
+    cfg = CFG.from_text(
+        "\n".join(f"A{i} -> A{i + 1} b | a" for i in range(20)) + "\nA20 -> c",
+        start_symbol="A0",
+    )
+    assert cyk_bitset("a", cfg)
+    assert cyk_bitset("cbbbbbbbbbbbbbbbbbbbb", cfg)
+    assert not cyk_bitset("cbbbbbbbbbbbbbbbbbbbbb", cfg)
+    assert cyk_bitset("abbb", cfg) == cyk("abbb", cfg)
+
+
+@pytest.fixture
+def recognizer():
+    return CYKRecognizer(CFG.from_text("""
+            S ->
+            S -> a S b S
+            """))
+
+
+def test_recognizer_accepts(recognizer):
+    assert recognizer.accepts("")
+    assert recognizer.accepts("aabbab")
+    assert not recognizer.accepts("aba")
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_recognizer_accepts_many(recognizer, processes):
+    words = ["", "ab", "ba", "aabb", "abab", "aab", "ab", "c"] * 3
+    result = recognizer.accepts_many(words, processes=processes, chunk_size=2)
+    assert result.dtype == bool
+    assert result.tolist() == [recognizer.accepts(word) for word in words]
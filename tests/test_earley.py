@@ -0,0 +1,97 @@
+import pytest
+from pyformlang.cfg import CFG, Variable
+
+from project.earley import *
+from project.ecfg import ECFG
+
+
+@pytest.mark.parametrize(
+    "cfg_as_text, words_in_grammar, words_not_in_grammar",
+    [
+        (
+            """
+            S ->
+            """,
+            [""],
+            ["a", "b", "aa", "bb"],
+        ),
+        (
+            """
+            S ->
+            S -> a S b S
+            """,
+            ["", "ab", "aabb", "abab"],
+            ["a", "b", "aa", "bb", "aba", "bab"],
+        ),
+        (
+            """
+            S -> 0 | 1
+            S -> ( S )
+            S -> S + S
+            """,
+            ["0", "1", "1+1", "(1+0)+1"],
+            ["", "2", "(", "1)", "(1+0", "1++1"],
+        ),
+        (
+            """
+            S -> A S B | c
+            A -> a | $
+            B -> b | B B
+            """,
+            ["c", "cb", "acbb", "cbbb", "aacbb"],
+            ["", "a", "ac", "acc", "bc"],
+        ),
+    ],
+)
+def test_earley(cfg_as_text, words_in_grammar, words_not_in_grammar):
+    cfg = CFG.from_text(cfg_as_text)
+    assert all(earley(s, cfg) for s in words_in_grammar) and all(
+        not earley(s, cfg) for s in words_not_in_grammar
+    )
+
+
+@pytest.fixture
+def recognizer():
+    return EarleyRecognizer(CFG.from_text("""
+            S -> ( S ) S | $
+            S -> U a
+            U -> U b
+            """))
+
+
+def test_earley_recognizer_reports_prefixes(recognizer):
+    assert recognizer.is_viable_prefix() and recognizer.is_accepted()
+    assert recognizer.feed("(") and not recognizer.is_accepted()
+    assert recognizer.feed("(") and recognizer.feed(")")
+    assert recognizer.feed(")") and recognizer.is_accepted()
+    # Productions of U never derive a word
+    assert not recognizer.feed("a") and not recognizer.is_accepted()
+    assert not recognizer.feed(")")
+
+    recognizer.reset()
+    assert recognizer.is_accepted()
+    assert not recognizer.feed_many("())")
+    recognizer.reset()
+    assert recognizer.feed_many("()()") and recognizer.is_accepted()
+
+
+def test_earley_recognizer_accepts_long_words(recognizer):
+    assert recognizer.feed_many("(" * 5000 + ")" * 5000)
+    assert recognizer.is_accepted()
+    # Right recursion
+    assert recognizer.feed_many("()" * 20000)
+    assert recognizer.is_accepted()
+
+
+def test_earley_over_rsm():
+    rsm = ECFG.from_text("""
+            S -> (a S b)* | c*
+            """).to_rsm()
+    assert all(earley(s, rsm) for s in ["", "ccc", "aabbab", "acbab"])
+    assert not any(earley(s, rsm) for s in ["aab", "ca", "acbc"])
+
+
+def test_earley_without_words():
+    recognizer = EarleyRecognizer(CFG(start_symbol=Variable("S"), productions=set()))
+    assert not recognizer.is_viable_prefix() and not recognizer.is_accepted()
+    assert not recognizer.feed("a")
@@ -0,0 +1,204 @@
+import networkx as nx
+import numpy as np
+import pytest
+from pyformlang.regular_expression import Regex
+
+import project.graph_utils
+from project.graph_store import *
+from project.graph_utils import *
+from project.matrix_utils import *
+from project.reachability_index import *
+from project.rpq import *
+
+
+@pytest.fixture
+def graph():
+    graph = create_two_cycle_labeled_graph(
+        size_of_first_cycle=3,
+        size_of_second_cycle=2,
+        edge_labels=("a", "b"),
+    )
+    graph.add_edge(0, 1)
+    return graph
+
+
+def test_graph_store_from_graph(graph):
+    graph_store = GraphStore.from_graph(graph)
+    assert graph_store.nodes == list(graph.nodes)
+    assert sorted(graph_store.labels) == ["", "a", "b"]
+    assert graph_store.number_of_edges == graph.number_of_edges()
+    for i in range(len(graph_store.labels)):
+        sources = graph_store.sources[
+            graph_store.label_offsets[i] : graph_store.label_offsets[i + 1]
+        ]
+        assert (sources[:-1] <= sources[1:]).all()
+    assert nx.utils.edges_equal(
+        graph_store.to_graph().edges(data="label"),
+        [(u, v, label or "") for u, v, label in graph.edges(data="label")],
+    )
+
+
+@pytest.mark.parametrize("nodes", [None, ["x", "y", "z", "w", "v", "u"]])
+def test_graph_store_save_and_load(graph, nodes, tmp_path):
+    if nodes is not None:
+        graph = nx.relabel_nodes(graph, dict(zip(graph.nodes, nodes)))
+    graph_store = GraphStore.from_graph(graph)
+    graph_store.save(tmp_path / "graph.npz")
+    loaded = GraphStore.load(tmp_path / "graph.npz")
+    assert loaded.nodes == graph_store.nodes and loaded.labels == graph_store.labels
+    for name in ("label_offsets", "sources", "targets"):
+        assert (getattr(loaded, name) == getattr(graph_store, name)).all()
+
+
+@pytest.mark.parametrize("fold_epsilons", [True, False])
+def test_bool_matrix_from_graph_store(graph, fold_epsilons):
+    expected = BoolMatrixAutomaton.from_graph(
+        graph, start_states={0}, fold_epsilons=fold_epsilons
+    )
+    actual = BoolMatrixAutomaton.from_graph(
+        GraphStore.from_graph(graph), start_states={0}, fold_epsilons=fold_epsilons
+    )
+    assert actual.state_to_idx == expected.state_to_idx
+    assert actual.start_states == expected.start_states
+    assert actual.final_states == expected.final_states
+    assert actual.b_mtx.keys() == expected.b_mtx.keys()
+    assert all(
+        (actual.b_mtx[label] != expected.b_mtx[label]).nnz == 0
+        for label in expected.b_mtx
+    )
+
+
+def test_rpq_on_graph_store(graph):
+    query = Regex("a* b")
+    assert rpq_tensor(GraphStore.from_graph(graph), query, None, None) == rpq_tensor(
+        graph, query, None, None
+    )
+
+
+def test_load_graph_store_uses_cache(graph, tmp_path, monkeypatch):
+    loads = []
+
+    def load_graph(graph_name):
+        loads.append(graph_name)
+        return graph
+
+    monkeypatch.setattr(project.graph_utils, "load_graph", load_graph)
+    first = load_graph_store("some_graph", cache_dir=tmp_path / "cache")
+    second = load_graph_store("some_graph", cache_dir=tmp_path / "cache")
+    assert loads == ["some_graph"]
+    assert first.nodes == second.nodes and (first.targets == second.targets).all()
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["some_graph.npz"]
+
+
+def _write_csv(graph, path):
+    with open(path, "w") as f:
+        for u, v, label in graph.edges(data="label"):
+            f.write(f"{u} {v} {label or ''}\n")
+
+
+def _assert_same_matrices(actual, expected):
+    assert actual.state_to_idx == expected.state_to_idx
+    assert actual.b_mtx.keys() == expected.b_mtx.keys()
+    assert all(
+        (actual.b_mtx[label] != expected.b_mtx[label]).nnz == 0
+        for label in expected.b_mtx
+    )
+
+
+@pytest.mark.parametrize("fold_epsilons", [True, False])
+def test_bool_matrix_from_memmap_graph_store(graph, fold_epsilons, tmp_path):
+    graph_store = GraphStore.from_graph(graph)
+    memmap_store = MemmapGraphStore.from_graph_store(graph_store, tmp_path / "graph")
+    _assert_same_matrices(
+        BoolMatrixAutomaton.from_graph(
+            memmap_store, start_states={0, 10}, fold_epsilons=fold_epsilons
+        ),
+        BoolMatrixAutomaton.from_graph(
+            graph_store, start_states={0, 10}, fold_epsilons=fold_epsilons
+        ),
+    )
+
+
+def test_memmap_graph_store_matrices_share_files(graph, tmp_path):
+    MemmapGraphStore.from_graph_store(GraphStore.from_graph(graph), tmp_path / "graph")
+    memmap_store = MemmapGraphStore.open(tmp_path / "graph")
+    bool_mtx = BoolMatrixAutomaton.from_graph(memmap_store, fold_epsilons=False)
+    for label, indices in zip(memmap_store.labels, memmap_store.indices):
+        assert isinstance(indices, np.memmap)
+        if label != "":
+            assert np.shares_memory(bool_mtx.b_mtx[label].indices, indices)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+def test_memmap_graph_store_from_csv(graph, chunk_size, tmp_path):
+    _write_csv(graph, tmp_path / "graph.csv")
+    memmap_store = MemmapGraphStore.from_csv(
+        tmp_path / "graph.csv", tmp_path / "graph", chunk_size=chunk_size
+    )
+    # Nodes of CSV file are sorted, nodes without edges are not written to it
+    expected = nx.MultiDiGraph()
+    expected.add_nodes_from(memmap_store.nodes)
+    expected.add_edges_from(graph.edges(data=True))
+    assert memmap_store.nodes == sorted(expected.nodes)
+    _assert_same_matrices(
+        BoolMatrixAutomaton.from_graph(memmap_store),
+        BoolMatrixAutomaton.from_graph(expected),
+    )
+
+
+def test_rpq_bfs_on_memmap_graph_store(graph, tmp_path):
+    memmap_store = MemmapGraphStore.from_graph_store(
+        GraphStore.from_graph(graph), tmp_path / "graph"
+    )
+    for query in (Regex("a* b"), Regex("a a*"), Regex("(a | b)*")):
+        assert rpq_bfs(
+            memmap_store,
+            query,
+            {0},
+            None,
+            MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        ) == rpq_bfs(
+            graph,
+            query,
+            {0},
+            None,
+            MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        )
+
+
+def test_load_graph_memmap_uses_cache(graph, tmp_path, monkeypatch):
+    downloads = []
+
+    def download(graph_name):
+        downloads.append(graph_name)
+        _write_csv(graph, tmp_path / "graph.csv")
+        return tmp_path / "graph.csv"
+
+    monkeypatch.setattr(project.graph_utils.cfpq_data, "download", download)
+    first = load_graph_memmap("some_graph", cache_dir=tmp_path / "cache")
+    second = load_graph_memmap("some_graph", cache_dir=tmp_path / "cache")
+    assert downloads == ["some_graph"]
+    assert first.nodes == second.nodes and first.labels == second.labels
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["some_graph.mmap"]
+
+
+@pytest.mark.parametrize("from_csv", [True, False])
+def test_memmap_graph_store_merges_parallel_edges(from_csv, tmp_path):
+    graph = nx.MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="a")
+    if from_csv:
+        _write_csv(graph, tmp_path / "graph.csv")
+        memmap_store = MemmapGraphStore.from_csv(
+            tmp_path / "graph.csv", tmp_path / "graph", chunk_size=1
+        )
+    else:
+        memmap_store = MemmapGraphStore.from_graph_store(
+            GraphStore.from_graph(graph), tmp_path / "graph"
+        )
+    assert BoolMatrixAutomaton.from_graph(memmap_store).b_mtx["a"].nnz == 2
+    index = ReachabilityIndex.from_graph(graph, [{"a"}])
+    assert rpq_tensor(
+        memmap_store, Regex("a*"), {0}, None, reachability_index=index
+    ) == rpq_tensor(graph, Regex("a*"), {0}, None)
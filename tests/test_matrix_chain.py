@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.sparse import random as sparse_random
+
+from project.matrix_chain import *
+
+
+def test_plan_starts_with_selective_product():
+    stats = [
+        MatrixStats(rows=1000, cols=1000, nnz=100000),
+        MatrixStats(rows=1000, cols=1000, nnz=100000),
+        MatrixStats(rows=1000, cols=1000, nnz=10),
+    ]
+    assert (0, (1, 2)) == plan_matrix_chain(stats)
+
+
+def test_plan_of_single_matrix():
+    assert 0 == plan_matrix_chain([MatrixStats(rows=2, cols=2, nnz=1)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_multiply_chain_is_same_as_left_to_right(seed):
+    matrices = [
+        sparse_random(20, 20, density=density, random_state=seed + i, format="csr") > 0
+        for i, density in enumerate([0.3, 0.05, 0.5, 0.01, 0.2])
+    ]
+    expected = matrices[0]
+    for mtx in matrices[1:]:
+        expected = expected @ mtx
+    assert (multiply_chain(matrices) != expected).nnz == 0
+
+
+def test_estimate_product_of_identity_like_matrices():
+    product, cost = estimate_product(
+        MatrixStats(rows=100, cols=100, nnz=100),
+        MatrixStats(rows=100, cols=100, nnz=100),
+    )
+    assert np.isclose(product.nnz, 100, rtol=0.01)
+    assert np.isclose(cost, 100)
+
+
+def test_plan_product_sum_groups_common_factor():
+    stats = {
+        "A": MatrixStats(rows=100, cols=100, nnz=5000),
+        "B": MatrixStats(rows=100, cols=100, nnz=100),
+        "C": MatrixStats(rows=100, cols=100, nnz=100),
+    }
+    assert [(["A"], ["B", "C"])] == plan_product_sum(
+        pairs=[("A", "B"), ("A", "C")], stats=stats
+    )
+
+
+def test_plan_product_sum_covers_all_pairs():
+    stats = {key: MatrixStats(rows=10, cols=10, nnz=10) for key in "ABCD"}
+    pairs = [("A", "B"), ("A", "C"), ("D", "C"), ("B", "B")]
+    plan = plan_product_sum(pairs=pairs, stats=stats)
+    assert sorted(pairs) == sorted(
+        (left, right) for lefts, rights in plan for left in lefts for right in rights
+    )
@@ -0,0 +1,91 @@
+from itertools import islice
+
+import pytest
+from pyformlang.cfg import CFG, Production, Terminal
+
+from project.cyk import *
+from project.parse_forest import *
+
+
+def _leaves(tree):
+    if isinstance(tree.value, Terminal):
+        return [tree.value.value]
+    return [leaf for son in tree.sons for leaf in _leaves(son)]
+
+
+def _is_derivation(tree, cfg):
+    if isinstance(tree.value, Terminal):
+        return True
+    return Production(tree.value, [son.value for son in tree.sons]) in (
+        cfg.productions
+    ) and all(_is_derivation(son, cfg) for son in tree.sons)
+
+
+@pytest.mark.parametrize(
+    "cfg_as_text, word, trees_num",
+    [
+        ("S -> $", "", 1),
+        ("S -> a S b S | $", "aabbab", 1),
+        ("S -> S S | a", "a", 1),
+        ("S -> S S | a", "aaaa", 5),
+        ("S -> S S | a", "aaaaaaa", 132),
+        ("S -> A B\nA -> a | $\nB -> a | $", "a", 2),
+        ("S -> A c\nA -> A | a", "ac", 1),
+    ],
+)
+def test_cyk_parse_trees(cfg_as_text, word, trees_num):
+    cfg = CFG.from_text(cfg_as_text)
+    forest = cyk_parse(word, cfg)
+    assert forest.root == SymbolNode(cfg.start_symbol, 0, len(word))
+    trees = list(forest.trees())
+    assert len(trees) == trees_num
+    for tree in trees:
+        assert "".join(_leaves(tree)) == word and _is_derivation(tree, cfg)
+
+
+@pytest.mark.parametrize("word", ["b", "aab", "ba"])
+def test_cyk_parse_rejects(word):
+    cfg = CFG.from_text("S -> a S b S | $")
+    assert cyk_parse(word, cfg) is None
+    assert not cyk_parse("aabbab", cfg).is_ambiguous()
+
+
+def test_cyk_parse_shares_nodes_of_ambiguous_word():
+    forest = cyk_parse("a" * 40, CFG.from_text("S -> S S | a"))
+    # There are Catalan(39) trees, but the forest is cubic
+    assert forest.is_ambiguous()
+    assert sum(len(families) for families in forest.families.values()) < 40**3
+    assert len(list(islice(forest.trees(), 100))) == 100
+
+
+def test_save_parse_forest_as_dot(tmpdir):
+    file = tmpdir.mkdir("test_dir").join("forest.dot")
+    forest = cyk_parse("ab", CFG.from_text("S -> a B\nB -> b | $"))
+    save_parse_forest_as_dot(forest, file)
+    assert file.read().strip() == """
+strict digraph parse_forest {
+0 [label="S, 0, 2", shape=ellipse];
+p0 [shape=point];
+0 -> p0;
+1 [label="S -> a B ., 0, 2", shape=note];
+p0 -> 1;
+p1 [shape=point];
+1 -> p1;
+2 [label="S -> a . B, 0, 1", shape=note];
+p1 -> 2;
+3 [label="B, 1, 2", shape=ellipse];
+p1 -> 3;
+p2 [shape=point];
+3 -> p2;
+4 [label="B -> b ., 1, 2", shape=note];
+p2 -> 4;
+p3 [shape=point];
+4 -> p3;
+5 [label="b, 1, 2", shape=box];
+p3 -> 5;
+p4 [shape=point];
+2 -> p4;
+6 [label="a, 0, 1", shape=box];
+p4 -> 6;
+}
+""".strip()
@@ -0,0 +1,97 @@
+import pytest
+from networkx import MultiDiGraph
+from pyformlang.regular_expression import Regex
+
+from project.query_cache import *
+from project.rpq import *
+
+
+@pytest.fixture
+def graph():
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="b")
+    graph.add_edge(2, 0, label="a")
+    return graph
+
+
+def test_cache_accepts_regex_objects():
+    cache = RegexQueryCache()
+    first = cache.get(Regex("a.b*"))
+    second = cache.get(Regex("a.b*"))
+    assert first is second
+    assert cache.cache_info().hits == 1
+
+
+def test_cache_hit_returns_same_automaton():
+    cache = RegexQueryCache()
+    first = cache.get("a.b*")
+    second = cache.get("a.b*")
+    assert first is second
+    assert cache.cache_info() == QueryCacheInfo(
+        hits=1, disk_hits=0, misses=1, size=1, max_size=256
+    )
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RegexQueryCache(max_size=2)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+    cache.get("b")
+    info = cache.cache_info()
+    assert (info.hits, info.misses, info.size) == (1, 4, 2)
+
+
+def test_cache_persistent_tier(tmp_path, graph):
+    cold = RegexQueryCache(cache_dir=tmp_path)
+    expected = rpq_tensor(graph, Regex("(a.b)*"), None, None, query_cache=cold)
+    warm = RegexQueryCache(cache_dir=tmp_path)
+    actual = rpq_tensor(graph, Regex("(a.b)*"), None, None, query_cache=warm)
+    assert expected == actual
+    assert warm.cache_info().disk_hits == 1 and warm.cache_info().misses == 0
+
+
+@pytest.mark.parametrize("mode", list(MultipleSourceRpqMode))
+def test_rpq_bfs_with_cache_same_as_without(graph, mode):
+    cache = RegexQueryCache()
+    expected = rpq_bfs(graph, Regex("a.(b.a)*"), {0}, None, mode)
+    assert all(
+        rpq_bfs(graph, Regex("a.(b.a)*"), {0}, None, mode, query_cache=cache)
+        == expected
+        for _ in range(2)
+    )
+    assert cache.cache_info().hits == 1
+
+
+def test_cache_text_and_regex_share_key():
+    cache = RegexQueryCache()
+    first = cache.get("a.b*")
+    second = cache.get(Regex("a.b*"))
+    assert first is second
+    assert cache.cache_info().hits == 1
+
+
+def test_cache_persistent_tier_keeps_missing_labels_empty(tmp_path):
+    compiled = RegexQueryCache(cache_dir=tmp_path).get("a.b*")
+    warm = RegexQueryCache(cache_dir=tmp_path)
+    loaded = warm.get("a.b*")
+    assert warm.cache_info().disk_hits == 1
+    assert type(loaded.b_mtx) is type(compiled.b_mtx)
+    assert loaded.b_mtx["c"].shape == compiled.b_mtx["c"].shape
+    assert loaded.b_mtx["c"].nnz == 0
+
+
+def test_cache_tells_epsilon_from_dollar_symbol(tmp_path):
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="$")
+    graph.add_edge(1, 2, label="a")
+    cold = RegexQueryCache(cache_dir=tmp_path)
+    cold.get(Regex("($.a)*"))
+    assert rpq_tensor(graph, Regex("(\\$.a)*"), None, None, query_cache=cold) == {
+        (0, 2)
+    }
+    warm = RegexQueryCache(cache_dir=tmp_path)
+    assert "$" not in warm.get("$").b_mtx
+    assert "$" in warm.get("\\$").b_mtx
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from networkx import MultiDiGraph
+from pyformlang.regular_expression import Regex
+from scipy.sparse import csr_matrix
+
+from project import ReachabilityIndex
+from project.matrix_utils import BoolMatrixAutomaton
+from project.rpq import *
+
+
+@pytest.fixture
+def graph():
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="b")
+    graph.add_edge(2, 0, label="a")
+    graph.add_edge(2, 3, label="c")
+    graph.add_edge(3, 4, label="a")
+    return graph
+
+
+@pytest.fixture
+def index(graph):
+    return ReachabilityIndex.from_graph(graph, label_sets=[{"a"}, {"a", "b"}])
+
+
+def test_reach_from(index):
+    front = csr_matrix(([True], ([0], [0])), shape=(1, 5))
+    assert [0, 1, 2] == sorted(index.reach_from(front, {"a", "b"}).nonzero()[1])
+    assert [0, 1] == sorted(index.reach_from(front, {"a"}).nonzero()[1])
+
+
+def test_save_and_load(graph, index, tmp_path):
+    path = tmp_path / "index.npz"
+    index.save(path)
+    loaded = ReachabilityIndex.load(path)
+    assert index.nodes == loaded.nodes
+    assert set(index.label_sets) == set(loaded.label_sets)
+    for labels in index.label_sets:
+        assert (
+            index.component_closures[labels] != loaded.component_closures[labels]
+        ).nnz == 0
+
+
+@pytest.mark.parametrize("query", ["(a|b)*", "a* c", "(a|b)* c a*", "a b", "a c*"])
+@pytest.mark.parametrize("mode", list(TensorRpqMode))
+def test_rpq_tensor_with_index(graph, index, query, mode):
+    assert rpq_tensor(
+        graph=graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+        mode=mode,
+    ) == rpq_tensor(
+        graph=graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+        mode=mode,
+        reachability_index=index,
+    )
+
+
+@pytest.mark.parametrize("query", ["(a|b)*", "a* c", "(a|b)* c a*", "a b"])
+@pytest.mark.parametrize(
+    "mode",
+    [
+        MultipleSourceRpqMode.FIND_ALL_REACHABLE,
+        MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+    ],
+)
+def test_rpq_bfs_with_index(graph, index, query, mode):
+    assert rpq_bfs(
+        graph=graph,
+        query=Regex(query),
+        start_states={0, 3},
+        final_states=None,
+        mode=mode,
+    ) == rpq_bfs(
+        graph=graph,
+        query=Regex(query),
+        start_states={0, 3},
+        final_states=None,
+        mode=mode,
+        reachability_index=index,
+    )
+
+
+def test_index_of_another_graph(graph, index):
+    graph.add_edge(4, 0, label="a")
+    with pytest.raises(ValueError):
+        rpq_tensor(
+            graph=graph,
+            query=Regex("a*"),
+            start_states=None,
+            final_states=None,
+            reachability_index=index,
+        )
+
+
+def test_index_ignores_storage_of_matrix(graph, index):
+    graph_bool_mtx = BoolMatrixAutomaton.from_graph(graph)
+    mtx = graph_bool_mtx.b_mtx["a"].tocoo()
+    # Repeated entry and explicit False entry do not change the edges
+    graph_bool_mtx.b_mtx["a"] = csr_matrix(
+        (
+            np.append(mtx.data, [True, False]),
+            (np.append(mtx.row, [mtx.row[0], 4]), np.append(mtx.col, [mtx.col[0], 4])),
+        ),
+        shape=mtx.shape,
+    )
+    assert graph_bool_mtx.b_mtx["a"].nnz != mtx.nnz
+    assert index.is_built_for(graph_bool_mtx)
+
+
+def test_index_is_not_used_by_general_query(graph, monkeypatch):
+    graph.add_edge(3, 1, label="d")
+    index = ReachabilityIndex.from_graph(graph, label_sets=[{"c", "d"}])
+
+    def reach_from(*args, **kwargs):
+        raise AssertionError("Index is used by query that is not direct")
+
+    monkeypatch.setattr(ReachabilityIndex, "reach_from", reach_from)
+    query = Regex("(a.b)*.(c|d)*")
+    assert rpq_bfs(
+        graph=graph,
+        query=query,
+        start_states={0, 3},
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+    ) == rpq_bfs(
+        graph=graph,
+        query=query,
+        start_states={0, 3},
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        reachability_index=index,
+    )
@@ -0,0 +1,53 @@
+from itertools import product
+
+import pytest
+from pyformlang.finite_automaton import Symbol, State
+from pyformlang.regular_expression import Regex, MisformedRegexError
+
+from project.regex_compiler import *
+from project.regex_compiler import _tree_of_regex
+
+REGEX_TEXTS = [
+    "",
+    "a",
+    "$",
+    "epsilon a",
+    "a b*|c",
+    "a.b|c*.d",
+    "(a|b)(c)",
+    "a**",
+    "a|",
+    "(a+b)* . c . (a|$)",
+    "\\* b",
+    "(a.(b|c)*)*|(c)",
+]
+
+
+@pytest.mark.parametrize("regex_text", REGEX_TEXTS)
+def test_parse_regex_matches_pyformlang(regex_text):
+    assert parse_regex(regex_text) == _tree_of_regex(Regex(regex_text))
+
+
+@pytest.mark.parametrize("regex_text", ["()", "(a))", "|a", "*", ")", "(a"])
+def test_parse_regex_rejects_misformed(regex_text):
+    with pytest.raises(MisformedRegexError):
+        parse_regex(regex_text)
+
+
+@pytest.mark.parametrize("regex_text", REGEX_TEXTS)
+def test_regex_to_bool_matrix_accepts_the_same_words(regex_text):
+    regex = Regex(regex_text)
+    expected_nfa = regex.to_epsilon_nfa()
+    for query in (regex_text, regex):
+        nfa = regex_to_bool_matrix(query).to_nfa()
+        for length in range(4):
+            for word in product(["a", "b", "c", "d", "*"], repeat=length):
+                word = [Symbol(label) for label in word]
+                assert nfa.accepts(word) == expected_nfa.accepts(word)
+
+
+def test_regex_to_bool_matrix_has_state_per_symbol_occurrence():
+    regex_bool_mtx = regex_to_bool_matrix("a.b*|a")
+    assert len(regex_bool_mtx.state_to_idx) == 4
+    assert regex_bool_mtx.start_states == {State(0)}
+    assert all(not mtx[:, 0].nnz for mtx in regex_bool_mtx.b_mtx.values())
@@ -1,3 +1,4 @@
+import pytest
 from pyformlang.finite_automaton import DeterministicFiniteAutomaton, Symbol, State
 from pyformlang.regular_expression import Regex
 
@@ -46,3 +47,60 @@ def test_kleene_star_regex_dfa_is_correct():
     expected_dfa.add_final_state(State(2))
 
     assert check_automatons_are_equivalent(regex_dfa, expected_dfa)
+
+
+def test_minimize_dfa_merges_equivalent_states_and_removes_dead_ones():
+    dfa = DeterministicFiniteAutomaton()
+    dfa.add_transitions(
+        [
+            (0, Symbol("a"), 1),
+            (0, Symbol("b"), 2),
+            (1, Symbol("c"), 3),
+            (2, Symbol("c"), 4),
+            (0, Symbol("d"), 5),
+            (5, Symbol("d"), 5),
+        ]
+    )
+    dfa.add_start_state(State(0))
+    dfa.add_final_state(State(3))
+    dfa.add_final_state(State(4))
+
+    expected_dfa = DeterministicFiniteAutomaton()
+    expected_dfa.add_transitions(
+        [
+            (0, Symbol("a"), 1),
+            (0, Symbol("b"), 1),
+            (1, Symbol("c"), 2),
+        ]
+    )
+    expected_dfa.add_start_state(State(0))
+    expected_dfa.add_final_state(State(2))
+
+    assert check_automatons_are_equivalent(minimize_dfa(dfa), expected_dfa)
+
+
+def test_minimize_dfa_of_empty_language():
+    dfa = DeterministicFiniteAutomaton()
+    dfa.add_transition(State(0), Symbol("a"), State(1))
+    dfa.add_start_state(State(0))
+    assert minimize_dfa(dfa).states == {State("Empty")}
+
+
+@pytest.mark.parametrize("symbol", [Symbol(0), Symbol(False), Symbol("")])
+def test_minimize_dfa_keeps_falsy_symbols(symbol):
+    dfa = DeterministicFiniteAutomaton()
+    dfa.add_transition(State(0), symbol, State(1))
+    dfa.add_start_state(State(0))
+    dfa.add_final_state(State(1))
+    assert minimize_dfa(dfa).accepts([symbol])
+
+
+@pytest.mark.parametrize("regex_text", ["a*.b|c", "(a|b)*.a.(a|b)", "a.$|b*"])
+def test_determinize_matches_pyformlang(regex_text):
+    nfa = Regex(regex_text).to_epsilon_nfa()
+    dfa = determinize(nfa)
+    expected_dfa = nfa.to_deterministic()
+    assert dfa.states == expected_dfa.states
+    assert dfa.start_state == expected_dfa.start_state
+    assert dfa.final_states == expected_dfa.final_states
+    assert set(dfa) == set(expected_dfa)
@@ -119,3 +119,239 @@ def test_rpq_graph_by_word_separated():
         mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
     )
     assert result == {(0, 3), (2, 5), (4, 7)}
+
+
+@pytest.mark.parametrize(
+    "query", ["(a|b)c(d*)(e*)", "a.c|b.d|a.d.e", "(a|b)*.(c|d).e*", "e*", "$", ""]
+)
+@pytest.mark.parametrize("mode", list(MultipleSourceRpqMode))
+def test_rpq_bfs_nfa_query_same_as_min_dfa(non_empty_graph, query, mode):
+    results = [
+        rpq_bfs(
+            graph=non_empty_graph,
+            query=Regex(query),
+            start_states={0, 1, 3},
+            final_states=None,
+            mode=mode,
+            query_automaton=query_automaton,
+        )
+        for query_automaton in QueryAutomatonMode
+    ]
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize(
+    "query, expected", [("(a.a)*", {(0, 0)}), ("a*", {(0, 0), (0, 1)})]
+)
+@pytest.mark.parametrize("direction", list(BfsDirection))
+def test_rpq_bfs_nfa_query_same_as_min_dfa_on_cycle(query, expected, direction):
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 0, label="a")
+    results = [
+        rpq_bfs(
+            graph=graph,
+            query=Regex(query),
+            start_states={0},
+            final_states=None,
+            mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+            query_automaton=query_automaton,
+            direction=direction,
+        )
+        for query_automaton in QueryAutomatonMode
+    ]
+    assert results == [expected, expected]
+    assert rpq_tensor(graph, Regex(query), {0}, None) == expected
+
+
+def test_rpq_bfs_state_reached_on_several_levels():
+    result = rpq_bfs(
+        graph=graph_by_word("aaaab"),
+        query=Regex("a*.b"),
+        start_states=None,
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+    )
+    assert result == {(0, 5), (1, 5), (2, 5), (3, 5), (4, 5)}
+
+
+@pytest.mark.parametrize(
+    "query, start_states, final_states",
+    [
+        ("(a|b)c(d*)(e*)", {0}, {3}),
+        ("(a|b)c(d*)(e*)", {0}, {4, 5}),
+        ("(a|b)c(d*)(e*)", None, None),
+        ("(a|b).(c|d)", {0, 1}, {3}),
+        ("e*", {3, 4}, {3, 4}),
+        ("a.b", {0}, {3}),
+    ],
+)
+@pytest.mark.parametrize(
+    "mode",
+    [
+        MultipleSourceRpqMode.FIND_ALL_REACHABLE,
+        MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+    ],
+)
+def test_rpq_bfs_bidirectional_same_as_forward(
+    non_empty_graph, query, start_states, final_states, mode
+):
+    results = [
+        rpq_bfs(
+            graph=non_empty_graph,
+            query=Regex(query),
+            start_states=start_states,
+            final_states=final_states,
+            mode=mode,
+            direction=direction,
+        )
+        for direction in BfsDirection
+    ]
+    assert results[0] == results[1]
+
+
+def test_rpq_bfs_distances(non_empty_graph):
+    result = rpq_bfs(
+        graph=non_empty_graph,
+        query=Regex("(a|b)c(d*)(e*)"),
+        start_states=None,
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+    )
+    assert result == {(0, 3, 2), (0, 4, 3), (0, 5, 4)}
+
+
+def test_rpq_bfs_distances_are_shortest():
+    graph = graph_by_word("aab")
+    graph.add_edge(0, 2, label="a")
+    result = rpq_bfs(
+        graph=graph,
+        query=Regex("a*.b"),
+        start_states={0},
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+    )
+    assert result == {(0, 3, 2)}
+
+
+@pytest.mark.parametrize(
+    "max_depth, expected",
+    [(0, set()), (2, {(0, 3)}), (3, {(0, 3), (0, 4)}), (10, {(0, 3), (0, 4), (0, 5)})],
+)
+def test_rpq_bfs_max_depth(non_empty_graph, max_depth, expected):
+    result = rpq_bfs(
+        graph=non_empty_graph,
+        query=Regex("(a|b)c(d*)(e*)"),
+        start_states=None,
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+        max_depth=max_depth,
+    )
+    assert result == expected
+
+
+@pytest.mark.parametrize("mode", list(MultipleSourceRpqMode))
+@pytest.mark.parametrize("query_automaton", list(QueryAutomatonMode))
+def test_rpq_bfs_many_is_same_as_rpq_bfs(mode, query_automaton):
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="a")
+    graph.add_edge(2, 0, label="b")
+    graph.add_edge(2, 3, label="c")
+    graph.add_edge(3, 3, label="a")
+    queries = [Regex(q) for q in ["a*", "a b", "(a|b)* c", "c a*", "d", "a* b a*"]]
+    results = rpq_bfs_many(
+        graph=graph,
+        queries=queries,
+        start_states={0, 2},
+        final_states=None,
+        mode=mode,
+        query_automaton=query_automaton,
+    )
+    assert [
+        rpq_bfs(
+            graph=graph,
+            query=query,
+            start_states={0, 2},
+            final_states=None,
+            mode=mode,
+            query_automaton=query_automaton,
+        )
+        for query in queries
+    ] == results
+
+
+def test_rpq_bfs_many_without_queries(non_empty_graph):
+    assert [] == rpq_bfs_many(
+        graph=non_empty_graph,
+        queries=[],
+        start_states=None,
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_ALL_REACHABLE,
+    )
+
+
+@pytest.mark.parametrize("mode", list(MultipleSourceRpqMode))
+@pytest.mark.parametrize("memory_budget", [1, 200, 1 << 20])
+def test_rpq_bfs_chunked_is_same_as_rpq_bfs(mode, memory_budget):
+    graph = graph_by_word("abab")
+    graph.add_edge(4, 0, label="a")
+    query = Regex("(a b)* a")
+    batches = list(
+        rpq_bfs_chunked(
+            graph=graph,
+            query=query,
+            start_states=None,
+            final_states=None,
+            mode=mode,
+            memory_budget=memory_budget,
+        )
+    )
+    expected = rpq_bfs(
+        graph=graph,
+        query=query,
+        start_states=None,
+        final_states=None,
+        mode=mode,
+    )
+    assert expected == set().union(*batches)
+    if mode != MultipleSourceRpqMode.FIND_ALL_REACHABLE:
+        starts_of_batches = [{result[0] for result in batch} for batch in batches]
+        assert sum(map(len, starts_of_batches)) == len(set().union(*starts_of_batches))
+
+
+def test_rpq_bfs_chunked_splits_start_nodes():
+    graph = graph_by_word("aaaa")
+    batches = list(
+        rpq_bfs_chunked(
+            graph=graph,
+            query=Regex("a"),
+            start_states=None,
+            final_states=None,
+            mode=MultipleSourceRpqMode.FIND_REACHABLE_FOR_EACH_START_NODE,
+            memory_budget=1,
+        )
+    )
+    assert 5 == len(batches)
+
+
+@pytest.mark.parametrize("mode", list(MultipleSourceRpqMode)[:2])
+@pytest.mark.parametrize("query", ["a", "a|b", "a b", "a* b", "(a|b)* b a*"])
+def test_rpq_bfs_direct_evaluation_is_same_as_bfs(mode, query, monkeypatch):
+    graph = graph_by_word("abab")
+    graph.add_edge(4, 1, label="a")
+    direct_result = rpq_bfs(
+        graph=graph,
+        query=Regex(query),
+        start_states={0, 2},
+        final_states=None,
+        mode=mode,
+    )
+    monkeypatch.setattr("project.rpq._is_direct_query", lambda _: False)
+    assert direct_result == rpq_bfs(
+        graph=graph,
+        query=Regex(query),
+        start_states={0, 2},
+        final_states=None,
+        mode=mode,
+    )
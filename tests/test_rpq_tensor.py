@@ -22,31 +22,79 @@ def non_empty_graph():
     return graph
 
 
-def test_rpq_empty_graph(empty_graph):
+@pytest.mark.parametrize("mode", list(TensorRpqMode))
+def test_rpq_empty_graph(empty_graph, mode):
     result = rpq_tensor(
         graph=empty_graph,
         query=Regex("abc"),
         start_states=None,
         final_states=None,
+        mode=mode,
     )
     assert not result
 
 
-def test_rpq_non_empty_graph_one_start_state_one_final_state(non_empty_graph):
+@pytest.mark.parametrize("mode", list(TensorRpqMode))
+def test_rpq_non_empty_graph_one_start_state_one_final_state(non_empty_graph, mode):
     result = rpq_tensor(
         graph=non_empty_graph,
         query=Regex("(a|b)(c|d)"),
         start_states={0},
         final_states={3},
+        mode=mode,
     )
     assert {(0, 3)} == result
 
 
-def test_rpq_non_empty_graph_all_states_are_start_and_final(non_empty_graph):
+@pytest.mark.parametrize("mode", list(TensorRpqMode))
+def test_rpq_non_empty_graph_all_states_are_start_and_final(non_empty_graph, mode):
     result = rpq_tensor(
         graph=non_empty_graph,
         query=Regex("(a|b)(c|d)"),
         start_states=None,
         final_states=None,
+        mode=mode,
     )
     assert {(0, 3)} == result
+
+
+@pytest.mark.parametrize("query", ["a*", "(a|b)*c", "a.b*", "b.(a|c)*"])
+def test_rpq_start_restricted_same_as_full_closure(query):
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="a")
+    graph.add_edge(2, 0, label="a")
+    graph.add_edge(2, 3, label="b")
+    graph.add_edge(3, 4, label="c")
+    graph.add_edge(4, 3, label="a")
+    results = [
+        rpq_tensor(
+            graph=graph,
+            query=Regex(query),
+            start_states={0, 3},
+            final_states=None,
+            mode=mode,
+        )
+        for mode in TensorRpqMode
+    ]
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize(
+    "query", ["a", "a|b", "a c", "(a|b) (c|d)", "a*", "(a|b)* c*", "$", "a ($|c)"]
+)
+def test_rpq_direct_evaluation_is_same_as_tensor(non_empty_graph, query, monkeypatch):
+    non_empty_graph.add_edge(3, 0, label="a")
+    direct_result = rpq_tensor(
+        graph=non_empty_graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+    )
+    monkeypatch.setattr("project.rpq._is_direct_query", lambda _: False)
+    assert direct_result == rpq_tensor(
+        graph=non_empty_graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+    )
@@ -0,0 +1,155 @@
+import pytest
+from networkx import MultiDiGraph
+from pyformlang.cfg import CFG
+from pyformlang.regular_expression import Regex
+
+from project import (
+    BOOLEAN_SEMIRING,
+    TROPICAL_SEMIRING,
+    CountingSemiring,
+    Semiring,
+    CFPQAlgorithm,
+    cfpq,
+    cfpq_semiring,
+)
+from project.rpq import *
+
+
+@pytest.fixture
+def diamond_graph():
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(0, 2, label="a")
+    graph.add_edge(1, 3, label="b")
+    graph.add_edge(2, 3, label="b")
+    graph.add_edge(3, 4, label="b")
+    return graph
+
+
+@pytest.fixture
+def cycle_graph():
+    graph = MultiDiGraph()
+    graph.add_edge(0, 1, label="a")
+    graph.add_edge(1, 2, label="a")
+    graph.add_edge(2, 0, label="a")
+    graph.add_edge(2, 3, label="b")
+    return graph
+
+
+def test_rpq_counting_paths(diamond_graph):
+    result = rpq_semiring(
+        graph=diamond_graph,
+        query=Regex("a b*"),
+        start_states={0},
+        final_states=None,
+        semiring=CountingSemiring(bound=100),
+    )
+    assert {(0, 1): 1, (0, 2): 1, (0, 3): 2, (0, 4): 2} == result
+
+
+def test_rpq_counting_paths_are_bounded_on_cycles(cycle_graph):
+    result = rpq_semiring(
+        graph=cycle_graph,
+        query=Regex("a*"),
+        start_states={0},
+        final_states={1},
+        semiring=CountingSemiring(bound=5),
+    )
+    assert {(0, 1): 5} == result
+
+
+def test_rpq_tropical_matches_distances(cycle_graph):
+    query = Regex("a* b")
+    result = rpq_semiring(
+        graph=cycle_graph,
+        query=query,
+        start_states=None,
+        final_states=None,
+        semiring=TROPICAL_SEMIRING,
+    )
+    distances = rpq_bfs(
+        graph=cycle_graph,
+        query=query,
+        start_states=None,
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+    )
+    assert {(u, v): d for u, v, d in distances} == result
+
+
+def test_rpq_semiring_skips_stored_zeros_of_product(diamond_graph):
+    # Kronecker product with the two-state query automaton
+    # stores whole blocks with explicit False entries
+    query = Regex("(a|b)* b")
+    distances = rpq_bfs(
+        graph=diamond_graph,
+        query=query,
+        start_states={0},
+        final_states=None,
+        mode=MultipleSourceRpqMode.FIND_DISTANCES_FOR_EACH_START_NODE,
+    )
+    assert {(0, 3): 2, (0, 4): 3} == {(u, v): d for u, v, d in distances}
+    assert {(u, v): d for u, v, d in distances} == rpq_semiring(
+        graph=diamond_graph,
+        query=query,
+        start_states={0},
+        final_states=None,
+        semiring=TROPICAL_SEMIRING,
+    )
+    assert {(0, 3): 2, (0, 4): 2} == rpq_semiring(
+        graph=diamond_graph,
+        query=query,
+        start_states={0},
+        final_states=None,
+        semiring=CountingSemiring(bound=100),
+    )
+
+
+@pytest.mark.parametrize("query", ["a*", "a b", "a* b", "(a|b)*"])
+def test_rpq_boolean_matches_tensor(cycle_graph, query):
+    result = rpq_semiring(
+        graph=cycle_graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+        semiring=BOOLEAN_SEMIRING,
+    )
+    expected = rpq_tensor(
+        graph=cycle_graph,
+        query=Regex(query),
+        start_states=None,
+        final_states=None,
+    )
+    assert expected == set(result)
+
+
+def test_cfpq_tropical_shortest_paths(cycle_graph):
+    cfg = CFG.from_text("S -> a S | b")
+    result = cfpq_semiring(graph=cycle_graph, cfg=cfg, semiring=TROPICAL_SEMIRING)
+    assert {(2, 3): 1.0, (1, 3): 2.0, (0, 3): 3.0} == result
+
+
+def test_cfpq_counting_derivations(diamond_graph):
+    cfg = CFG.from_text("S -> a B\nB -> b | b b")
+    result = cfpq_semiring(
+        graph=diamond_graph, cfg=cfg, semiring=CountingSemiring(bound=100)
+    )
+    assert {(0, 3): 2, (0, 4): 2} == result
+
+
+@pytest.mark.parametrize(
+    "cfg", ["S -> a S b | $", "S -> a | S S", "S -> a S | b | $", "S -> S a b | b"]
+)
+def test_cfpq_boolean_matches_cfpq(cycle_graph, cfg):
+    cfg = CFG.from_text(cfg)
+    result = cfpq_semiring(graph=cycle_graph, cfg=cfg, semiring=BOOLEAN_SEMIRING)
+    assert cfpq(graph=cycle_graph, cfg=cfg, algo=CFPQAlgorithm.MATRIX) == set(result)
+
+
+def test_incomplete_semiring_is_not_created():
+    class HalfSemiring(Semiring):
+        def edge_value(self):
+            return 1
+
+    with pytest.raises(TypeError):
+        HalfSemiring()